@@ -1,14 +1,89 @@
 import os
+import re
+import json
+import time
+import asyncio
+import threading
+import inspect
+import functools
+import contextvars
+from contextlib import contextmanager
+import gzip
+import hashlib
+import tempfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 import gradio as gr
 import pandas as pd
 import oracledb
-from typing import Optional, List, Tuple, Dict, Any
+import uvicorn
+from fastapi import FastAPI, HTTPException, Request, Response
+from db_backend import OracleDialect, SQLitePool, create_sqlite_database
+from snapshot import FitmentSnapshot
+from query_parser import VehicleQueryParser
+from title_index import TitleIndex
+from fitment_ranges import compress_fitment, year_runs
+from fitment_index import ANY, KEY_FIELDS, FitmentIndex
+from combo_index import COMBO_COLUMNS, FitmentComboIndex
+from gap_matrix import CELL_COLUMNS, CoverageMatrix
+from brand_overlap import INCIDENCE_COLUMNS, brand_overlap
+from price_anomaly import scan_price_anomalies
+from duplicate_index import TITLE_COLUMNS, DuplicateIndex
+from mpn_suggest import MPN_INDEX_COLUMNS, MPN_QUERY_COLUMNS, MpnSuggester
+from change_feed import WATCHED_TABLES, ChangeFeed, TableChange, subscribe_oracle_cqn
+from descriptor_classifier import RESULT_COLUMNS as DESCRIPTOR_RESULT_COLUMNS, DescriptorClassifier, load_vocabularies
+from typing import Optional, List, Tuple, Dict, Any, Callable, Iterator, Set
 import logging
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-_pool: Optional[oracledb.ConnectionPool] = None
+_pool: Optional[Any] = None
+_class_pools: Dict[str, Any] = {}
+_class_pool_lock = threading.Lock()
+_dialect: Optional[Any] = None
+
+DB_BACKEND = os.getenv("DB_BACKEND", "oracle").lower()
+SQLITE_PATH = os.getenv("SQLITE_PATH", "fitment.db")
+FITMENT_SNAPSHOT_DIR = os.getenv("FITMENT_SNAPSHOT_DIR", "")
+# FITMENT_DENORM=1 reads fitment from the fitment_denorm table (sql/fitment_denorm.sql)
+# instead of paying for View_NormalizedFitment's joins on every query. FITMENT_RANGES=1
+# reads it through the range-compressed listing_fitment_range (sql/fitment_ranges.sql).
+# run.sh installs neither script: run the one you enable by hand in SQL*Plus, then load it
+# with `manage.py refresh-denorm --full` or `manage.py compress-fitment`.
+FITMENT_DENORM = os.getenv("FITMENT_DENORM", "0") == "1"
+FITMENT_RANGES = os.getenv("FITMENT_RANGES", "0") == "1"
+if FITMENT_DENORM:
+    FITMENT_SOURCE = "fitment_denorm"
+elif FITMENT_RANGES:
+    FITMENT_SOURCE = "View_NormalizedFitmentRanged"
+else:
+    FITMENT_SOURCE = "View_NormalizedFitment"
+
+_snapshot: Optional[FitmentSnapshot] = None
+
+
+
+def _query_class(name: str, timeout_ms: int, pool_size: int, queue_depth: int) -> Dict[str, Any]:
+    key = name.upper()
+    return {
+        "timeout_ms": int(os.getenv(f"QUERY_TIMEOUT_{key}_MS", timeout_ms)),
+        "pool_size": int(os.getenv(f"QUERY_POOL_{key}", pool_size)),
+        "queue_depth": int(os.getenv(f"QUERY_QUEUE_{key}", queue_depth)),
+        "dsn": os.getenv(f"ORA_DB_{key}") or None
+    }
+
+
+# Workload classes for UI queries. Each class gets its own connection pool (optionally on its
+# own DSN, e.g. a read replica), a call_timeout deadline, and a Gradio concurrency group that
+# admits pool_size running plus queue_depth waiting calls. Queries outside a query_scope
+# (CLI, startup) use the default pool without a deadline.
+QUERY_CLASSES: Dict[str, Dict[str, Any]] = {
+    "lookup": _query_class("lookup", timeout_ms=5000, pool_size=4, queue_depth=32),
+    "search": _query_class("search", timeout_ms=15000, pool_size=4, queue_depth=16),
+    "analytics": _query_class("analytics", timeout_ms=120000, pool_size=2, queue_depth=4),
+    "browse": _query_class("browse", timeout_ms=30000, pool_size=1, queue_depth=4)
+}
 
 PROJECT_TABLES = [
     'MAKE',
@@ -21,6 +96,7 @@ PROJECT_TABLES = [
     'PART_TYPE',
     'PARTTYPE_BRAND',
     'LISTING',
+    'LISTING_FITMENT',
     'BRAND_ALIAS'
 ]
 
@@ -29,9 +105,22 @@ PROJECT_VIEWS = [
 ]
 
 
-def get_pool() -> oracledb.ConnectionPool:
-    global _pool
+def get_pool(query_class: Optional[str] = None) -> Any:
+    global _pool, _dialect
+    if query_class is not None and DB_BACKEND == "oracle":
+        return _get_class_pool(query_class)
     if _pool is None:
+        if DB_BACKEND == "sqlite":
+            if not os.path.exists(SQLITE_PATH):
+                logger.info(f"Creating empty SQLite database at {SQLITE_PATH}")
+                create_sqlite_database(SQLITE_PATH)
+            _pool = SQLitePool(SQLITE_PATH)
+            _dialect = _pool.dialect
+            logger.info(f"SQLite backend opened at {SQLITE_PATH}")
+            return _pool
+        if DB_BACKEND != "oracle":
+            raise ValueError(f"Unknown DB_BACKEND '{DB_BACKEND}' (expected 'oracle' or 'sqlite')")
+
         user = os.getenv("ORA_USER")
         password = os.getenv("ORA_PASS")
         dsn = os.getenv("ORA_DB")
@@ -50,6 +139,7 @@ def get_pool() -> oracledb.ConnectionPool:
                 max=10,
                 increment=1
             )
+            _dialect = OracleDialect()
             logger.info("Oracle connection pool created successfully")
         except Exception as e:
             logger.error(f"Failed to create connection pool: {e}")
@@ -57,30 +147,451 @@ def get_pool() -> oracledb.ConnectionPool:
     return _pool
 
 
+def _get_class_pool(query_class: str) -> Any:
+    pool = _class_pools.get(query_class)
+    if pool is not None:
+        return pool
+    get_pool()
+    settings = QUERY_CLASSES[query_class]
+    with _class_pool_lock:
+        if query_class in _class_pools:
+            return _class_pools[query_class]
+        try:
+            # TIMEDWAIT turns an exhausted pool into an error after the class deadline instead of
+            # an unbounded wait, so one class's backlog cannot hold callers indefinitely.
+            pool = oracledb.create_pool(
+                user=os.getenv("ORA_USER"),
+                password=os.getenv("ORA_PASS"),
+                dsn=settings["dsn"] or os.getenv("ORA_DB"),
+                min=1,
+                max=settings["pool_size"],
+                increment=1,
+                getmode=oracledb.POOL_GETMODE_TIMEDWAIT,
+                wait_timeout=settings["timeout_ms"]
+            )
+        except Exception as e:
+            logger.error(f"Failed to create {query_class} connection pool: {e}")
+            raise
+        _class_pools[query_class] = pool
+    logger.info(f"Oracle {query_class} pool created (max {settings['pool_size']}, {'replica' if settings['dsn'] else 'primary'} DSN)")
+    return pool
+
+
+def workload(query_class: str) -> Dict[str, Any]:
+    """Gradio event kwargs that put a handler in its workload class's concurrency group."""
+    settings = QUERY_CLASSES[query_class]
+    return {
+        "concurrency_id": query_class,
+        "concurrency_limit": settings["pool_size"] + settings["queue_depth"]
+    }
+
+
+def get_dialect() -> Any:
+    if _dialect is None:
+        get_pool()
+    return _dialect
+
+
+class QueryCancelled(Exception):
+    pass
+
+
+class QueryScope:
+    """Queries run by one handler call: their class, owning session, and open connections."""
+    __slots__ = ("query_class", "session", "name", "cancelled", "connections")
+
+    def __init__(self, query_class: str, session: Optional[str], name: Optional[str]):
+        self.query_class = query_class
+        self.session = session
+        self.name = name
+        self.cancelled = False
+        self.connections: Set[Any] = set()
+
+
+_current_scope: contextvars.ContextVar = contextvars.ContextVar("query_scope", default=None)
+_session_scopes: Dict[str, List[QueryScope]] = {}
+_scope_lock = threading.Lock()
+
+
+@contextmanager
+def query_scope(
+    query_class: str,
+    session: Optional[str] = None,
+    name: Optional[str] = None,
+    supersede: bool = False
+) -> Iterator[QueryScope]:
+    """Run the enclosed queries under a query class; with supersede, cancel the session's earlier
+    still-running call of the same name first."""
+    if query_class not in QUERY_CLASSES:
+        raise ValueError(f"Unknown query class '{query_class}'")
+    if supersede and session:
+        cancel_session_queries(session, [name])
+    scope = QueryScope(query_class, session, name)
+    if session:
+        with _scope_lock:
+            _session_scopes.setdefault(session, []).append(scope)
+    token = _current_scope.set(scope)
+    try:
+        yield scope
+    finally:
+        _current_scope.reset(token)
+        if session:
+            with _scope_lock:
+                scopes = _session_scopes.get(session, [])
+                if scope in scopes:
+                    scopes.remove(scope)
+                if not scopes:
+                    _session_scopes.pop(session, None)
+
+
+def cancel_session_queries(session: str, names: Optional[List[Optional[str]]] = None) -> int:
+    """Cancel a session's running queries (optionally only some handler names); returns calls cancelled."""
+    with _scope_lock:
+        scopes = [s for s in _session_scopes.get(session, []) if names is None or s.name in names]
+        for scope in scopes:
+            scope.cancelled = True
+            for connection in list(scope.connections):
+                try:
+                    connection.cancel()
+                except Exception as e:
+                    logger.warning(f"Could not cancel query for session {session}: {e}")
+    if scopes:
+        logger.info(f"Cancelled {len(scopes)} running handler call(s) for session {session}")
+    return len(scopes)
+
+
+def session_handler(
+    fn: Callable,
+    query_class: Optional[str] = None,
+    supersede: bool = False,
+    cancels: Optional[List[Callable]] = None
+) -> Callable:
+    """Wrap a UI handler so Gradio passes the request: its queries run in a session query_scope,
+    and calling it first cancels the session's running calls of the handlers in cancels.
+    A call that was cancelled leaves its outputs unchanged."""
+    signature = inspect.signature(fn)
+    cancel_names = [c.__name__ for c in cancels] if cancels else None
+    
+    @functools.wraps(fn)
+    def wrapper(*args):
+        *inputs, request = args
+        session = getattr(request, "session_hash", None)
+        if session and cancel_names:
+            cancel_session_queries(session, cancel_names)
+        if query_class is None:
+            return fn(*inputs)
+        with query_scope(query_class, session, fn.__name__, supersede) as scope:
+            result = fn(*inputs)
+        if scope.cancelled:
+            return tuple(gr.update() for _ in result) if isinstance(result, tuple) else gr.update()
+        return result
+    
+    request_param = inspect.Parameter(
+        "request", inspect.Parameter.POSITIONAL_OR_KEYWORD, default=None, annotation=gr.Request
+    )
+    wrapper.__signature__ = signature.replace(parameters=list(signature.parameters.values()) + [request_param])
+    wrapper.__annotations__ = {**getattr(fn, "__annotations__", {}), "request": gr.Request}
+    return wrapper
+
+
+def _run_query(query: str, params: Optional[Dict[str, Any]] = None) -> pd.DataFrame:
+    scope = _current_scope.get()
+    pool = get_pool(scope.query_class if scope else None)
+    timeout_ms = QUERY_CLASSES[scope.query_class]["timeout_ms"] if scope else 0
+    started = time.monotonic()
+    try:
+        with pool.acquire() as connection:
+            if scope is not None:
+                with _scope_lock:
+                    if scope.cancelled:
+                        raise QueryCancelled("Query cancelled before it started")
+                    scope.connections.add(connection)
+            connection.call_timeout = timeout_ms
+            try:
+                with connection.cursor() as cursor:
+                    if params:
+                        cursor.execute(query, params)
+                    else:
+                        cursor.execute(query)
+                    
+                    columns = [desc[0] for desc in cursor.description]
+                    
+                    rows = cursor.fetchall()
+                    
+                    df = pd.DataFrame(rows, columns=columns)
+                    
+                    df.columns = [col.lower() for col in df.columns]
+                    
+                    return df
+            finally:
+                connection.call_timeout = 0
+                if scope is not None:
+                    with _scope_lock:
+                        scope.connections.discard(connection)
+    except QueryCancelled:
+        raise
+    except Exception as e:
+        if scope is not None and scope.cancelled:
+            logger.info(f"Query cancelled ({scope.name}): {e}")
+            raise QueryCancelled(str(e)) from e
+        if timeout_ms and (time.monotonic() - started) * 1000 >= timeout_ms:
+            logger.error(f"Query exceeded the {scope.query_class} deadline of {timeout_ms} ms: {e}")
+            raise TimeoutError(
+                f"Query did not finish within the {timeout_ms / 1000:g}s limit for {scope.query_class} queries "
+                "(the server is busy or the filters are too broad). Please try again."
+            ) from e
+        logger.error(f"Query execution failed: {e}")
+        raise
+
+
+QUERY_COALESCING = os.getenv("QUERY_COALESCING", "1") != "0"
+# Only the idempotent UI read classes coalesce. A leader's pool, deadline and cancellation
+# apply to every caller sharing its execution, so classes never share one, and reads outside a
+# query_scope (ingestion, admin, CLI) always run on their own, after any write they follow.
+COALESCED_QUERY_CLASSES = {"search", "lookup"}
+
+
+class _InFlightQuery:
+    __slots__ = ("done", "result", "error", "waiters")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Optional[pd.DataFrame] = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+
+
+_inflight_queries: Dict[Tuple[str, str, str], _InFlightQuery] = {}
+_inflight_lock = threading.Lock()
+_async_inflight_queries: Dict[Tuple[int, str, str, str], "asyncio.Future"] = {}
+
+
+def _query_key(query: str, params: Optional[Dict[str, Any]]) -> Optional[Tuple[str, str, str]]:
+    """Coalescing key for the current query scope, or None when the query must run on its own."""
+    scope = _current_scope.get()
+    if not QUERY_COALESCING or scope is None or scope.query_class not in COALESCED_QUERY_CLASSES:
+        return None
+    return scope.query_class, query, json.dumps(params or {}, sort_keys=True, default=str)
+
+
 def execute_query(query: str, params: Optional[Dict[str, Any]] = None) -> pd.DataFrame:
+    """Run a read query; in the COALESCED_QUERY_CLASSES, identical (class, sql, binds) calls
+    already in flight share one execution.
+
+    Every caller gets its own copy of the result, so callers may modify it freely.
+    """
+    key = _query_key(query, params)
+    if key is None:
+        return _run_query(query, params)
+    with _inflight_lock:
+        call = _inflight_queries.get(key)
+        leader = call is None
+        if leader:
+            call = _InFlightQuery()
+            _inflight_queries[key] = call
+        else:
+            call.waiters += 1
+    
+    if leader:
+        try:
+            call.result = _run_query(query, params)
+        except BaseException as e:
+            call.error = e
+        finally:
+            with _inflight_lock:
+                del _inflight_queries[key]
+            call.done.set()
+        if call.waiters:
+            logger.info(f"Coalesced {call.waiters} identical concurrent queries into one execution")
+    else:
+        call.done.wait()
+        if isinstance(call.error, QueryCancelled):
+            # The leader's session cancelled it; this caller still wants the rows.
+            return execute_query(query, params)
+    
+    if call.error is not None:
+        raise call.error
+    return call.result.copy()
+
+
+async def execute_query_async(query: str, params: Optional[Dict[str, Any]] = None) -> pd.DataFrame:
+    """Coroutine variant for async handlers: concurrent identical calls on one event loop await a
+    single worker thread, which in turn coalesces with threaded callers through execute_query.
+    The worker runs in the caller's query scope."""
+    loop = asyncio.get_running_loop()
+    key = _query_key(query, params)
+    if key is None:
+        return await loop.run_in_executor(None, contextvars.copy_context().run, execute_query, query, params)
+    key = (id(loop),) + key
+    future = _async_inflight_queries.get(key)
+    if future is None:
+        future = loop.run_in_executor(None, contextvars.copy_context().run, execute_query, query, params)
+        _async_inflight_queries[key] = future
+        future.add_done_callback(lambda f: _async_inflight_queries.pop(key, None))
+    try:
+        result = await asyncio.shield(future)
+    except QueryCancelled:
+        scope = _current_scope.get()
+        if scope.cancelled:
+            raise
+        # The leader's session cancelled it; this caller still wants the rows.
+        return await execute_query_async(query, params)
+    return result.copy()
+
+
+def iter_query(
+    query: str,
+    params: Optional[Dict[str, Any]] = None,
+    chunk_size: int = 50000
+) -> Iterator[pd.DataFrame]:
+    """Stream a query as DataFrames of at most chunk_size rows (fetchmany under the hood)."""
     pool = get_pool()
     try:
         with pool.acquire() as connection:
             with connection.cursor() as cursor:
+                cursor.arraysize = min(chunk_size, 10000)
                 if params:
                     cursor.execute(query, params)
                 else:
                     cursor.execute(query)
-                
-                columns = [desc[0] for desc in cursor.description]
-                
-                rows = cursor.fetchall()
-                
-                df = pd.DataFrame(rows, columns=columns)
-                
-                df.columns = [col.lower() for col in df.columns]
-                
-                return df
+                columns = [desc[0].lower() for desc in cursor.description]
+                while True:
+                    rows = cursor.fetchmany(chunk_size)
+                    if not rows:
+                        break
+                    yield pd.DataFrame(rows, columns=columns)
     except Exception as e:
-        logger.error(f"Query execution failed: {e}")
+        logger.error(f"Streaming query failed: {e}")
+        raise
+
+
+def execute_batches(batches: List[Tuple[str, List[Dict[str, Any]]]]) -> None:
+    """Run each (statement, rows) pair with executemany inside one transaction."""
+    pool = get_pool()
+    try:
+        with pool.acquire() as connection:
+            with connection.cursor() as cursor:
+                for statement, rows in batches:
+                    if rows:
+                        cursor.executemany(statement, rows)
+            connection.commit()
+    except Exception as e:
+        logger.error(f"Batch execution failed: {e}")
         raise
 
 
+_change_listeners: List[Callable[[Dict[str, Dict[str, pd.DataFrame]]], None]] = []
+
+
+def register_change_listener(listener: Callable[[Dict[str, Dict[str, pd.DataFrame]]], None]) -> None:
+    if listener not in _change_listeners:
+        _change_listeners.append(listener)
+
+
+def publish_changes(changes: Dict[str, Dict[str, pd.DataFrame]]) -> None:
+    for listener in list(_change_listeners):
+        try:
+            listener(changes)
+        except Exception as e:
+            logger.error(f"Change listener {getattr(listener, '__name__', listener)} failed: {e}")
+
+
+CHANGE_FEED = os.getenv("CHANGE_FEED", "1") != "0"
+CHANGE_FEED_POLL_SECONDS = float(os.getenv("CHANGE_FEED_POLL_SECONDS", "30"))
+# With CQN registered, polling is only the safety net for lost notifications.
+CHANGE_FEED_CQN_POLL_SECONDS = float(os.getenv("CHANGE_FEED_CQN_POLL_SECONDS", "600"))
+CHANGE_FEED_COALESCE_SECONDS = float(os.getenv("CHANGE_FEED_COALESCE_SECONDS", "2"))
+
+
+_monitoring_flush = True
+
+
+def table_fingerprints(tables: List[str]) -> Dict[str, Any]:
+    """Per-table change fingerprints for the change feed, read without touching the write path.
+
+    Oracle: the table's USER_TAB_MODIFICATIONS row (DML counts since the last statistics
+    gather, flushed first when the user may call DBMS_STATS.FLUSH_DATABASE_MONITORING_INFO;
+    otherwise Oracle flushes them every few minutes). SQLite: the counters in app_table_change.
+    """
+    global _monitoring_flush
+    if DB_BACKEND == "sqlite":
+        df = execute_query("SELECT table_name, change_count FROM app_table_change")
+        counts = dict(zip(df["table_name"].str.lower(), df["change_count"].astype("int64")))
+        return {table: int(counts[table]) for table in tables if table in counts}
+    if _monitoring_flush:
+        try:
+            with get_pool().acquire() as connection:
+                with connection.cursor() as cursor:
+                    cursor.execute("BEGIN DBMS_STATS.FLUSH_DATABASE_MONITORING_INFO; END;")
+        except Exception as e:
+            _monitoring_flush = False
+            logger.info(f"Change feed reads unflushed table monitoring (CQN still reports commits at once): {e}")
+    df = execute_query(
+        "SELECT table_name, inserts, updates, deletes, truncated, timestamp "
+        "FROM user_tab_modifications WHERE partition_name IS NULL"
+    )
+    rows = {
+        str(row.table_name).lower(): (int(row.inserts), int(row.updates), int(row.deletes), row.truncated, str(row.timestamp))
+        for row in df.itertuples(index=False)
+    }
+    # No row means no DML since the last statistics gather.
+    return {table: rows.get(table) for table in tables}
+
+
+# Outside changes to the catalog tables, for caches that cannot rely on ingestion change sets
+# alone. Subscribers are called from the feed's thread, in registration order.
+change_feed = ChangeFeed(
+    table_fingerprints, WATCHED_TABLES, CHANGE_FEED_POLL_SECONDS, CHANGE_FEED_COALESCE_SECONDS
+)
+_cqn: Optional[Tuple[Any, Any]] = None
+
+
+def register_table_subscriber(tables: List[str], callback: Callable[[Dict[str, TableChange]], None]) -> None:
+    change_feed.subscribe(tables, callback)
+
+
+def start_change_feed() -> None:
+    """Start the change feed: CQN when the Oracle client runs in thick mode and allows it, else polling."""
+    global _cqn
+    if not CHANGE_FEED or change_feed.running:
+        return
+    try:
+        missing = set(WATCHED_TABLES) - set(table_fingerprints(WATCHED_TABLES))
+    except Exception as e:
+        logger.warning(f"Change feed disabled: table fingerprints are not readable ({e})")
+        return
+    if missing:
+        logger.warning(f"Change feed disabled: app_table_change has no counters for {sorted(missing)}")
+        return
+    if DB_BACKEND == "oracle" and not oracledb.is_thin_mode():
+        try:
+            connection = oracledb.connect(
+                user=os.getenv("ORA_USER"), password=os.getenv("ORA_PASS"), dsn=os.getenv("ORA_DB"), events=True
+            )
+            _cqn = (connection, subscribe_oracle_cqn(connection, change_feed))
+            change_feed.poll_seconds = CHANGE_FEED_CQN_POLL_SECONDS
+        except Exception as e:
+            logger.warning(f"Continuous Query Notification unavailable, polling every {change_feed.poll_seconds}s: {e}")
+    change_feed.start()
+
+
+def _drain_fitment_denorm_on_change(changes: Dict[str, TableChange]) -> None:
+    # Registered first so fitment_denorm is current before the caches reading it rebuild.
+    drain_fitment_denorm_dirty()
+
+
+register_table_subscriber(
+    ["make", "model", "trim", "brand", "listing", "listing_fitment"], _drain_fitment_denorm_on_change
+)
+
+
+def _drain_fitment_ranges_on_change(changes: Dict[str, TableChange]) -> None:
+    drain_fitment_range_dirty()
+
+
+register_table_subscriber(["trim", "listing_fitment"], _drain_fitment_ranges_on_change)
+
+
 def get_quick_stats() -> Tuple[int, int, int]:
     try:
         listings_df = execute_query("SELECT COUNT(*) as count FROM listing")
@@ -194,6 +705,357 @@ def load_brands() -> List[Tuple[str, str]]:
         return []
 
 
+VEHICLE_TREE_PATH = "/vehicle-tree.json"
+VEHICLE_TREE_MAX_TRIMS = int(os.getenv("VEHICLE_TREE_MAX_TRIMS", "50000"))
+VEHICLE_TREE_TTL = int(os.getenv("VEHICLE_TREE_TTL", "300"))
+
+_vehicle_tree: Optional[Dict[str, Any]] = None
+
+VEHICLE_TREE_SQL = """
+SELECT mk.make_id, mk.make_name, md.model_id, md.model_name, t.trim_id, t.trim_name, t.year
+FROM make mk
+LEFT JOIN model md ON md.make_id = mk.make_id
+LEFT JOIN trim t ON t.model_id = md.model_id
+ORDER BY mk.make_name, md.model_name, t.trim_name
+"""
+
+
+def build_vehicle_tree() -> Optional[Dict[str, Any]]:
+    """Whole make/model/trim hierarchy as compact JSON, or None when the catalog is too large to ship.
+
+    Layout: {"version", "makes": [[id, name]], "models": {make_id: [[id, name]]},
+    "trims": {model_id: [[id, name, year]]}}, each list in the same order as the loaders.
+    """
+    count_df = execute_query("SELECT COUNT(*) AS cnt FROM trim")
+    trim_count = int(count_df.iloc[0]['cnt']) if not count_df.empty else 0
+    if trim_count > VEHICLE_TREE_MAX_TRIMS:
+        logger.info(f"Vehicle tree disabled: {trim_count} trims exceeds VEHICLE_TREE_MAX_TRIMS={VEHICLE_TREE_MAX_TRIMS}")
+        return None
+    
+    df = execute_query(VEHICLE_TREE_SQL)
+    makes: List[List[Any]] = []
+    models: Dict[str, List[List[Any]]] = {}
+    trims: Dict[str, List[List[Any]]] = {}
+    seen_makes, seen_models = set(), set()
+    for row in df.itertuples(index=False):
+        if row.make_id not in seen_makes:
+            seen_makes.add(row.make_id)
+            makes.append([int(row.make_id), str(row.make_name)])
+        if pd.notna(row.model_id) and row.model_id not in seen_models:
+            seen_models.add(row.model_id)
+            models.setdefault(str(int(row.make_id)), []).append([int(row.model_id), str(row.model_name)])
+        if pd.notna(row.trim_id):
+            year = int(row.year) if pd.notna(row.year) else None
+            trims.setdefault(str(int(row.model_id)), []).append([int(row.trim_id), str(row.trim_name), year])
+    
+    data = {"makes": makes, "models": models, "trims": trims}
+    version = hashlib.sha1(json.dumps(data, sort_keys=True).encode("utf-8")).hexdigest()[:12]
+    body = json.dumps({"version": version, **data}, separators=(",", ":")).encode("utf-8")
+    logger.info(f"Built vehicle tree {version}: {len(makes)} makes, {trim_count} trims, {len(body)} bytes")
+    return {"version": version, "body": body, "gzip": gzip.compress(body), "built_at": time.monotonic()}
+
+
+def get_vehicle_tree(refresh: bool = False) -> Optional[Dict[str, Any]]:
+    """Cached vehicle tree, rebuilt after VEHICLE_TREE_TTL seconds; the version only changes with the data."""
+    global _vehicle_tree
+    if refresh or _vehicle_tree is None or time.monotonic() - _vehicle_tree["built_at"] > VEHICLE_TREE_TTL:
+        try:
+            _vehicle_tree = build_vehicle_tree() or {"version": None, "built_at": time.monotonic()}
+        except Exception as e:
+            logger.error(f"Failed to build vehicle tree: {e}")
+            return None
+    return _vehicle_tree if _vehicle_tree["version"] else None
+
+
+def _drop_vehicle_tree(changes: Dict[str, TableChange]) -> None:
+    global _vehicle_tree
+    _vehicle_tree = None
+
+
+register_table_subscriber(["make", "model", "trim"], _drop_vehicle_tree)
+
+
+def vehicle_tree_response(request: Request) -> Response:
+    tree = get_vehicle_tree()
+    if tree is None:
+        return Response(status_code=404)
+    etag = f'"{tree["version"]}"'
+    headers = {"ETag": etag, "Vary": "Accept-Encoding"}
+    if request.query_params.get("v") == tree["version"]:
+        # Versioned URL: the content behind it never changes.
+        headers["Cache-Control"] = "public, max-age=31536000, immutable"
+    else:
+        headers["Cache-Control"] = f"public, max-age={VEHICLE_TREE_TTL}"
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    if "gzip" in request.headers.get("accept-encoding", ""):
+        headers["Content-Encoding"] = "gzip"
+        return Response(tree["gzip"], media_type="application/json", headers=headers)
+    return Response(tree["body"], media_type="application/json", headers=headers)
+
+
+# Browser-side cascade handlers. The tree is fetched once per page and then served
+# from the HTTP cache; __TREE_URL__ is replaced with the versioned URL at startup.
+VEHICLE_TREE_JS_PRELUDE = """
+    const tree = await (window.__vehicleTree ||= fetch("__TREE_URL__").then((r) => r.json()));
+    const reset = (choices) => ({__type__: "update", choices: choices, value: null});
+"""
+
+VEHICLE_MODELS_JS = """
+async (make_id) => {%s
+    if (!make_id) return [reset([]), reset([])];
+    const models = tree.models[make_id] || [];
+    return [reset(models.map(([id, name]) => [name, String(id)])), {__type__: "update"}];
+}
+""" % VEHICLE_TREE_JS_PRELUDE
+
+VEHICLE_TRIMS_JS = """
+async (model_id, year) => {%s
+    const trims = (model_id && tree.trims[model_id]) || [];
+    return reset(
+        trims
+            .filter(([id, name, trim_year]) => !year || trim_year === Number(year))
+            .map(([id, name]) => [name, String(id)])
+    );
+}
+""" % VEHICLE_TREE_JS_PRELUDE
+
+
+FITMENT_SNAPSHOT_SQL = f"""
+SELECT
+    listing_id, listing_title, price,
+    brand_id, brand_name,
+    part_type_id, parttype_name,
+    trim_id, trim_name, year,
+    make_id, make_name,
+    model_id, model_name,
+    position_id, position_code,
+    drive_id, drive_code
+FROM {FITMENT_SOURCE}
+ORDER BY make_id, model_id, year, listing_id
+"""
+
+
+def get_snapshot() -> Optional[FitmentSnapshot]:
+    """Memory-mapped fitment snapshot when FITMENT_SNAPSHOT_DIR is set and holds a version, else None."""
+    global _snapshot
+    if not FITMENT_SNAPSHOT_DIR:
+        return None
+    if _snapshot is None:
+        try:
+            _snapshot = FitmentSnapshot(FITMENT_SNAPSHOT_DIR)
+        except Exception as e:
+            logger.error(f"Fitment snapshot unavailable, using the database: {e}")
+            return None
+    return _snapshot if _snapshot.available() else None
+
+
+def build_fitment_query(
+    make_id: Optional[str],
+    model_id: Optional[str],
+    year: Optional[int],
+    trim_id: Optional[str],
+    part_type_id: Optional[str],
+    position_id: Optional[str],
+    drive_id: Optional[str],
+    price_min: Optional[float],
+    price_max: Optional[float],
+    brand_ids: List[str]
+) -> Tuple[str, Dict[str, Any]]:
+    query = f"""
+    SELECT 
+        make_name AS "Make",
+        model_name AS "Model",
+        year AS "Year",
+        trim_name AS "Trim",
+        brand_name AS "Brand",
+        parttype_name AS "Part Type",
+        position_code AS "Position",
+        drive_code AS "Drive",
+        listing_title AS "Listing Title",
+        price AS "Price"
+    FROM {FITMENT_SOURCE}
+    WHERE 1=1
+    """
+    
+    params = {}
+    
+    if make_id and make_id != "None" and make_id != "":
+        query += " AND make_id = :make_id"
+        params["make_id"] = int(make_id)
+    
+    if model_id and model_id != "None" and model_id != "":
+        query += " AND model_id = :model_id"
+        params["model_id"] = int(model_id)
+    
+    if year is not None and year != 0:
+        query += " AND year = :year"
+        params["year"] = int(year)
+    
+    if trim_id and trim_id != "None" and trim_id != "":
+        query += " AND trim_id = :trim_id"
+        params["trim_id"] = int(trim_id)
+    
+    if part_type_id and part_type_id != "None" and part_type_id != "":
+        query += " AND part_type_id = :part_type_id"
+        params["part_type_id"] = int(part_type_id)
+    
+    if position_id and position_id != "None" and position_id != "":
+        query += " AND position_id = :position_id"
+        params["position_id"] = int(position_id)
+    
+    if drive_id and drive_id != "None" and drive_id != "":
+        query += " AND drive_id = :drive_id"
+        params["drive_id"] = int(drive_id)
+    
+    if brand_ids:
+        valid_brand_ids = [int(bid) for bid in brand_ids if bid and bid != "None" and bid != ""]
+        if valid_brand_ids:
+            query += " AND brand_id IN (" + ",".join([f":brand_id_{i}" for i in range(len(valid_brand_ids))]) + ")"
+            for i, bid in enumerate(valid_brand_ids):
+                params[f"brand_id_{i}"] = bid
+
+    if price_min is not None and price_min > 0:
+        query += " AND (price IS NOT NULL AND price >= :price_min)"
+        params["price_min"] = float(price_min)
+    
+    if price_max is not None and price_max > 0 and price_max < 999999:
+        query += " AND (price IS NOT NULL AND price <= :price_max)"
+        params["price_max"] = float(price_max)
+    
+    query += " ORDER BY make_name, model_name, year, brand_name, price"
+    query += " FETCH FIRST 1000 ROWS ONLY"
+    return query, params
+
+
+EMPTY_RESULT_PREDICTOR = os.getenv("EMPTY_RESULT_PREDICTOR", "1") != "0"
+COMBO_INDEX_TTL = int(os.getenv("COMBO_INDEX_TTL", "300"))
+
+_combo_index: Optional[FitmentComboIndex] = None
+_combo_index_built_at = 0.0
+# Snapshot version the index was built from, None when it was built from the database.
+_combo_index_source: Optional[str] = None
+_combo_index_lock = threading.Lock()
+
+# Tables behind View_NormalizedFitment; a change to any of them drops the combination index.
+COMBO_SOURCE_TABLES = ["make", "model", "trim", "brand", "listing", "listing_fitment"]
+
+# Filter labels in the order the search form presents them; the first filter that empties
+# the result is the one reported.
+COMBO_FILTER_LABELS = {
+    "make_id": "Make",
+    "model_id": "Model",
+    "year": "Year",
+    "trim_id": "Trim",
+    "part_type_id": "Part Type",
+    "position_id": "Position",
+    "drive_id": "Drive",
+    "brand_id": "Brands"
+}
+
+
+def build_combo_index(snapshot: Optional[FitmentSnapshot] = None) -> FitmentComboIndex:
+    """Combination index over the snapshot when one is given, else over FITMENT_SOURCE."""
+    index = FitmentComboIndex()
+    if snapshot is not None:
+        index.build(snapshot.distinct(COMBO_COLUMNS))
+    else:
+        chunks = list(iter_query(f"SELECT DISTINCT {', '.join(COMBO_COLUMNS)} FROM {FITMENT_SOURCE}"))
+        index.build(pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame(columns=COMBO_COLUMNS))
+    logger.info(f"Built fitment combination index with {len(index)} combinations")
+    return index
+
+
+def get_combo_index(refresh: bool = False) -> Tuple[FitmentComboIndex, Optional[str]]:
+    """Distinct fitment combinations and the snapshot version they were built from (None for the database).
+
+    Built from the same source as search_fitment and rebuilt after COMBO_INDEX_TTL or once
+    dropped, which the change feed and delta ingestion do whenever a source table changes.
+    """
+    global _combo_index, _combo_index_built_at, _combo_index_source
+    with _combo_index_lock:
+        if refresh or _combo_index is None or time.monotonic() - _combo_index_built_at > COMBO_INDEX_TTL:
+            snapshot = get_snapshot()
+            _combo_index = build_combo_index(snapshot)
+            _combo_index_source = snapshot.version if snapshot is not None else None
+            _combo_index_built_at = time.monotonic()
+        return _combo_index, _combo_index_source
+
+
+def drop_combo_index() -> None:
+    global _combo_index
+    with _combo_index_lock:
+        _combo_index = None
+
+
+def _drop_combo_index(changes: Dict[str, TableChange]) -> None:
+    drop_combo_index()
+
+
+def _drop_combo_index_on_ingest(changes: Dict[str, Dict[str, pd.DataFrame]]) -> None:
+    drop_combo_index()
+
+
+# Registered after the fitment_denorm refresh, so the rebuild reads the refreshed rows.
+register_table_subscriber(COMBO_SOURCE_TABLES, _drop_combo_index)
+register_change_listener(_drop_combo_index_on_ingest)
+
+
+def predict_empty_search(params: Dict[str, Any]) -> Optional[str]:
+    """A "no results" message when build_fitment_query params cannot match anything, else None.
+
+    Answered from the in-memory combination index without a database call; price filters
+    are not considered. Database-built answers are only given while the change feed runs to
+    drop the index on outside writes, and snapshot-built ones only for the snapshot search reads.
+    """
+    if not EMPTY_RESULT_PREDICTOR:
+        return None
+    filters: Dict[str, List[int]] = {}
+    for col in COMBO_FILTER_LABELS:
+        if col == "brand_id":
+            brand_ids = [int(value) for key, value in params.items() if key.startswith("brand_id_")]
+            if brand_ids:
+                filters[col] = brand_ids
+        elif col in params:
+            filters[col] = [int(params[col])]
+    if not filters:
+        return None
+    try:
+        snapshot = get_snapshot()
+        if snapshot is None and not change_feed.running:
+            return None
+        index, source = get_combo_index()
+        if not len(index):
+            return None
+        if source != (snapshot.version if snapshot is not None else None):
+            # Built before the snapshot moved: the combination may exist now, so let the query decide.
+            drop_combo_index()
+            return None
+        explanation = index.explain_empty(filters)
+        if explanation is None:
+            return None
+    except Exception as e:
+        logger.error(f"Empty-result prediction failed, querying instead: {e}")
+        return None
+    labels = [COMBO_FILTER_LABELS[col] for col in filters]
+    blocking = COMBO_FILTER_LABELS[explanation["blocking"]]
+    earlier = labels[:labels.index(blocking)]
+    msg = "No results found matching your criteria."
+    if earlier:
+        verb = "matches" if len(earlier) == 1 else "match"
+        msg += f"\n\n{' + '.join(earlier)} {verb} fitment data, but nothing is left once {blocking} is added."
+    else:
+        msg += f"\n\nNo fitment data exists for the selected {blocking}."
+    if len(labels) == 1:
+        return msg
+    relaxable = [COMBO_FILTER_LABELS[col] for col, left in explanation["without"].items() if left]
+    if relaxable:
+        msg += f"\n\nClearing just one of these filters would give results: {', '.join(relaxable)}."
+    else:
+        msg += "\n\nClearing any single filter is not enough; at least two filters conflict."
+    return msg
+
+
 def search_fitment(
     make_id: Optional[str],
     model_id: Optional[str],
@@ -207,69 +1069,23 @@ def search_fitment(
     brand_ids: List[str]
 ) -> pd.DataFrame:
     try:
-        query = """
-        SELECT 
-            make_name AS "Make",
-            model_name AS "Model",
-            year AS "Year",
-            trim_name AS "Trim",
-            brand_name AS "Brand",
-            parttype_name AS "Part Type",
-            position_code AS "Position",
-            drive_code AS "Drive",
-            listing_title AS "Listing Title",
-            price AS "Price"
-        FROM View_NormalizedFitment
-        WHERE 1=1
-        """
-        
-        params = {}
-        
-        if make_id and make_id != "None" and make_id != "":
-            query += " AND make_id = :make_id"
-            params["make_id"] = int(make_id)
-        
-        if model_id and model_id != "None" and model_id != "":
-            query += " AND model_id = :model_id"
-            params["model_id"] = int(model_id)
-        
-        if year is not None and year != 0:
-            query += " AND year = :year"
-            params["year"] = int(year)
-        
-        if trim_id and trim_id != "None" and trim_id != "":
-            query += " AND trim_id = :trim_id"
-            params["trim_id"] = int(trim_id)
-        
-        if part_type_id and part_type_id != "None" and part_type_id != "":
-            query += " AND part_type_id = :part_type_id"
-            params["part_type_id"] = int(part_type_id)
-        
-        if position_id and position_id != "None" and position_id != "":
-            query += " AND position_id = :position_id"
-            params["position_id"] = int(position_id)
-        
-        if drive_id and drive_id != "None" and drive_id != "":
-            query += " AND drive_id = :drive_id"
-            params["drive_id"] = int(drive_id)
-        
-        if brand_ids:
-            valid_brand_ids = [int(bid) for bid in brand_ids if bid and bid != "None" and bid != ""]
-            if valid_brand_ids:
-                query += " AND brand_id IN (" + ",".join([f":brand_id_{i}" for i in range(len(valid_brand_ids))]) + ")"
-                for i, bid in enumerate(valid_brand_ids):
-                    params[f"brand_id_{i}"] = bid
-
-        if price_min is not None and price_min > 0:
-            query += " AND (price IS NOT NULL AND price >= :price_min)"
-            params["price_min"] = float(price_min)
+        query, params = build_fitment_query(
+            make_id, model_id, year, trim_id, part_type_id,
+            position_id, drive_id, price_min, price_max, brand_ids
+        )
         
-        if price_max is not None and price_max > 0 and price_max < 999999:
-            query += " AND (price IS NOT NULL AND price <= :price_max)"
-            params["price_max"] = float(price_max)
+        empty_message = predict_empty_search(params)
+        if empty_message is not None:
+            logger.info(f"Search with params {params} predicted empty without querying")
+            return pd.DataFrame({"Message": [empty_message]})
         
-        query += " ORDER BY make_name, model_name, year, brand_name, price"
-        query += " FETCH FIRST 1000 ROWS ONLY"
+        snapshot = get_snapshot()
+        if snapshot is not None:
+            df = snapshot.search(params)
+            logger.info(f"Snapshot {snapshot.version} search returned {len(df)} rows")
+            if df.empty:
+                return pd.DataFrame({"Message": ["No results found matching your criteria."]})
+            return df
         
         logger.info(f"Executing fitment search with params: {params}")
         logger.info(f"Query: {query}")
@@ -279,7 +1095,7 @@ def search_fitment(
         if df.empty:
             try:
                 if make_id:
-                    diag_query = "SELECT COUNT(*) as cnt FROM View_NormalizedFitment WHERE make_id = :make_id"
+                    diag_query = f"SELECT COUNT(*) as cnt FROM {FITMENT_SOURCE} WHERE make_id = :make_id"
                     diag_params = {"make_id": int(make_id)}
                     if model_id:
                         diag_query += " AND model_id = :model_id"
@@ -372,6 +1188,45 @@ def search_fitment(
         return pd.DataFrame({"Error": [str(e)]})
 
 
+def build_coverage_query(
+    make_id: Optional[str],
+    model_id: Optional[str],
+    year: Optional[int],
+    part_type_id: Optional[str]
+) -> Tuple[str, Dict[str, Any]]:
+    query = f"""
+    SELECT 
+        brand_name AS "Brand Name",
+        parttype_name AS "Part Type",
+        COUNT(*) AS "Listing Count",
+        MIN(price) AS "Cheapest Price"
+    FROM {FITMENT_SOURCE}
+    WHERE 1=1
+    """
+    
+    params = {}
+    
+    if make_id and make_id != "None" and make_id != "":
+        query += " AND make_id = :make_id"
+        params["make_id"] = int(make_id)
+    
+    if model_id and model_id != "None" and model_id != "":
+        query += " AND model_id = :model_id"
+        params["model_id"] = int(model_id)
+    
+    if year is not None and year != 0:
+        query += " AND year = :year"
+        params["year"] = int(year)
+    
+    if part_type_id and part_type_id != "None" and part_type_id != "":
+        query += " AND part_type_id = :part_type_id"
+        params["part_type_id"] = int(part_type_id)
+    
+    query += " GROUP BY brand_name, parttype_name"
+    query += " ORDER BY brand_name, parttype_name"
+    return query, params
+
+
 def compute_coverage(
     make_id: Optional[str],
     model_id: Optional[str],
@@ -379,38 +1234,10 @@ def compute_coverage(
     part_type_id: Optional[str]
 ) -> pd.DataFrame:
     try:
-        query = """
-        SELECT 
-            brand_name AS "Brand Name",
-            parttype_name AS "Part Type",
-            COUNT(*) AS "Listing Count",
-            MIN(price) AS "Cheapest Price"
-        FROM View_NormalizedFitment
-        WHERE 1=1
-        """
-        
-        params = {}
-        
-        if make_id and make_id != "None" and make_id != "":
-            query += " AND make_id = :make_id"
-            params["make_id"] = int(make_id)
-        
-        if model_id and model_id != "None" and model_id != "":
-            query += " AND model_id = :model_id"
-            params["model_id"] = int(model_id)
-        
-        if year is not None and year != 0:
-            query += " AND year = :year"
-            params["year"] = int(year)
-        
-        if part_type_id and part_type_id != "None" and part_type_id != "":
-            query += " AND part_type_id = :part_type_id"
-            params["part_type_id"] = int(part_type_id)
-        
-        query += " GROUP BY brand_name, parttype_name"
-        query += " ORDER BY brand_name, parttype_name"
+        query, params = build_coverage_query(make_id, model_id, year, part_type_id)
         
-        df = execute_query(query, params)
+        snapshot = get_snapshot()
+        df = snapshot.coverage(params) if snapshot is not None else execute_query(query, params)
         
         if df.empty:
             return pd.DataFrame({"Message": ["No coverage data found matching your criteria."]})
@@ -421,20 +1248,958 @@ def compute_coverage(
         return pd.DataFrame({"Error": [str(e)]})
 
 
-def load_alias_collisions() -> pd.DataFrame:
+COVERAGE_GAP_TTL = int(os.getenv("COVERAGE_GAP_TTL", "3600"))
+COVERAGE_GAP_MAX_DIRTY_TRIMS = 5000
+COVERAGE_GAP_DISPLAY_ROWS = 1000
+COVERAGE_GAP_EXPORT_ROWS = 1000000
+
+_coverage_matrix: Optional[CoverageMatrix] = None
+_coverage_matrix_built_at = 0.0
+
+COVERAGE_CELLS_SQL = """
+SELECT lf.trim_id, l.part_type_id, COUNT(DISTINCT lf.listing_id) AS listings
+FROM listing_fitment lf
+JOIN listing l ON l.listing_id = lf.listing_id
+{where}
+GROUP BY lf.trim_id, l.part_type_id
+"""
+
+COVERAGE_VEHICLES_SQL = """
+SELECT mk.make_id, mk.make_name, md.model_id, md.model_name, t.year, t.trim_id, t.trim_name
+FROM trim t
+JOIN model md ON md.model_id = t.model_id
+JOIN make mk ON mk.make_id = md.make_id
+"""
+
+COVERAGE_GAP_LABELS = {
+    "make_name": "Make",
+    "model_name": "Model",
+    "year": "Year",
+    "trim_name": "Trim",
+    "parttype_name": "Part Type"
+}
+
+
+def build_coverage_matrix() -> CoverageMatrix:
+    matrix = CoverageMatrix()
+    chunks = list(iter_query(COVERAGE_CELLS_SQL.format(where="")))
+    matrix.build(
+        pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame(columns=CELL_COLUMNS),
+        execute_query(COVERAGE_VEHICLES_SQL),
+        execute_query("SELECT part_type_id, parttype_name FROM part_type")
+    )
+    logger.info(f"Built coverage matrix: {len(matrix)} covered cells over {len(matrix.vehicles)} trims "
+                f"and {len(matrix.part_types)} part types")
+    return matrix
+
+
+def get_coverage_matrix(refresh: bool = False) -> CoverageMatrix:
+    """Trim × part type coverage, kept current by ingestion change sets and rebuilt after COVERAGE_GAP_TTL."""
+    global _coverage_matrix, _coverage_matrix_built_at
+    if refresh or _coverage_matrix is None or time.monotonic() - _coverage_matrix_built_at > COVERAGE_GAP_TTL:
+        _coverage_matrix = build_coverage_matrix()
+        _coverage_matrix_built_at = time.monotonic()
+    return _coverage_matrix
+
+
+def _update_coverage_matrix(changes: Dict[str, Dict[str, pd.DataFrame]]) -> None:
+    """Recount the trims a change set touched: fitment rows added or removed, and every
+    trim fitted by an updated listing (its part type may have changed)."""
+    global _coverage_matrix
+    if _coverage_matrix is None:
+        return
+    dirty: Set[int] = set()
+    for kind in ("inserted", "deleted"):
+        df = changes.get("listing_fitment", {}).get(kind)
+        if df is not None and not df.empty:
+            dirty |= set(df['trim_id'].astype(int))
+    dialect = get_dialect()
     try:
-        query = """
-        SELECT 
-            alias_text AS "Alias Text",
-            LISTAGG(DISTINCT canonical_value, ', ') WITHIN GROUP (ORDER BY canonical_value) AS "Canonical Values",
-            COUNT(DISTINCT canonical_value) AS "Collision Count"
-        FROM brand_alias
-        WHERE canonical_value IS NOT NULL
-        GROUP BY alias_text
-        HAVING COUNT(DISTINCT canonical_value) > 1
-        ORDER BY "Collision Count" DESC, alias_text
-        """
-        
+        updated = changes.get("listing", {}).get("updated")
+        if updated is not None and not updated.empty:
+            trims = execute_query(
+                f"SELECT DISTINCT trim_id FROM listing_fitment WHERE listing_id IN ({dialect.id_list('listing_ids')})",
+                {"listing_ids": json.dumps(sorted(set(updated['listing_id'].astype(int))))}
+            )
+            dirty |= set(trims['trim_id'].astype(int))
+        if not dirty:
+            return
+        if len(dirty) > COVERAGE_GAP_MAX_DIRTY_TRIMS:
+            # Recounting most of the catalog trim by trim costs more than one full rebuild.
+            _coverage_matrix = None
+            return
+        cells = execute_query(
+            COVERAGE_CELLS_SQL.format(where=f"WHERE lf.trim_id IN ({dialect.id_list('trim_ids')})"),
+            {"trim_ids": json.dumps(sorted(dirty))}
+        )
+        _coverage_matrix.replace_trims(dirty, cells)
+    except Exception:
+        # Stale cells would report gaps that are filled (or hide new ones); rebuild on next use instead.
+        _coverage_matrix = None
+        raise
+
+
+register_change_listener(_update_coverage_matrix)
+
+
+def _drop_coverage_matrix(changes: Dict[str, TableChange]) -> None:
+    global _coverage_matrix
+    _coverage_matrix = None
+
+
+register_table_subscriber(["make", "model", "trim", "listing", "listing_fitment"], _drop_coverage_matrix)
+
+
+def coverage_gaps(
+    make_id: Optional[str],
+    model_id: Optional[str],
+    part_type_id: Optional[str],
+    granularity: str = "Trim"
+) -> Tuple[str, pd.DataFrame, Optional[str]]:
+    """Vehicles with no listings of a part type: (summary, first rows for display, CSV export path)."""
+    try:
+        if not (make_id and make_id != "None") and not (part_type_id and part_type_id != "None"):
+            return "Select a make or a part type.", pd.DataFrame(), None
+        by_model_year = granularity == "Model Year"
+        gaps = get_coverage_matrix().gaps(
+            make_id=int(make_id) if make_id and make_id != "None" else None,
+            model_id=int(model_id) if model_id and model_id != "None" else None,
+            part_type_ids=[int(part_type_id)] if part_type_id and part_type_id != "None" else None,
+            by_model_year=by_model_year
+        )
+        if gaps.empty:
+            return "No coverage gaps: every vehicle has listings for the selected part types.", pd.DataFrame(), None
+
+        columns = [col for col in COVERAGE_GAP_LABELS if col in gaps.columns]
+        report = gaps[columns].rename(columns=COVERAGE_GAP_LABELS)
+        vehicles = len(gaps.drop_duplicates(subset=["model_id", "year"] if by_model_year else ["trim_id"]))
+        noun = "model years" if by_model_year else "trims"
+        summary = (f"**{len(report)}** gaps: {vehicles} {noun} × "
+                   f"{gaps['part_type_id'].nunique()} part types with no listings.")
+        if len(report) > COVERAGE_GAP_EXPORT_ROWS:
+            summary += f" The CSV export holds the first {COVERAGE_GAP_EXPORT_ROWS}."
+        elif len(report) > COVERAGE_GAP_DISPLAY_ROWS:
+            summary += f" Showing the first {COVERAGE_GAP_DISPLAY_ROWS}; download the CSV for all of them."
+
+        with tempfile.NamedTemporaryFile("w", suffix=".csv", prefix="coverage-gaps-", delete=False,
+                                         newline="", encoding="utf-8") as f:
+            report.head(COVERAGE_GAP_EXPORT_ROWS).to_csv(f, index=False)
+        return summary, report.head(COVERAGE_GAP_DISPLAY_ROWS), f.name
+    except Exception as e:
+        logger.error(f"Coverage gap report failed: {e}")
+        return "", pd.DataFrame({"Error": [str(e)]}), None
+
+
+BRAND_OVERLAP_TTL = int(os.getenv("BRAND_OVERLAP_TTL", "600"))
+BRAND_OVERLAP_CACHE_SIZE = 32
+BRAND_OVERLAP_DISPLAY_ROWS = 1000
+
+# (make_id, part_type_id) -> (built_at, overlap pairs); dropped whole on any ingestion change.
+_brand_overlap_cache: Dict[Tuple[Optional[int], Optional[int]], Tuple[float, pd.DataFrame]] = {}
+_brand_overlap_lock = threading.Lock()
+_brand_overlap_generation = 0
+
+
+def build_brand_overlap(make_id: Optional[int], part_type_id: Optional[int]) -> pd.DataFrame:
+    query = f"SELECT DISTINCT {', '.join(INCIDENCE_COLUMNS)} FROM {FITMENT_SOURCE} WHERE 1=1"
+    params: Dict[str, Any] = {}
+    if make_id is not None:
+        query += " AND make_id = :make_id"
+        params["make_id"] = make_id
+    if part_type_id is not None:
+        query += " AND part_type_id = :part_type_id"
+        params["part_type_id"] = part_type_id
+    chunks = list(iter_query(query, params))
+    incidence = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame(columns=INCIDENCE_COLUMNS)
+    overlap = brand_overlap(incidence)
+    logger.info(f"Built brand overlap for make_id={make_id}, part_type_id={part_type_id}: "
+                f"{len(incidence)} brand slots, {len(overlap)} overlapping pairs")
+    return overlap
+
+
+def get_brand_overlap(make_id: Optional[int], part_type_id: Optional[int], refresh: bool = False) -> pd.DataFrame:
+    """Brand pairs sharing fitment slots for one filter set, cached for BRAND_OVERLAP_TTL seconds."""
+    key = (make_id, part_type_id)
+    with _brand_overlap_lock:
+        cached = _brand_overlap_cache.get(key)
+        generation = _brand_overlap_generation
+    if not refresh and cached is not None and time.monotonic() - cached[0] <= BRAND_OVERLAP_TTL:
+        return cached[1]
+    overlap = build_brand_overlap(make_id, part_type_id)
+    with _brand_overlap_lock:
+        if generation != _brand_overlap_generation:
+            # Ingestion changed the data while this was built; serve it but do not cache it.
+            return overlap
+        _brand_overlap_cache.pop(key, None)
+        _brand_overlap_cache[key] = (time.monotonic(), overlap)
+        while len(_brand_overlap_cache) > BRAND_OVERLAP_CACHE_SIZE:
+            del _brand_overlap_cache[next(iter(_brand_overlap_cache))]
+    return overlap
+
+
+def _clear_brand_overlap() -> None:
+    global _brand_overlap_generation
+    with _brand_overlap_lock:
+        _brand_overlap_generation += 1
+        _brand_overlap_cache.clear()
+
+
+def _invalidate_brand_overlap(changes: Dict[str, Dict[str, pd.DataFrame]]) -> None:
+    if any(not df.empty for kinds in changes.values() for df in kinds.values()):
+        _clear_brand_overlap()
+
+
+register_change_listener(_invalidate_brand_overlap)
+
+
+def _drop_brand_overlap(changes: Dict[str, TableChange]) -> None:
+    _clear_brand_overlap()
+
+
+register_table_subscriber(["make", "brand", "listing", "listing_fitment"], _drop_brand_overlap)
+
+
+def compute_brand_overlap(
+    make_id: Optional[str],
+    part_type_id: Optional[str],
+    brand_id: Optional[str] = None
+) -> Tuple[str, pd.DataFrame]:
+    """Brand × brand overlap on (trim, part type, position) slots, optionally for pairs with one brand."""
+    try:
+        overlap = get_brand_overlap(
+            int(make_id) if make_id and make_id != "None" else None,
+            int(part_type_id) if part_type_id and part_type_id != "None" else None
+        )
+        if brand_id and brand_id != "None":
+            overlap = overlap[(overlap["brand_a_id"] == int(brand_id)) | (overlap["brand_b_id"] == int(brand_id))]
+        if overlap.empty:
+            return "No brands share a fitment slot for these filters.", pd.DataFrame()
+
+        top = overlap.nlargest(BRAND_OVERLAP_DISPLAY_ROWS, "shared_slots")
+        names = execute_query("SELECT brand_id, brand_name FROM brand").set_index("brand_id")["brand_name"]
+        union = top["brand_a_slots"] + top["brand_b_slots"] - top["shared_slots"]
+        report = pd.DataFrame({
+            "Brand A": top["brand_a_id"].map(names).to_numpy(),
+            "Brand B": top["brand_b_id"].map(names).to_numpy(),
+            "Shared Slots": top["shared_slots"].to_numpy(),
+            "Brand A Slots": top["brand_a_slots"].to_numpy(),
+            "Brand B Slots": top["brand_b_slots"].to_numpy(),
+            "Jaccard": (top["shared_slots"] / union).round(3).to_numpy()
+        })
+        summary = f"**{len(overlap)}** brand pairs share at least one (trim, part type, position) slot."
+        if len(overlap) > BRAND_OVERLAP_DISPLAY_ROWS:
+            summary += f" Showing the {BRAND_OVERLAP_DISPLAY_ROWS} with the most shared slots."
+        return summary, report
+    except Exception as e:
+        logger.error(f"Brand overlap computation failed: {e}")
+        return "", pd.DataFrame({"Error": [str(e)]})
+
+
+FACET_DIMENSIONS: Dict[str, Tuple[str, str]] = {
+    "part_type": ("part_type_id", "parttype_name"),
+    "position": ("position_id", "position_code"),
+    "drive": ("drive_id", "drive_code"),
+    "brand": ("brand_id", "brand_name")
+}
+
+
+def _fitment_predicates(params: Dict[str, Any]) -> Dict[str, str]:
+    """One SQL predicate per filtered column, for the bind params of build_fitment_query."""
+    predicates = {}
+    brand_binds = [f":{key}" for key in params if key.startswith("brand_id_")]
+    for key in params:
+        if key.startswith("brand_id_"):
+            continue
+        if key == "price_min":
+            predicates[key] = "(price IS NOT NULL AND price >= :price_min)"
+        elif key == "price_max":
+            predicates[key] = "(price IS NOT NULL AND price <= :price_max)"
+        else:
+            predicates[key] = f"{key} = :{key}"
+    if brand_binds:
+        predicates["brand_id"] = f"brand_id IN ({','.join(brand_binds)})"
+    return predicates
+
+
+def build_facet_query(
+    make_id: Optional[str],
+    model_id: Optional[str],
+    year: Optional[int],
+    trim_id: Optional[str],
+    part_type_id: Optional[str],
+    position_id: Optional[str],
+    drive_id: Optional[str],
+    price_min: Optional[float],
+    price_max: Optional[float],
+    brand_ids: List[str]
+) -> Tuple[str, Dict[str, Any]]:
+    """Hit counts for every facet value in one pass over the fitment source.
+
+    Vehicle and price filters go in the WHERE clause. Facet filters become 0/1 flag
+    columns, so each facet can count with every filter except its own.
+    """
+    _, params = build_fitment_query(
+        make_id, model_id, year, trim_id, part_type_id,
+        position_id, drive_id, price_min, price_max, brand_ids
+    )
+    predicates = _fitment_predicates(params)
+    facet_columns = [id_col for id_col, _ in FACET_DIMENSIONS.values()]
+    
+    select_columns = ["listing_id"] + [col for dim in FACET_DIMENSIONS.values() for col in dim]
+    select_columns += [
+        f"CASE WHEN {predicate} THEN 1 ELSE 0 END AS f_{col}"
+        for col, predicate in predicates.items() if col in facet_columns
+    ]
+    base = "SELECT " + ", ".join(select_columns) + f" FROM {FITMENT_SOURCE} WHERE 1=1"
+    for col, predicate in predicates.items():
+        if col not in facet_columns:
+            base += f" AND {predicate}"
+    
+    def hits(id_col: str) -> str:
+        others = [f"f_{col} = 1" for col in facet_columns if col != id_col and col in predicates]
+        if not others:
+            return "COUNT(DISTINCT listing_id)"
+        return f"COUNT(DISTINCT CASE WHEN {' AND '.join(others)} THEN listing_id END)"
+    
+    if get_dialect().name == "sqlite":
+        # No GROUPING SETS in SQLite: materialize the filtered rows once and union the groupings.
+        query = f"WITH base AS MATERIALIZED ({base})\n" + "\nUNION ALL\n".join(
+            f"SELECT '{facet}' AS facet, {id_col} AS value_id, {name_col} AS value_name, {hits(id_col)} AS hits"
+            f" FROM base GROUP BY {id_col}, {name_col}"
+            for facet, (id_col, name_col) in FACET_DIMENSIONS.items()
+        )
+        return query, params
+    
+    query = f"""
+    SELECT
+        CASE {' '.join(f"WHEN GROUPING({id_col}) = 0 THEN '{facet}'" for facet, (id_col, _) in FACET_DIMENSIONS.items())} END AS facet,
+        COALESCE({', '.join(id_col for id_col, _ in FACET_DIMENSIONS.values())}) AS value_id,
+        COALESCE({', '.join(name_col for _, name_col in FACET_DIMENSIONS.values())}) AS value_name,
+        CASE {' '.join(f"WHEN GROUPING({id_col}) = 0 THEN {hits(id_col)}" for id_col, _ in FACET_DIMENSIONS.values())} END AS hits
+    FROM ({base})
+    GROUP BY GROUPING SETS ({', '.join(f"({id_col}, {name_col})" for id_col, name_col in FACET_DIMENSIONS.values())})
+    """
+    return query, params
+
+
+def compute_facets(
+    make_id: Optional[str],
+    model_id: Optional[str],
+    year: Optional[int],
+    trim_id: Optional[str],
+    part_type_id: Optional[str],
+    position_id: Optional[str],
+    drive_id: Optional[str],
+    price_min: Optional[float],
+    price_max: Optional[float],
+    brand_ids: List[str]
+) -> Dict[str, Dict[str, int]]:
+    """Distinct-listing hits keyed by facet name, then by value id (as the dropdowns' string values)."""
+    try:
+        query, params = build_facet_query(
+            make_id, model_id, year, trim_id, part_type_id,
+            position_id, drive_id, price_min, price_max, brand_ids
+        )
+        snapshot = get_snapshot()
+        df = snapshot.facets(params, FACET_DIMENSIONS) if snapshot is not None else execute_query(query, params)
+        counts: Dict[str, Dict[str, int]] = {facet: {} for facet in FACET_DIMENSIONS}
+        for _, row in df.iterrows():
+            if row['value_id'] is not None and row['hits']:
+                counts[row['facet']][str(int(row['value_id']))] = int(row['hits'])
+        return counts
+    except Exception as e:
+        logger.error(f"Facet computation failed: {e}")
+        return {}
+
+
+def facet_choices(
+    all_choices: List[Tuple[str, str]],
+    counts: Optional[Dict[str, int]],
+    selected: Any = None
+) -> List[Tuple[str, str]]:
+    """Label choices with hit counts and drop zero-hit values, keeping whatever is selected."""
+    if counts is None:
+        return all_choices
+    if isinstance(selected, list):
+        keep = {str(value) for value in selected}
+    else:
+        keep = {str(selected)} if selected else set()
+    return [
+        (f"{label} ({counts.get(value, 0)})", value)
+        for label, value in all_choices
+        if counts.get(value) or value in keep
+    ]
+
+
+QUERY_PARSER_TTL = int(os.getenv("QUERY_PARSER_TTL", "300"))
+QUERY_PARSE_PATH = "/api/parse-query"
+
+_query_parser: Optional[VehicleQueryParser] = None
+_query_parser_built_at = 0.0
+
+QUERY_PARSER_SOURCES = [
+    ("make", "SELECT make_id AS id, make_name AS name FROM make"),
+    ("model", "SELECT model_id AS id, model_name AS name, make_id FROM model"),
+    ("trim", "SELECT trim_id AS id, trim_name AS name, model_id, year FROM trim"),
+    ("part_type", "SELECT part_type_id AS id, parttype_name AS name FROM part_type"),
+    ("position", "SELECT position_id AS id, position_code AS name FROM position"),
+    ("drive", "SELECT drive_id AS id, drive_code AS name FROM drive_train"),
+    ("brand", "SELECT brand_id AS id, brand_name AS name FROM brand")
+]
+
+
+def build_query_parser() -> VehicleQueryParser:
+    parser = VehicleQueryParser()
+    for kind, query in QUERY_PARSER_SOURCES:
+        df = execute_query(query)
+        for row in df.to_dict('records'):
+            attrs = {k: (int(v) if pd.notna(v) else None) for k, v in row.items() if k not in ('id', 'name')}
+            parser.add(kind, row['id'], row['name'], **attrs)
+    try:
+        aliases = execute_query("SELECT alias_text, canonical_value FROM brand_alias")
+        for row in aliases.itertuples(index=False):
+            parser.add_brand_alias(row.alias_text, row.canonical_value)
+    except Exception as e:
+        logger.warning(f"Brand aliases not loaded into query parser: {e}")
+    return parser
+
+
+def get_query_parser(refresh: bool = False) -> VehicleQueryParser:
+    """Cached parser dictionaries, rebuilt after QUERY_PARSER_TTL seconds; parsing itself never hits the DB."""
+    global _query_parser, _query_parser_built_at
+    if refresh or _query_parser is None or time.monotonic() - _query_parser_built_at > QUERY_PARSER_TTL:
+        _query_parser = build_query_parser()
+        _query_parser_built_at = time.monotonic()
+    return _query_parser
+
+
+def _drop_query_parser(changes: Dict[str, TableChange]) -> None:
+    global _query_parser
+    _query_parser = None
+
+
+register_table_subscriber(["make", "model", "trim", "brand", "brand_alias"], _drop_query_parser)
+
+
+def describe_parsed_query(parsed: Dict[str, Any]) -> str:
+    if not parsed["matches"]:
+        return "Nothing in the query matched a make, model, trim, part type, position, drive or brand."
+    labels = {"part_type": "Part Type", "make": "Make", "model": "Model", "year": "Year",
+              "trim": "Trim", "position": "Position", "drive": "Drive", "brand": "Brand"}
+    text = "**Interpreted as:** " + " · ".join(
+        f"{labels[kind]} {name}" + (f" (from '{typed}')" if typed.lower() != name.lower() else "")
+        for typed, kind, name in parsed["matches"]
+    )
+    if parsed["unmatched"]:
+        text += "\n\n**Ignored:** " + ", ".join(parsed["unmatched"])
+    return text
+
+
+def quick_search(query: str) -> Tuple[str, pd.DataFrame]:
+    if not query or not query.strip():
+        return "", pd.DataFrame({"Message": ["Type a query such as '2019 Civic front brake pads'."]})
+    try:
+        parsed = get_query_parser().parse(query)
+    except Exception as e:
+        logger.error(f"Query parsing failed: {e}")
+        return "", pd.DataFrame({"Error": [str(e)]})
+    logger.info(f"Quick search '{query}' parsed to {parsed['filters']}")
+    return describe_parsed_query(parsed), search_fitment(**parsed["filters"])
+
+
+def parse_query_response(q: str = "") -> Dict[str, Any]:
+    parsed = get_query_parser().parse(q)
+    return {
+        "filters": parsed["filters"],
+        "matches": [{"text": typed, "kind": kind, "name": name} for typed, kind, name in parsed["matches"]],
+        "unmatched": parsed["unmatched"]
+    }
+
+
+TITLE_INDEX_TTL = int(os.getenv("TITLE_INDEX_TTL", "3600"))
+TITLE_SEARCH_LIMIT = 200
+
+_title_index: Optional[TitleIndex] = None
+_title_index_built_at = 0.0
+
+
+def build_title_index() -> TitleIndex:
+    index = TitleIndex()
+    rows: List[Tuple[int, str]] = []
+    for chunk in iter_query("SELECT listing_id, listing_title FROM listing"):
+        rows.extend(chunk.itertuples(index=False, name=None))
+    index.build(rows)
+    logger.info(f"Built listing title index over {len(index)} titles")
+    return index
+
+
+def get_title_index(refresh: bool = False) -> TitleIndex:
+    """In-memory title index, kept current by ingestion change sets and rebuilt after TITLE_INDEX_TTL."""
+    global _title_index, _title_index_built_at
+    if refresh or _title_index is None or time.monotonic() - _title_index_built_at > TITLE_INDEX_TTL:
+        _title_index = build_title_index()
+        _title_index_built_at = time.monotonic()
+    return _title_index
+
+
+def _update_title_index(changes: Dict[str, Dict[str, pd.DataFrame]]) -> None:
+    if _title_index is not None and "listing" in changes:
+        _title_index.apply_listing_changes(changes["listing"])
+
+
+register_change_listener(_update_title_index)
+
+
+def _drop_title_index(changes: Dict[str, TableChange]) -> None:
+    global _title_index
+    _title_index = None
+
+
+register_table_subscriber(["listing"], _drop_title_index)
+
+
+FITMENT_INDEX_TTL = int(os.getenv("FITMENT_INDEX_TTL", "3600"))
+FITMENT_CHECK_PATH = "/api/fitment-check"
+FITMENT_CHECK_MAX_BATCH = 10000
+
+_fitment_index: Optional[FitmentIndex] = None
+_fitment_index_built_at = 0.0
+
+
+def build_fitment_index() -> FitmentIndex:
+    index = FitmentIndex()
+    chunks = list(iter_query("SELECT listing_id, trim_id, position_id, drive_id FROM listing_fitment"))
+    index.build(pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame(columns=KEY_FIELDS))
+    logger.info(f"Built fitment membership index over {len(index)} listing_fitment rows")
+    return index
+
+
+def get_fitment_index(refresh: bool = False) -> FitmentIndex:
+    """In-memory listing_fitment membership index, kept current by ingestion change sets and rebuilt after FITMENT_INDEX_TTL."""
+    global _fitment_index, _fitment_index_built_at
+    if refresh or _fitment_index is None or time.monotonic() - _fitment_index_built_at > FITMENT_INDEX_TTL:
+        _fitment_index = build_fitment_index()
+        _fitment_index_built_at = time.monotonic()
+    return _fitment_index
+
+
+def _update_fitment_index(changes: Dict[str, Dict[str, pd.DataFrame]]) -> None:
+    if _fitment_index is not None:
+        _fitment_index.apply_changes(changes)
+
+
+register_change_listener(_update_fitment_index)
+
+
+def _drop_fitment_index(changes: Dict[str, TableChange]) -> None:
+    global _fitment_index
+    _fitment_index = None
+
+
+register_table_subscriber(["listing_fitment"], _drop_fitment_index)
+
+
+def check_fitment(checks: List[Dict[str, Any]]) -> List[bool]:
+    """Answer "does listing_id fit trim_id (in position_id, with drive_id)?" for each check.
+
+    position_id and drive_id are optional; a missing one matches any value.
+    """
+    columns = {field: [] for field in KEY_FIELDS}
+    for check in checks:
+        for field in KEY_FIELDS:
+            value = check.get(field)
+            if value is None and field in ("listing_id", "trim_id"):
+                raise ValueError(f"Every check needs {field}")
+            columns[field].append(ANY if value is None else int(value))
+    index = get_fitment_index()
+    if len(checks) == 1:
+        return [index.fits(*(columns[field][0] for field in KEY_FIELDS))]
+    return index.check(*(columns[field] for field in KEY_FIELDS)).tolist()
+
+
+def fitment_check_response(
+    listing_id: int,
+    trim_id: int,
+    position_id: Optional[int] = None,
+    drive_id: Optional[int] = None
+) -> Dict[str, Any]:
+    check = {"listing_id": listing_id, "trim_id": trim_id, "position_id": position_id, "drive_id": drive_id}
+    return {**check, "fits": check_fitment([check])[0]}
+
+
+async def fitment_check_batch_response(request: Request) -> Dict[str, Any]:
+    """POST {"checks": [{"listing_id", "trim_id", "position_id"?, "drive_id"?}, ...]} -> {"fits": [bool, ...]}."""
+    try:
+        checks = (await request.json())["checks"]
+    except Exception:
+        raise HTTPException(status_code=400, detail='Expected a JSON body like {"checks": [{"listing_id": 1, "trim_id": 2}]}')
+    if len(checks) > FITMENT_CHECK_MAX_BATCH:
+        raise HTTPException(status_code=413, detail=f"At most {FITMENT_CHECK_MAX_BATCH} checks per request")
+    try:
+        return {"fits": check_fitment(checks)}
+    except (ValueError, TypeError, AttributeError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def fitment_listing_ids(params: Dict[str, Any]) -> Optional[Set[int]]:
+    """Listing ids matching build_fitment_query bind params, or None when nothing is filtered."""
+    if not params:
+        return None
+    snapshot = get_snapshot()
+    if snapshot is not None:
+        return set(snapshot.listing_ids(params))
+    query = f"SELECT DISTINCT listing_id FROM {FITMENT_SOURCE} WHERE " + " AND ".join(
+        _fitment_predicates(params).values()
+    )
+    return set(execute_query(query, params)['listing_id'].astype(int))
+
+
+def search_listing_titles(
+    text: str,
+    use_fitment_filters: bool,
+    make_id: Optional[str],
+    model_id: Optional[str],
+    year: Optional[int],
+    trim_id: Optional[str],
+    part_type_id: Optional[str],
+    position_id: Optional[str],
+    drive_id: Optional[str],
+    price_min: Optional[float],
+    price_max: Optional[float],
+    brand_ids: List[str]
+) -> pd.DataFrame:
+    if not text or not text.strip():
+        return pd.DataFrame({"Message": ["Enter text to find in listing titles."]})
+    try:
+        allowed_ids = None
+        if use_fitment_filters:
+            _, params = build_fitment_query(
+                make_id, model_id, year, trim_id, part_type_id,
+                position_id, drive_id, price_min, price_max, brand_ids
+            )
+            allowed_ids = fitment_listing_ids(params)
+        
+        hits = get_title_index().search(text, limit=TITLE_SEARCH_LIMIT, allowed_ids=allowed_ids)
+        if not hits:
+            return pd.DataFrame({"Message": [f"No listing titles mention '{text.strip()}'."]})
+        
+        binds = {f"listing_id_{i}": listing_id for i, (listing_id, _) in enumerate(hits)}
+        details = execute_query(
+            f"""
+            SELECT l.listing_id, b.brand_name, pt.parttype_name, l.price, l.mpn
+            FROM listing l
+            JOIN brand b ON l.brand_id = b.brand_id
+            JOIN part_type pt ON l.part_type_id = pt.part_type_id
+            WHERE l.listing_id IN ({",".join(f":{key}" for key in binds)})
+            """,
+            binds
+        ).set_index('listing_id')
+        index = get_title_index()
+        rows = []
+        for listing_id, score in hits:
+            if listing_id not in details.index:
+                continue
+            detail = details.loc[listing_id]
+            rows.append({
+                "Listing ID": listing_id,
+                "Listing Title": index.title(listing_id),
+                "Brand": detail['brand_name'],
+                "Part Type": detail['parttype_name'],
+                "Price": detail['price'],
+                "MPN": detail['mpn'],
+                "Score": score
+            })
+        return pd.DataFrame(rows)
+    except Exception as e:
+        logger.error(f"Title search failed: {e}")
+        return pd.DataFrame({"Error": [str(e)]})
+
+
+REVERSE_LOOKUP_MAX_LISTINGS = 10000
+
+REVERSE_FITMENT_SQL = """
+SELECT
+    lf.listing_id, l.listing_title,
+    t.make_id, mk.make_name, t.model_id, md.model_name, t.year, t.trim_name,
+    p.position_code, d.drive_code
+FROM listing_fitment lf
+JOIN listing l ON l.listing_id = lf.listing_id
+JOIN trim t ON t.trim_id = lf.trim_id
+JOIN make mk ON mk.make_id = t.make_id
+JOIN model md ON md.model_id = t.model_id
+JOIN position p ON p.position_id = lf.position_id
+JOIN drive_train d ON d.drive_id = lf.drive_id
+WHERE lf.listing_id IN ({id_list})
+"""
+
+
+def _joined(rows: pd.DataFrame, key: List[str], column: str) -> pd.Series:
+    values = rows[key + [column]].dropna().drop_duplicates().sort_values(key + [column])
+    return values.groupby(key)[column].agg(", ".join)
+
+
+def collapse_vehicle_fitment(rows: pd.DataFrame) -> pd.DataFrame:
+    """One row per listing and model with year ranges ("2006-2011, 2014"), trims, positions and drives."""
+    key = ['listing_id', 'make_name', 'model_name']
+    runs = year_runs(rows, key)
+    known = runs['year_from'].notna()
+    year_from = runs['year_from'].astype('Int64').astype(str)
+    year_to = runs['year_to'].astype('Int64').astype(str)
+    runs['years'] = year_from.where(year_from == year_to, year_from + "-" + year_to).where(known, "no year")
+    runs = runs.sort_values(key + ['year_from'], na_position='last')
+    grouped = pd.DataFrame({"years": runs.groupby(key, sort=False)['years'].agg(", ".join)})
+    for column in ['trim_name', 'position_code', 'drive_code']:
+        grouped[column] = _joined(rows, key, column)
+    titles = rows.drop_duplicates('listing_id').set_index('listing_id')['listing_title']
+    result = grouped.reset_index()
+    result.insert(1, 'listing_title', result['listing_id'].map(titles))
+    result = result.sort_values(key).rename(columns={
+        "listing_id": "Listing ID", "listing_title": "Listing Title", "make_name": "Make",
+        "model_name": "Model", "years": "Years", "trim_name": "Trims",
+        "position_code": "Positions", "drive_code": "Drives"
+    })
+    return result.reset_index(drop=True)
+
+
+def reverse_fitment_lookup(listing_ids_text: str) -> Tuple[str, pd.DataFrame]:
+    """Vehicles each listing fits, for up to REVERSE_LOOKUP_MAX_LISTINGS ids fetched in one query."""
+    listing_ids = list(dict.fromkeys(int(token) for token in re.findall(r"\d+", listing_ids_text or "")))
+    if not listing_ids:
+        return "", pd.DataFrame({"Message": ["Enter one or more listing IDs (separated by commas, spaces or new lines)."]})
+    if len(listing_ids) > REVERSE_LOOKUP_MAX_LISTINGS:
+        return "", pd.DataFrame({"Message": [f"At most {REVERSE_LOOKUP_MAX_LISTINGS} listing IDs per lookup ({len(listing_ids)} given)."]})
+    try:
+        query = REVERSE_FITMENT_SQL.format(id_list=get_dialect().id_list("listing_ids"))
+        rows = execute_query(query, {"listing_ids": json.dumps(listing_ids)})
+        found = set(rows['listing_id'].astype(int))
+        missing = [lid for lid in listing_ids if lid not in found]
+        summary = f"**{len(listing_ids) - len(missing)}** of {len(listing_ids)} listings have fitment."
+        if missing:
+            shown = ", ".join(str(lid) for lid in missing[:50])
+            summary += f" No fitment for: {shown}" + (" …" if len(missing) > 50 else "")
+        if rows.empty:
+            return summary, pd.DataFrame({"Message": ["None of these listings has any fitment rows."]})
+        return summary, collapse_vehicle_fitment(rows)
+    except Exception as e:
+        logger.error(f"Reverse fitment lookup failed: {e}")
+        return "", pd.DataFrame({"Error": [str(e)]})
+
+
+APP_VERSION = os.getenv("APP_VERSION", "dev")
+
+INSERT_QUERY_PLAN_SQL = """
+INSERT INTO app_query_plan (
+    shape_id, query_name, app_version, sql_id, child_number, plan_hash_value,
+    elapsed_ms, buffer_gets, rows_processed, sql_text, bind_values, plan_text
+) VALUES (
+    :shape_id, :query_name, :app_version, :sql_id, :child_number, :plan_hash_value,
+    :elapsed_ms, :buffer_gets, :rows_processed, :sql_text, :bind_values, :plan_text
+)
+"""
+
+
+def query_shape_id(query: str) -> str:
+    normalized = " ".join(query.split())
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()[:16]
+
+
+def capture_query_plan(query_name: str, query: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    """Run the exact app SQL with row-source statistics on and read its plan back by sql_id."""
+    if get_dialect().name == "sqlite":
+        return _capture_sqlite_plan(query_name, query, params)
+    pool = get_pool()
+    with pool.acquire() as connection:
+        with connection.cursor() as cursor:
+            # statistics_level=ALL keeps the SQL text (and so the sql_id) identical to what
+            # the app runs, unlike a GATHER_PLAN_STATISTICS hint.
+            cursor.execute("ALTER SESSION SET statistics_level = ALL")
+            try:
+                started = time.perf_counter()
+                cursor.execute(query, params)
+                rows = cursor.fetchall()
+                elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+                cursor.execute(
+                    "SELECT prev_sql_id, prev_child_number FROM v$session "
+                    "WHERE sid = SYS_CONTEXT('USERENV', 'SID')"
+                )
+                sql_id, child_number = cursor.fetchone()
+            finally:
+                cursor.execute("ALTER SESSION SET statistics_level = TYPICAL")
+
+            cursor.execute(
+                "SELECT plan_table_output FROM TABLE("
+                "DBMS_XPLAN.DISPLAY_CURSOR(:sql_id, :child_number, 'ALLSTATS LAST +PEEKED_BINDS'))",
+                {"sql_id": sql_id, "child_number": child_number}
+            )
+            plan_text = "\n".join(str(row[0]) for row in cursor.fetchall() if row[0] is not None)
+
+            cursor.execute(
+                "SELECT plan_hash_value, executions, elapsed_time, cpu_time, buffer_gets, "
+                "disk_reads, rows_processed FROM v$sql "
+                "WHERE sql_id = :sql_id AND child_number = :child_number",
+                {"sql_id": sql_id, "child_number": child_number}
+            )
+            stats_row = cursor.fetchone()
+            stats_columns = [desc[0].lower() for desc in cursor.description]
+
+    stats = dict(zip(stats_columns, stats_row)) if stats_row else {}
+    return {
+        "query_name": query_name,
+        "shape_id": query_shape_id(query),
+        "sql_text": query,
+        "binds": params,
+        "sql_id": sql_id,
+        "child_number": child_number,
+        "plan_hash_value": stats.get("plan_hash_value"),
+        "elapsed_ms": elapsed_ms,
+        "rows_returned": len(rows),
+        "stats": stats,
+        "plan_text": plan_text
+    }
+
+
+def _capture_sqlite_plan(query_name: str, query: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    pool = get_pool()
+    with pool.acquire() as connection:
+        with connection.cursor() as cursor:
+            started = time.perf_counter()
+            cursor.execute(query, params)
+            rows = cursor.fetchall()
+            elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+            cursor.execute("EXPLAIN QUERY PLAN " + query, params)
+            plan_text = "\n".join(f"{row[0]:>4} {row[1]:>4}  {row[3]}" for row in cursor.fetchall())
+
+    return {
+        "query_name": query_name,
+        "shape_id": query_shape_id(query),
+        "sql_text": query,
+        "binds": params,
+        "sql_id": None,
+        "child_number": None,
+        "plan_hash_value": int(hashlib.sha1(plan_text.encode("utf-8")).hexdigest()[:8], 16),
+        "elapsed_ms": elapsed_ms,
+        "rows_returned": len(rows),
+        "stats": {"rows_processed": len(rows)},
+        "plan_text": plan_text
+    }
+
+
+def store_query_plan(capture: Dict[str, Any]) -> Optional[int]:
+    """Persist a capture and return the previous plan_hash_value seen for the same shape."""
+    previous = execute_query(
+        """
+        SELECT plan_hash_value, app_version
+        FROM app_query_plan
+        WHERE shape_id = :shape_id
+        ORDER BY captured_at DESC
+        FETCH FIRST 1 ROWS ONLY
+        """,
+        {"shape_id": capture["shape_id"]}
+    )
+    execute_batches([(INSERT_QUERY_PLAN_SQL, [{
+        "shape_id": capture["shape_id"],
+        "query_name": capture["query_name"],
+        "app_version": APP_VERSION,
+        "sql_id": capture["sql_id"],
+        "child_number": capture["child_number"],
+        "plan_hash_value": capture["plan_hash_value"],
+        "elapsed_ms": capture["elapsed_ms"],
+        "buffer_gets": capture["stats"].get("buffer_gets"),
+        "rows_processed": capture["stats"].get("rows_processed"),
+        "sql_text": capture["sql_text"],
+        "bind_values": json.dumps(capture["binds"], default=str)[:4000],
+        "plan_text": capture["plan_text"]
+    }])])
+    if previous.empty or pd.isna(previous.iloc[0]['plan_hash_value']):
+        return None
+    return int(previous.iloc[0]['plan_hash_value'])
+
+
+def explain_app_query(query_name: str, query: str, params: Dict[str, Any]) -> Tuple[str, str]:
+    try:
+        capture = capture_query_plan(query_name, query, params)
+    except Exception as e:
+        logger.error(f"Plan capture for {query_name} failed: {e}")
+        return f"**Plan capture failed:** {e}\n\nThe app user needs SELECT on v$session, v$sql and v$sql_plan_statistics_all.", ""
+
+    summary = [
+        f"**Query:** {query_name}  |  **Shape:** `{capture['shape_id']}`  |  **sql_id:** `{capture['sql_id']}` (child {capture['child_number']})",
+        f"**Plan hash:** {capture['plan_hash_value']}  |  **Elapsed:** {capture['elapsed_ms']} ms  |  "
+        f"**Rows:** {capture['rows_returned']}  |  **Buffer gets:** {capture['stats'].get('buffer_gets')}"
+    ]
+    try:
+        previous_hash = store_query_plan(capture)
+        if previous_hash is None:
+            summary.append("First capture stored for this query shape.")
+        elif previous_hash != capture["plan_hash_value"]:
+            summary.append(f"⚠️ **Plan changed** for this shape: previous plan hash was {previous_hash}.")
+        else:
+            summary.append("Plan unchanged since the last capture for this shape.")
+    except Exception as e:
+        logger.error(f"Failed to store query plan: {e}")
+        summary.append(f"Plan not stored (run sql/query_plan_history.sql): {e}")
+
+    binds = "\n".join(f"--   :{name} = {value!r}" for name, value in capture["binds"].items()) or "--   (none)"
+    text = f"-- SQL\n{capture['sql_text'].strip()}\n\n-- Binds\n{binds}\n\n-- Plan\n{capture['plan_text']}"
+    return "\n\n".join(summary), text
+
+
+def explain_fitment_search(*filters) -> Tuple[str, str]:
+    query, params = build_fitment_query(*filters)
+    return explain_app_query("search_fitment", query, params)
+
+
+def explain_coverage(*filters) -> Tuple[str, str]:
+    query, params = build_coverage_query(*filters)
+    return explain_app_query("compute_coverage", query, params)
+
+
+def load_plan_history() -> pd.DataFrame:
+    try:
+        df = execute_query(
+            """
+            SELECT
+                query_name AS "Query",
+                shape_id AS "Shape",
+                app_version AS "Version",
+                sql_id AS "SQL ID",
+                plan_hash_value AS "Plan Hash",
+                CASE
+                    WHEN LAG(plan_hash_value) OVER (PARTITION BY shape_id ORDER BY captured_at) IS NULL THEN 'new'
+                    WHEN LAG(plan_hash_value) OVER (PARTITION BY shape_id ORDER BY captured_at) <> plan_hash_value THEN 'CHANGED'
+                    ELSE 'same'
+                END AS "Plan vs Previous",
+                elapsed_ms AS "Elapsed (ms)",
+                buffer_gets AS "Buffer Gets",
+                rows_processed AS "Rows",
+                captured_at AS "Captured At"
+            FROM app_query_plan
+            ORDER BY captured_at DESC
+            FETCH FIRST 500 ROWS ONLY
+            """
+        )
+        if df.empty:
+            return pd.DataFrame({"Message": ["No plans captured yet. Use 'Explain Plan' on the Fitment Search or Coverage tab."]})
+        return df
+    except Exception as e:
+        logger.error(f"Failed to load plan history: {e}")
+        return pd.DataFrame({"Error": [str(e)]})
+
+
+def load_alias_collisions() -> pd.DataFrame:
+    try:
+        query = """
+        SELECT 
+            alias_text AS "Alias Text",
+            LISTAGG(DISTINCT canonical_value, ', ') WITHIN GROUP (ORDER BY canonical_value) AS "Canonical Values",
+            COUNT(DISTINCT canonical_value) AS "Collision Count"
+        FROM brand_alias
+        WHERE canonical_value IS NOT NULL
+        GROUP BY alias_text
+        HAVING COUNT(DISTINCT canonical_value) > 1
+        ORDER BY "Collision Count" DESC, alias_text
+        """
+        
         df = execute_query(query)
         if df.empty:
             return pd.DataFrame({"Message": ["No alias collisions found."]})
@@ -474,37 +2239,472 @@ def load_missing_mpn() -> pd.DataFrame:
         return pd.DataFrame({"Error": [str(e)]})
 
 
-def load_oem_mismatches() -> pd.DataFrame:
+MPN_INDEX_TTL = int(os.getenv("MPN_INDEX_TTL", "3600"))
+MPN_SUGGESTION_DISPLAY_ROWS = 500
+
+_mpn_suggester: Optional[MpnSuggester] = None
+_mpn_suggester_built_at = 0.0
+
+
+def build_mpn_suggester() -> MpnSuggester:
+    suggester = MpnSuggester()
+    chunks = list(iter_query(f"SELECT {', '.join(MPN_INDEX_COLUMNS)} FROM listing WHERE mpn IS NOT NULL"))
+    suggester.build(pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame(columns=MPN_INDEX_COLUMNS))
+    logger.info(f"Built MPN suggestion index over {len(suggester)} listings with an MPN")
+    return suggester
+
+
+def get_mpn_suggester(refresh: bool = False) -> MpnSuggester:
+    """Token index of listings with an MPN, rebuilt after MPN_INDEX_TTL or an ingestion change to listing."""
+    global _mpn_suggester, _mpn_suggester_built_at
+    if refresh or _mpn_suggester is None or time.monotonic() - _mpn_suggester_built_at > MPN_INDEX_TTL:
+        _mpn_suggester = build_mpn_suggester()
+        _mpn_suggester_built_at = time.monotonic()
+    return _mpn_suggester
+
+
+def _invalidate_mpn_suggester(changes: Dict[str, Dict[str, pd.DataFrame]]) -> None:
+    global _mpn_suggester
+    if any(not df.empty for df in changes.get("listing", {}).values()):
+        _mpn_suggester = None
+
+
+register_change_listener(_invalidate_mpn_suggester)
+
+
+def _drop_mpn_suggester(changes: Dict[str, TableChange]) -> None:
+    global _mpn_suggester
+    _mpn_suggester = None
+
+
+register_table_subscriber(["listing"], _drop_mpn_suggester)
+
+
+def suggest_missing_mpns(min_confidence: float = 0.0) -> pd.DataFrame:
+    """Suggestions for every listing with a NULL mpn, streamed in chunks, with titles for review."""
+    suggester = get_mpn_suggester()
+    suggestions = suggester.suggest_batches(iter_query(
+        f"SELECT {', '.join(MPN_QUERY_COLUMNS)} FROM listing WHERE mpn IS NULL", chunk_size=10000
+    ))
+    suggestions = suggestions[suggestions["confidence"] >= min_confidence]
+    logger.info(f"Suggested MPNs for {len(suggestions)} listings with a missing MPN")
+    if suggestions.empty:
+        return pd.DataFrame()
+    titles = execute_query(
+        f"SELECT listing_id, listing_title FROM listing WHERE listing_id IN ({get_dialect().id_list('listing_ids')})",
+        {"listing_ids": json.dumps(sorted(set(suggestions['listing_id'].astype(int))))}
+    )
+    df = suggestions.merge(titles, on="listing_id", how="left")
+    return pd.DataFrame({
+        "Listing ID": df["listing_id"],
+        "Listing Title": df["listing_title"],
+        "Suggested MPN": df["suggested_mpn"],
+        "Confidence": df["confidence"],
+        "Title Similarity": df["similarity"],
+        "Matched Listing ID": df["matched_listing_id"],
+        "Runner-up MPN": df["runner_up_mpn"],
+        "Runner-up Similarity": df["runner_up_similarity"]
+    })
+
+
+def load_mpn_suggestions() -> Tuple[str, pd.DataFrame, Optional[str]]:
+    """Suggestions for all missing MPNs: (summary, most confident rows, CSV export path)."""
+    try:
+        report = suggest_missing_mpns()
+        if report.empty:
+            return "No MPN suggestions: no listing with a missing MPN resembles a listing that has one.", pd.DataFrame(), None
+        summary = (f"**{len(report)}** listings with a missing MPN have a suggestion; "
+                   f"{int((report['Confidence'] >= 0.5).sum())} with confidence 0.5 or more.")
+        if len(report) > MPN_SUGGESTION_DISPLAY_ROWS:
+            summary += f" Showing the {MPN_SUGGESTION_DISPLAY_ROWS} most confident; download the CSV for all of them."
+        with tempfile.NamedTemporaryFile("w", suffix=".csv", prefix="mpn-suggestions-", delete=False,
+                                         newline="", encoding="utf-8") as f:
+            report.to_csv(f, index=False)
+        return summary, report.head(MPN_SUGGESTION_DISPLAY_ROWS), f.name
+    except Exception as e:
+        logger.error(f"MPN suggestion failed: {e}")
+        return "", pd.DataFrame({"Error": [str(e)]}), None
+
+
+DESCRIPTOR_VOCABULARY_FILE = os.getenv("DESCRIPTOR_VOCABULARY_FILE", "")
+DESCRIPTOR_WORKERS = int(os.getenv("DESCRIPTOR_WORKERS", "4"))
+DESCRIPTOR_CHUNK_SIZE = 20000
+OEM_MISMATCH_DISPLAY_ROWS = 500
+
+DESCRIPTOR_LISTINGS_SQL = """
+SELECT l.listing_id, l.listing_title, b.brand_name
+FROM listing l
+JOIN brand b ON b.brand_id = l.brand_id
+"""
+
+
+def build_descriptor_classifier() -> DescriptorClassifier:
+    """Classifier over the configured vocabularies, brand_alias canonical brands and vehicle makes."""
+    aliases = execute_query("SELECT alias_text, canonical_value FROM brand_alias")
+    makes = execute_query("SELECT make_name FROM make")
+    return DescriptorClassifier(
+        load_vocabularies(DESCRIPTOR_VOCABULARY_FILE),
+        dict(zip(aliases["alias_text"], aliases["canonical_value"])),
+        makes["make_name"]
+    )
+
+
+def _classify_descriptor_chunk(classifier: DescriptorClassifier, chunk: pd.DataFrame) -> Tuple[int, int]:
+    results = classifier.classify(chunk)
+    execute_batches([(
+        get_dialect().upsert_sql("listing_descriptor", ["listing_id"], DESCRIPTOR_RESULT_COLUMNS[1:]),
+        _bind_rows(results[DESCRIPTOR_RESULT_COLUMNS])
+    )])
+    return len(results), int(results["mismatch"].notna().sum())
+
+
+# When the change feed last saw listing change outside ingestion. Those changes carry no row
+# detail, so which listings need reclassifying is unknown until the next full run.
+_listing_descriptors_stale_since: Optional[float] = None
+
+
+def classify_listing_descriptors(listing_ids: Optional[Set[int]] = None) -> Tuple[int, int]:
+    """Classify title descriptors into listing_descriptor; (classified, flagged).
+
+    Chunks are streamed from listing and classified and written by DESCRIPTOR_WORKERS
+    threads while the next chunk is fetched; each chunk commits on its own, so a long
+    run's results show up as it goes. ``listing_ids`` limits the run to those listings.
+    """
+    global _listing_descriptors_stale_since
+    started = time.time()
+    classifier = build_descriptor_classifier()
+    if listing_ids is None:
+        chunks = iter_query(DESCRIPTOR_LISTINGS_SQL, chunk_size=DESCRIPTOR_CHUNK_SIZE)
+    else:
+        chunks = iter([execute_query(
+            DESCRIPTOR_LISTINGS_SQL + f" WHERE l.listing_id IN ({get_dialect().id_list('listing_ids')})",
+            {"listing_ids": json.dumps(sorted(listing_ids))}
+        )])
+    classified = flagged = 0
+    with ThreadPoolExecutor(max_workers=DESCRIPTOR_WORKERS) as executor:
+        pending: deque = deque()
+        for chunk in chunks:
+            if chunk.empty:
+                continue
+            pending.append(executor.submit(_classify_descriptor_chunk, classifier, chunk))
+            # Bound the chunks held in memory to the ones the workers are busy with.
+            while len(pending) >= DESCRIPTOR_WORKERS:
+                counts = pending.popleft().result()
+                classified, flagged = classified + counts[0], flagged + counts[1]
+        for future in pending:
+            counts = future.result()
+            classified, flagged = classified + counts[0], flagged + counts[1]
+    if listing_ids is None:
+        stale = execute_query(
+            "SELECT listing_id FROM listing_descriptor WHERE listing_id NOT IN (SELECT listing_id FROM listing)"
+        )
+        execute_batches([(
+            "DELETE FROM listing_descriptor WHERE listing_id = :listing_id",
+            [{"listing_id": int(lid)} for lid in stale["listing_id"]]
+        )])
+        if _listing_descriptors_stale_since is not None and _listing_descriptors_stale_since <= started:
+            _listing_descriptors_stale_since = None
+    logger.info(f"Classified OEM descriptors for {classified} listings, {flagged} flagged")
+    return classified, flagged
+
+
+def _update_listing_descriptors(changes: Dict[str, Dict[str, pd.DataFrame]]) -> None:
+    listing_changes = changes.get("listing", {})
+    deleted = listing_changes.get("deleted")
+    if deleted is not None and not deleted.empty:
+        execute_batches([(
+            "DELETE FROM listing_descriptor WHERE listing_id = :listing_id",
+            [{"listing_id": int(lid)} for lid in deleted["listing_id"]]
+        )])
+    changed: Set[int] = set()
+    for kind in ("inserted", "updated"):
+        df = listing_changes.get(kind)
+        if df is not None and not df.empty:
+            changed |= set(pd.to_numeric(df["listing_id"]).astype(int))
+    if changed:
+        classify_listing_descriptors(changed)
+
+
+register_change_listener(_update_listing_descriptors)
+
+
+def _reclassify_listing_descriptors(changes: Dict[str, TableChange]) -> None:
+    # A make, brand or alias change can flip the brand class of any listing.
+    classify_listing_descriptors()
+
+
+register_table_subscriber(["make", "brand", "brand_alias"], _reclassify_listing_descriptors)
+
+
+def _mark_listing_descriptors_stale(changes: Dict[str, TableChange]) -> None:
+    # Rescanning the catalog for every outside listing write is too costly; the report says so instead.
+    global _listing_descriptors_stale_since
+    if _listing_descriptors_stale_since is None:
+        _listing_descriptors_stale_since = changes["listing"].detected_at
+
+
+register_table_subscriber(["listing"], _mark_listing_descriptors_stale)
+
+
+def _descriptor_staleness_notice() -> str:
+    if _listing_descriptors_stale_since is None:
+        return ""
+    since = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(_listing_descriptors_stale_since))
+    return (f"Listings were changed outside ingestion at {since}; their descriptors may be out of date "
+            "until `python manage.py classify-descriptors` runs.")
+
+
+OEM_LIKE_MISMATCH_SQL = """
+SELECT l.listing_id, l.listing_title, b.brand_name
+FROM listing l
+JOIN brand b ON l.brand_id = b.brand_id
+WHERE UPPER(l.listing_title) LIKE '%OEM%' AND UPPER(b.brand_name) NOT LIKE '%OEM%'
+ORDER BY l.listing_id
+FETCH FIRST :row_limit ROWS ONLY
+"""
+
+
+def _load_oem_mismatches_by_like() -> pd.DataFrame:
+    """The substring scan used before listing_descriptor existed, for schemas without it."""
+    df = execute_query(OEM_LIKE_MISMATCH_SQL, {"row_limit": OEM_MISMATCH_DISPLAY_ROWS})
+    if df.empty:
+        return pd.DataFrame({"Message": ["No OEM descriptor mismatches found."]})
+    return pd.DataFrame({
+        "Listing ID": df["listing_id"],
+        "Listing Title": df["listing_title"],
+        "Brand Name": df["brand_name"],
+        "Reason": "Title contains OEM but brand does not (listing_descriptor is not installed)"
+    })
+
+
+def load_oem_mismatches() -> Tuple[str, pd.DataFrame]:
+    """Listings whose title descriptors contradict their brand, from listing_descriptor: (notice, rows).
+
+    Classification runs in ``manage.py classify-descriptors`` and on ingestion, never here.
+    Without the listing_descriptor table the report falls back to a LIKE '%OEM%' scan.
+    """
     try:
+        try:
+            classified = execute_query("SELECT listing_id FROM listing_descriptor FETCH FIRST 1 ROWS ONLY")
+        except Exception as e:
+            logger.warning(f"listing_descriptor unavailable, using the LIKE '%OEM%' scan: {e}")
+            return "", _load_oem_mismatches_by_like()
+        if classified.empty:
+            return "", pd.DataFrame({"Message": [
+                "Listing descriptors have not been classified yet. Run: python manage.py classify-descriptors"
+            ]})
         query = """
-        SELECT 
-            l.listing_id AS "Listing ID",
-            l.listing_title AS "Listing Title",
-            b.brand_name AS "Brand Name",
-            CASE 
-                WHEN UPPER(l.listing_title) LIKE '%OEM%' AND b.brand_name NOT LIKE '%OEM%' 
-                THEN 'Title suggests OEM but brand does not match'
-                ELSE 'Potential OEM mismatch'
-            END AS "Reason"
-        FROM listing l
+        SELECT l.listing_id, l.listing_title, b.brand_name, d.descriptors, d.mismatch
+        FROM listing_descriptor d
+        JOIN listing l ON l.listing_id = d.listing_id
         JOIN brand b ON l.brand_id = b.brand_id
-        WHERE UPPER(l.listing_title) LIKE '%OEM%'
+        WHERE d.mismatch IS NOT NULL
         ORDER BY l.listing_id
-        FETCH FIRST 500 ROWS ONLY
+        FETCH FIRST :row_limit ROWS ONLY
         """
-        df = execute_query(query)
+        df = execute_query(query, {"row_limit": OEM_MISMATCH_DISPLAY_ROWS})
+        notice = _descriptor_staleness_notice()
         if df.empty:
-            return pd.DataFrame({"Message": ["No OEM descriptor mismatches found."]})
-        return df
+            return notice, pd.DataFrame({"Message": ["No OEM descriptor mismatches found."]})
+        return notice, pd.DataFrame({
+            "Listing ID": df["listing_id"],
+            "Listing Title": df["listing_title"],
+            "Brand Name": df["brand_name"],
+            "Descriptors": df["descriptors"],
+            "Reason": df["mismatch"]
+        })
+    except Exception as e:
+        logger.error(f"Failed to load OEM mismatches: {e}")
+        return "", pd.DataFrame({"Error": [str(e)]})
+
+
+PRICE_ANOMALY_TTL = int(os.getenv("PRICE_ANOMALY_TTL", "3600"))
+PRICE_ANOMALY_DISPLAY_ROWS = 500
+
+PRICE_EXTRACT_SQL = """
+SELECT DISTINCT l.part_type_id, lf.trim_id, lf.position_id, l.listing_id, l.price
+FROM listing_fitment lf
+JOIN listing l ON l.listing_id = lf.listing_id
+WHERE l.price > 0
+ORDER BY l.part_type_id, lf.trim_id, lf.position_id
+"""
+
+_price_anomalies: Optional[pd.DataFrame] = None
+_price_anomalies_built_at = 0.0
+
+
+def scan_listing_prices() -> pd.DataFrame:
+    """Stream the priced (part type, trim, position) extract through the robust outlier scan."""
+    anomalies = scan_price_anomalies(iter_query(PRICE_EXTRACT_SQL))
+    logger.info(f"Price anomaly scan flagged {len(anomalies)} listings")
+    return anomalies
+
+
+def get_price_anomalies(refresh: bool = False) -> pd.DataFrame:
+    """Flagged listings from the last scan, rescanned after PRICE_ANOMALY_TTL or an ingestion change."""
+    global _price_anomalies, _price_anomalies_built_at
+    if refresh or _price_anomalies is None or time.monotonic() - _price_anomalies_built_at > PRICE_ANOMALY_TTL:
+        _price_anomalies = scan_listing_prices()
+        _price_anomalies_built_at = time.monotonic()
+    return _price_anomalies
+
+
+def _invalidate_price_anomalies(changes: Dict[str, Dict[str, pd.DataFrame]]) -> None:
+    global _price_anomalies
+    if any(not df.empty for kinds in changes.values() for df in kinds.values()):
+        _price_anomalies = None
+
+
+register_change_listener(_invalidate_price_anomalies)
+
+
+def _drop_price_anomalies(changes: Dict[str, TableChange]) -> None:
+    global _price_anomalies
+    _price_anomalies = None
+
+
+register_table_subscriber(["listing", "listing_fitment"], _drop_price_anomalies)
+
+
+def price_anomaly_report(anomalies: pd.DataFrame, limit: Optional[int] = None) -> pd.DataFrame:
+    """Flagged listings, worst first, with titles, brands and slot names for display or export."""
+    top = anomalies.head(limit) if limit else anomalies
+    if top.empty:
+        return pd.DataFrame()
+    dialect = get_dialect()
+    listings = execute_query(
+        f"""
+        SELECT l.listing_id, l.listing_title, b.brand_name, pt.parttype_name
+        FROM listing l
+        JOIN brand b ON b.brand_id = l.brand_id
+        JOIN part_type pt ON pt.part_type_id = l.part_type_id
+        WHERE l.listing_id IN ({dialect.id_list('listing_ids')})
+        """,
+        {"listing_ids": json.dumps(sorted(set(top['listing_id'].astype(int))))}
+    )
+    slots = execute_query(
+        f"""
+        SELECT t.trim_id, mk.make_name, md.model_name, t.year, t.trim_name
+        FROM trim t
+        JOIN model md ON md.model_id = t.model_id
+        JOIN make mk ON mk.make_id = md.make_id
+        WHERE t.trim_id IN ({dialect.id_list('trim_ids')})
+        """,
+        {"trim_ids": json.dumps(sorted(set(top['trim_id'].astype(int))))}
+    )
+    positions = execute_query("SELECT position_id, position_code FROM position")
+    df = (top.merge(listings, on="listing_id", how="left")
+             .merge(slots, on="trim_id", how="left")
+             .merge(positions, on="position_id", how="left"))
+    year = df["year"].map(lambda y: str(int(y)) if pd.notna(y) else "")
+    return pd.DataFrame({
+        "Listing ID": df["listing_id"],
+        "Listing Title": df["listing_title"],
+        "Brand Name": df["brand_name"],
+        "Part Type": df["parttype_name"],
+        "Price": df["price"],
+        "Slot Median Price": df["median_price"],
+        "Robust Z": df["z_score"],
+        "Worst Slot": (year + " " + df["make_name"].fillna("") + " " + df["model_name"].fillna("") + " "
+                       + df["trim_name"].fillna("") + " / " + df["position_code"].fillna("")).str.strip(),
+        "Slot Listings": df["group_size"],
+        "Outlier Slots": df["outlier_slots"]
+    })
+
+
+def load_price_anomalies() -> pd.DataFrame:
+    try:
+        report = price_anomaly_report(get_price_anomalies(), PRICE_ANOMALY_DISPLAY_ROWS)
+        if report.empty:
+            return pd.DataFrame({"Message": ["No price outliers found."]})
+        return report
+    except Exception as e:
+        logger.error(f"Failed to load price anomalies: {e}")
+        return pd.DataFrame({"Error": [str(e)]})
+
+
+DUPLICATE_INDEX_TTL = int(os.getenv("DUPLICATE_INDEX_TTL", "3600"))
+DUPLICATE_DISPLAY_ROWS = 500
+
+_duplicate_index: Optional[DuplicateIndex] = None
+_duplicate_index_built_at = 0.0
+
+
+def build_duplicate_index() -> DuplicateIndex:
+    index = DuplicateIndex()
+    chunks = list(iter_query(f"SELECT {', '.join(TITLE_COLUMNS)} FROM listing"))
+    index.build(pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame(columns=TITLE_COLUMNS))
+    logger.info(f"Built near-duplicate index over {len(index)} listing titles")
+    return index
+
+
+def get_duplicate_index(refresh: bool = False) -> DuplicateIndex:
+    """MinHash signatures of listing titles, kept current by ingestion change sets and rebuilt after DUPLICATE_INDEX_TTL."""
+    global _duplicate_index, _duplicate_index_built_at
+    if refresh or _duplicate_index is None or time.monotonic() - _duplicate_index_built_at > DUPLICATE_INDEX_TTL:
+        _duplicate_index = build_duplicate_index()
+        _duplicate_index_built_at = time.monotonic()
+    return _duplicate_index
+
+
+def _update_duplicate_index(changes: Dict[str, Dict[str, pd.DataFrame]]) -> None:
+    if _duplicate_index is not None and "listing" in changes:
+        _duplicate_index.apply_listing_changes(changes["listing"])
+
+
+register_change_listener(_update_duplicate_index)
+
+
+def _drop_duplicate_index(changes: Dict[str, TableChange]) -> None:
+    global _duplicate_index
+    _duplicate_index = None
+
+
+register_table_subscriber(["listing"], _drop_duplicate_index)
+
+
+def load_duplicate_clusters() -> pd.DataFrame:
+    try:
+        clusters = get_duplicate_index().clusters()
+        if clusters.empty:
+            return pd.DataFrame({"Message": ["No near-duplicate listings found."]})
+        clusters["size"] = clusters.groupby("cluster_id")["listing_id"].transform("size")
+        clusters = clusters.sort_values(["size", "cluster_id", "similarity"], ascending=[False, True, False])
+        # Whole clusters only, largest first, until DUPLICATE_DISPLAY_ROWS rows (always at least one cluster).
+        sizes = clusters.drop_duplicates(subset=["cluster_id"]).set_index("cluster_id")["size"]
+        fits = sizes.cumsum() <= max(DUPLICATE_DISPLAY_ROWS, int(sizes.iloc[0]))
+        shown = clusters[clusters["cluster_id"].isin(sizes.index[fits])]
+        listings = execute_query(
+            f"""
+            SELECT l.listing_id, l.listing_title, l.price, b.brand_name, pt.parttype_name
+            FROM listing l
+            JOIN brand b ON b.brand_id = l.brand_id
+            JOIN part_type pt ON pt.part_type_id = l.part_type_id
+            WHERE l.listing_id IN ({get_dialect().id_list('listing_ids')})
+            """,
+            {"listing_ids": json.dumps(sorted(set(shown['listing_id'].astype(int))))}
+        )
+        df = shown.merge(listings, on="listing_id", how="left")
+        return pd.DataFrame({
+            "Cluster": df["cluster_id"],
+            "Cluster Size": df["size"],
+            "Listing ID": df["listing_id"],
+            "Listing Title": df["listing_title"],
+            "Brand Name": df["brand_name"],
+            "Part Type": df["parttype_name"],
+            "Price": df["price"],
+            "Similarity": df["similarity"]
+        })
     except Exception as e:
-        logger.error(f"Failed to load OEM mismatches: {e}")
+        logger.error(f"Failed to load duplicate clusters: {e}")
         return pd.DataFrame({"Error": [str(e)]})
 
 
 def load_tables() -> List[str]:
     try:
-        tables_df = execute_query("SELECT table_name FROM user_tables ORDER BY table_name")
-        views_df = execute_query("SELECT view_name AS table_name FROM user_views ORDER BY view_name")
+        catalog = get_dialect().catalog
+        tables_df = execute_query(catalog["tables"])
+        views_df = execute_query(catalog["views"])
         
         all_objects = pd.concat([tables_df, views_df], ignore_index=True)
         
@@ -522,28 +2722,468 @@ def load_tables() -> List[str]:
         return []
 
 
-def preview_table(table_name: str) -> pd.DataFrame:
-    if not table_name or table_name == "None":
-        return pd.DataFrame({"Message": ["Please select a table or view"]})
-    
-    try:
+_schema_tables: Optional[List[str]] = None
+_schema_columns: Dict[str, pd.DataFrame] = {}
+_schema_keys: Dict[str, List[str]] = {}
+
+VIEW_KEY_COLUMNS = {
+    'VIEW_NORMALIZEDFITMENT': ['LISTING_ID', 'TRIM_ID', 'POSITION_ID', 'DRIVE_ID']
+}
+
+BROWSE_PAGE_SIZE = 50
+BROWSE_MAX_PAGE_SIZE = 1000
+
+
+def get_schema_tables(refresh: bool = False) -> List[str]:
+    global _schema_tables
+    if refresh or _schema_tables is None:
         tables = load_tables()
-        if table_name not in tables:
-            return pd.DataFrame({"Error": [f"Table/view '{table_name}' not found in project schema"]})
-        
-        query = f'SELECT * FROM "{table_name}" FETCH FIRST 50 ROWS ONLY'
-        df = execute_query(query)
-        
-        if df.empty:
-            return pd.DataFrame({"Message": [f"Table/view '{table_name}' is empty or has no rows."]})
-        
-        return df
+        _schema_columns.clear()
+        _schema_keys.clear()
+        _schema_tables = tables
+    return _schema_tables
+
+
+def get_table_columns(table_name: str) -> pd.DataFrame:
+    if table_name not in _schema_columns:
+        _schema_columns[table_name] = execute_query(
+            get_dialect().catalog["columns"],
+            {"table_name": table_name}
+        )
+    return _schema_columns[table_name]
+
+
+def get_table_key(table_name: str) -> List[str]:
+    """Columns used for keyset paging: the primary key, a known unique key for views, else ROWID."""
+    if table_name not in _schema_keys:
+        if table_name.upper() in VIEW_KEY_COLUMNS:
+            keys = VIEW_KEY_COLUMNS[table_name.upper()]
+        else:
+            pk_df = execute_query(
+                get_dialect().catalog["primary_key"],
+                {"table_name": table_name}
+            )
+            keys = [str(row['column_name']) for _, row in pk_df.iterrows()]
+            if not keys and table_name.upper() not in set(PROJECT_VIEWS):
+                keys = ['ROWID']
+        _schema_keys[table_name] = keys
+    return _schema_keys[table_name]
+
+
+def is_schema_view(table_name: str) -> bool:
+    return table_name.upper() in set(PROJECT_VIEWS)
+
+
+def get_row_estimate(table_name: str) -> str:
+    if is_schema_view(table_name):
+        return "Row estimate: n/a for views"
+    try:
+        df = execute_query(
+            get_dialect().catalog["row_estimate"],
+            {"table_name": table_name}
+        )
+        if df.empty or pd.isna(df.iloc[0]['num_rows']):
+            return "Row estimate: no optimizer statistics (gather table stats / ANALYZE)"
+        return f"Row estimate: ~{int(df.iloc[0]['num_rows']):,} rows (stats from {df.iloc[0]['last_analyzed']})"
     except Exception as e:
-        logger.error(f"Failed to preview table/view: {e}")
-        return pd.DataFrame({"Error": [str(e)]})
+        logger.error(f"Failed to read row estimate for {table_name}: {e}")
+        return "Row estimate: unavailable"
+
+
+def _keyset_predicate(key_aliases: List[str]) -> str:
+    # (k1, k2, ...) > (:k1, :k2, ...) expanded, since Oracle has no row-value comparison
+    clauses = []
+    for i, key in enumerate(key_aliases):
+        equal = [f"{prev} = :after_{j}" for j, prev in enumerate(key_aliases[:i])]
+        clauses.append("(" + " AND ".join(equal + [f"{key} > :after_{i}"]) + ")")
+    # The redundant leading-key bound lets the optimizer range-scan the key index.
+    return f"({key_aliases[0]} >= :after_0 AND (" + " OR ".join(clauses) + "))"
+
+
+def browse_table(
+    table_name: str,
+    columns: Optional[List[str]],
+    page_size: Optional[int],
+    sample_percent: Optional[float],
+    after_key: Optional[List[Any]] = None
+) -> Tuple[pd.DataFrame, Optional[List[Any]]]:
+    """Return one page of rows and the keyset cursor for the next page (None when done)."""
+    tables = get_schema_tables()
+    if table_name not in tables:
+        raise ValueError(f"Table/view '{table_name}' not found in project schema")
+
+    available = [str(col) for col in get_table_columns(table_name)['column_name']]
+    selected = [col for col in (columns or []) if col in available] or available
+    limit = max(1, min(int(page_size or BROWSE_PAGE_SIZE), BROWSE_MAX_PAGE_SIZE))
+    select_list = ", ".join(f'"{col}"' for col in selected)
+
+    if sample_percent:
+        if is_schema_view(table_name):
+            raise ValueError("SAMPLE is only available for tables; page through views instead")
+        percent = min(max(float(sample_percent), 0.000001), 99.999999)
+        query = f'SELECT {select_list} FROM "{table_name}" SAMPLE ({percent}) FETCH FIRST {limit} ROWS ONLY'
+        return execute_query(query), None
+
+    keys = get_table_key(table_name)
+    if not keys:
+        query = f'SELECT {select_list} FROM "{table_name}" FETCH FIRST {limit} ROWS ONLY'
+        return execute_query(query), None
+
+    key_aliases = [f"browse_key_{i}" for i in range(len(keys))]
+    key_exprs = ["ROWIDTOCHAR(ROWID)" if key == 'ROWID' else f'"{key}"' for key in keys]
+    inner = (
+        f"SELECT {select_list}, "
+        + ", ".join(f"{expr} AS {alias}" for expr, alias in zip(key_exprs, key_aliases))
+        + f' FROM "{table_name}"'
+    )
+    query = f"SELECT * FROM ({inner})"
+    params: Dict[str, Any] = {}
+    if after_key:
+        query += " WHERE " + _keyset_predicate(key_aliases)
+        params = {f"after_{i}": value for i, value in enumerate(after_key)}
+    query += " ORDER BY " + ", ".join(key_aliases)
+    query += f" FETCH FIRST {limit} ROWS ONLY"
+
+    df = execute_query(query, params)
+    lowered = [alias.lower() for alias in key_aliases]
+    next_key = None
+    if len(df) == limit:
+        next_key = [df.iloc[-1][alias] for alias in lowered]
+        next_key = [value.item() if hasattr(value, 'item') else value for value in next_key]
+    return df.drop(columns=lowered), next_key
+
+
+LISTING_KEY = ['listing_id']
+LISTING_VALUE_COLUMNS = ['listing_title', 'price', 'brand_id', 'part_type_id', 'mpn']
+LISTING_FITMENT_KEY = ['listing_id', 'trim_id', 'position_id', 'drive_id']
+
+DELETE_LISTING_FITMENT_SQL = """
+DELETE FROM listing_fitment
+WHERE listing_id = :listing_id AND trim_id = :trim_id
+  AND position_id = :position_id AND drive_id = :drive_id
+"""
+
+DELETE_LISTING_SQL = "DELETE FROM listing WHERE listing_id = :listing_id"
+
+
+def _clean_text(value: Any) -> Optional[str]:
+    if value is None or pd.isna(value):
+        return None
+    text = str(value).strip()
+    return text or None
+
+
+def normalize_listing_feed(df: pd.DataFrame) -> pd.DataFrame:
+    df = df.copy()
+    df.columns = [str(col).strip().lower() for col in df.columns]
+    # A missing column would diff as NULL and blank that column across the catalog.
+    missing = [col for col in LISTING_KEY + LISTING_VALUE_COLUMNS if col not in df.columns]
+    if missing:
+        raise ValueError(f"Listing feed is missing columns: {', '.join(missing)}")
+    df = df[LISTING_KEY + LISTING_VALUE_COLUMNS]
+    for col in ['listing_id', 'brand_id', 'part_type_id']:
+        df[col] = pd.to_numeric(df[col]).astype('Int64')
+    df['price'] = pd.to_numeric(df['price']).round(2)
+    for col in ['listing_title', 'mpn']:
+        df[col] = df[col].astype(object).map(_clean_text).astype(object)
+    return df.drop_duplicates(subset=LISTING_KEY, keep='last').reset_index(drop=True)
+
+
+def normalize_fitment_feed(df: pd.DataFrame) -> pd.DataFrame:
+    df = df.copy()
+    df.columns = [str(col).strip().lower() for col in df.columns]
+    missing = [col for col in LISTING_FITMENT_KEY if col not in df.columns]
+    if missing:
+        raise ValueError(f"Fitment feed is missing columns: {', '.join(missing)}")
+    df = df[LISTING_FITMENT_KEY].dropna()
+    for col in LISTING_FITMENT_KEY:
+        df[col] = pd.to_numeric(df[col]).astype('Int64')
+    return df.drop_duplicates().reset_index(drop=True)
+
+
+def diff_by_key(
+    current: pd.DataFrame,
+    incoming: pd.DataFrame,
+    key_columns: List[str],
+    value_columns: List[str]
+) -> Dict[str, pd.DataFrame]:
+    merged = current.merge(
+        incoming,
+        on=key_columns,
+        how='outer',
+        suffixes=('_old', ''),
+        indicator=True
+    )
+    columns = key_columns + value_columns
+    inserted = merged.loc[merged['_merge'] == 'right_only', columns]
+    deleted = merged.loc[merged['_merge'] == 'left_only', key_columns]
+    both = merged.loc[merged['_merge'] == 'both']
+    changed = pd.Series(False, index=both.index)
+    for col in value_columns:
+        old = both[f"{col}_old"]
+        new = both[col]
+        changed |= ~((old == new).fillna(False) | (old.isna() & new.isna()))
+    updated = both.loc[changed, columns]
+    return {
+        "inserted": inserted.reset_index(drop=True),
+        "updated": updated.reset_index(drop=True),
+        "deleted": deleted.reset_index(drop=True)
+    }
+
+
+def _bind_rows(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    return df.astype(object).where(df.notna(), None).to_dict('records')
+
+
+def compute_listing_delta(
+    listings_feed: pd.DataFrame,
+    fitment_feed: pd.DataFrame,
+    full_snapshot: bool = True
+) -> Dict[str, Dict[str, pd.DataFrame]]:
+    incoming_listings = normalize_listing_feed(listings_feed)
+    incoming_fitment = normalize_fitment_feed(fitment_feed)
+
+    listing_sql = "SELECT listing_id, listing_title, price, brand_id, part_type_id, mpn FROM listing"
+    fitment_sql = "SELECT listing_id, trim_id, position_id, drive_id FROM listing_fitment"
+    listing_params: Optional[Dict[str, Any]] = None
+    fitment_params: Optional[Dict[str, Any]] = None
+    if not full_snapshot:
+        # Partial feeds only own what they mention: listings are diffed against the listings
+        # file alone and never deleted, and fitment is replaced as a set only for listings
+        # that appear in the fitment file.
+        where = f" WHERE listing_id IN ({get_dialect().id_list('listing_ids')})"
+        listing_sql += where
+        fitment_sql += where
+        listing_params = {"listing_ids": json.dumps(sorted(set(incoming_listings['listing_id'].dropna().astype(int))))}
+        fitment_params = {"listing_ids": json.dumps(sorted(set(incoming_fitment['listing_id'].dropna().astype(int))))}
+
+    current_listings = normalize_listing_feed(execute_query(listing_sql, listing_params))
+    current_fitment = normalize_fitment_feed(execute_query(fitment_sql, fitment_params))
+
+    listing_changes = diff_by_key(current_listings, incoming_listings, LISTING_KEY, LISTING_VALUE_COLUMNS)
+    if not full_snapshot:
+        listing_changes["deleted"] = listing_changes["deleted"].iloc[0:0]
+    return {
+        "listing": listing_changes,
+        "listing_fitment": diff_by_key(current_fitment, incoming_fitment, LISTING_FITMENT_KEY, [])
+    }
 
 
-def create_app():    
+def apply_listing_delta(
+    listings_feed: pd.DataFrame,
+    fitment_feed: pd.DataFrame,
+    full_snapshot: bool = True,
+    dry_run: bool = False
+) -> Dict[str, Dict[str, pd.DataFrame]]:
+    changes = compute_listing_delta(listings_feed, fitment_feed, full_snapshot)
+    listing_changes = changes["listing"]
+    fitment_changes = changes["listing_fitment"]
+
+    summary = {
+        table: {kind: len(df) for kind, df in table_changes.items()}
+        for table, table_changes in changes.items()
+    }
+    logger.info(f"Delta ingestion change set: {summary}")
+    if dry_run:
+        return changes
+
+    upserts = pd.concat([listing_changes["inserted"], listing_changes["updated"]], ignore_index=True)
+    # Children of deleted listings go first, parents of new fitment rows go first.
+    deleted_listing_ids = set(listing_changes["deleted"]['listing_id'])
+    dialect = get_dialect()
+    # Published below with row-level detail, so the change feed must not report it as an outside change.
+    with change_feed.local_write(["listing", "listing_fitment"]):
+        execute_batches([
+            (DELETE_LISTING_FITMENT_SQL, _bind_rows(fitment_changes["deleted"])),
+            (dialect.upsert_sql("listing", LISTING_KEY, LISTING_VALUE_COLUMNS), _bind_rows(upserts)),
+            (dialect.upsert_sql("listing_fitment", LISTING_FITMENT_KEY, []), _bind_rows(fitment_changes["inserted"])),
+            ("DELETE FROM listing_fitment WHERE listing_id = :listing_id",
+             [{"listing_id": int(lid)} for lid in deleted_listing_ids]),
+            (DELETE_LISTING_SQL, _bind_rows(listing_changes["deleted"]))
+        ])
+
+    # The dirty-listing triggers have recorded exactly what this delta touched.
+    drain_fitment_range_dirty()
+    drain_fitment_denorm_dirty()
+    publish_changes(changes)
+    return changes
+
+
+TRIM_STAGE_COLUMNS = ['trim_id', 'trim_name', 'model_id', 'year']
+
+INSERT_TRIM_STAGE_SQL = """
+INSERT INTO trim_stage (trim_id, trim_name, model_id, year)
+VALUES (:trim_id, :trim_name, :model_id, :year)
+"""
+
+
+def validate_trim_make() -> pd.DataFrame:
+    return execute_query(
+        "SELECT trim_id, trim_name, model_id, trim_make_id, model_make_id "
+        "FROM View_TrimMakeMismatch ORDER BY trim_id"
+    )
+
+
+def bulk_load_trims(trims_feed: pd.DataFrame) -> pd.DataFrame:
+    """Stage trims with array binds and let load_trims_from_stage derive make_id set-based.
+
+    Returns the View_TrimMakeMismatch rows left after the load (empty when consistent).
+    """
+    df = trims_feed.copy()
+    df.columns = [str(col).strip().lower() for col in df.columns]
+    missing = [col for col in TRIM_STAGE_COLUMNS if col not in df.columns]
+    if missing:
+        raise ValueError(f"Trim feed is missing columns: {', '.join(missing)}")
+    df = df[TRIM_STAGE_COLUMNS]
+    for col in ['trim_id', 'model_id', 'year']:
+        df[col] = pd.to_numeric(df[col]).astype('Int64')
+
+    pool = get_pool()
+    try:
+        with pool.acquire() as connection:
+            with connection.cursor() as cursor:
+                cursor.execute("DELETE FROM trim_stage")
+                cursor.executemany(INSERT_TRIM_STAGE_SQL, _bind_rows(df))
+                connection.commit()
+                cursor.callproc("load_trims_from_stage")
+        logger.info(f"Bulk loaded {len(df)} trims through trim_stage")
+    except Exception as e:
+        logger.error(f"Bulk trim load failed: {e}")
+        raise
+
+    mismatches = validate_trim_make()
+    if not mismatches.empty:
+        logger.warning(f"{len(mismatches)} trims have a make_id that disagrees with their model")
+    # New or renamed trims change what existing year ranges expand to.
+    drain_fitment_range_dirty()
+    return mismatches
+
+
+def refresh_fitment_denorm(full: bool = False) -> None:
+    """Rebuild fitment_denorm from View_NormalizedFitment: every row, or only the dirty listings."""
+    procedure = "refresh_fitment_denorm_full" if full else "refresh_fitment_denorm_incremental"
+    pool = get_pool()
+    try:
+        with pool.acquire() as connection:
+            with connection.cursor() as cursor:
+                cursor.callproc(procedure)
+        logger.info(f"{procedure} complete")
+    except Exception as e:
+        logger.error(f"{procedure} failed: {e}")
+        raise
+
+
+def drain_fitment_denorm_dirty() -> None:
+    """Refresh fitment_denorm for the listings queued in fitment_denorm_dirty.
+
+    The triggers from sql/fitment_denorm.sql queue listings for every writer, so any process
+    refreshes whatever its own FITMENT_DENORM. Until ``manage.py refresh-denorm --full`` has
+    loaded fitment_denorm nothing reads it, and the queue is emptied instead (the full refresh
+    starts from an empty queue anyway).
+    """
+    try:
+        loaded = not execute_query("SELECT listing_id FROM fitment_denorm FETCH FIRST 1 ROWS ONLY").empty
+        if not loaded:
+            _delete_all("fitment_denorm_dirty", "NOT EXISTS (SELECT 1 FROM fitment_denorm)")
+            return
+    except Exception as e:
+        # Schemas without sql/fitment_denorm.sql have no queue to drain.
+        logger.info(f"fitment_denorm_dirty not drained: {e}")
+        return
+    refresh_fitment_denorm()
+
+
+def _delete_all(table: str, condition: Optional[str] = None) -> None:
+    """Empty a maintenance table (only the rows matching ``condition`` if given) in its own transaction."""
+    with get_pool().acquire() as connection:
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {table}" + (f" WHERE {condition}" if condition else ""))
+        connection.commit()
+
+
+INSERT_FITMENT_RANGE_SQL = """
+INSERT INTO listing_fitment_range (listing_id, model_id, trim_name, year_from, year_to, position_id, drive_id, trim_id)
+VALUES (:listing_id, :model_id, :trim_name, :year_from, :year_to, :position_id, :drive_id, :trim_id)
+"""
+
+
+def rebuild_fitment_ranges(listing_ids: Optional[Set[int]] = None) -> Dict[str, int]:
+    """Re-encode listing_fitment into listing_fitment_range, for all listings or only listing_ids.
+
+    Returns the listing_fitment and range row counts that were written.
+    """
+    if listing_ids is None:
+        # Everything is re-encoded below; changes committed from here on are queued again.
+        _delete_all("fitment_range_dirty")
+    trims = execute_query("SELECT trim_id, model_id, trim_name, year FROM trim")
+    fitment_sql = "SELECT listing_id, trim_id, position_id, drive_id FROM listing_fitment"
+    if listing_ids is None:
+        fitment = execute_query(fitment_sql)
+        stale = set(execute_query("SELECT DISTINCT listing_id FROM listing_fitment_range")['listing_id'])
+        listing_ids = stale | set(fitment['listing_id'])
+    else:
+        ids = sorted(int(lid) for lid in listing_ids)
+        chunks = []
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            binds = {f"listing_id_{i}": lid for i, lid in enumerate(chunk)}
+            chunks.append(execute_query(
+                fitment_sql + " WHERE listing_id IN (" + ",".join(f":{name}" for name in binds) + ")", binds
+            ))
+        fitment = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame(
+            columns=['listing_id', 'trim_id', 'position_id', 'drive_id']
+        )
+    ranges = compress_fitment(fitment, trims)
+    execute_batches([
+        ("DELETE FROM listing_fitment_range WHERE listing_id = :listing_id",
+         [{"listing_id": int(lid)} for lid in listing_ids]),
+        (INSERT_FITMENT_RANGE_SQL, _bind_rows(ranges))
+    ])
+    logger.info(f"Encoded {len(fitment)} listing_fitment rows as {len(ranges)} range rows")
+    return {"fitment_rows": len(fitment), "range_rows": len(ranges)}
+
+
+def drain_fitment_range_dirty() -> int:
+    """Re-encode the listings queued in fitment_range_dirty; returns how many.
+
+    The triggers from sql/fitment_ranges.sql queue listings for every writer, so any process
+    drains the queue whatever its own FITMENT_RANGES. Until ``manage.py compress-fitment``
+    has filled listing_fitment_range nothing reads it, and the queue is emptied instead.
+    """
+    try:
+        if execute_query("SELECT listing_id FROM listing_fitment_range FETCH FIRST 1 ROWS ONLY").empty:
+            _delete_all("fitment_range_dirty", "NOT EXISTS (SELECT 1 FROM listing_fitment_range)")
+            return 0
+        dirty = set(execute_query("SELECT listing_id FROM fitment_range_dirty")['listing_id'].astype(int))
+    except Exception as e:
+        # Schemas without sql/fitment_ranges.sql have no queue to drain.
+        logger.info(f"fitment_range_dirty not drained: {e}")
+        return 0
+    if not dirty:
+        return 0
+    # Claimed before fitment is read, so a change committed meanwhile is queued again, not lost.
+    rows = [{"listing_id": lid} for lid in sorted(dirty)]
+    execute_batches([("DELETE FROM fitment_range_dirty WHERE listing_id = :listing_id", rows)])
+    try:
+        rebuild_fitment_ranges(dirty)
+    except Exception:
+        execute_batches([(
+            "INSERT INTO fitment_range_dirty (listing_id) SELECT :listing_id FROM dual "
+            "WHERE NOT EXISTS (SELECT 1 FROM fitment_range_dirty WHERE listing_id = :listing_id)",
+            rows
+        )])
+        raise
+    return len(dirty)
+
+
+def validate_fitment_ranges() -> pd.DataFrame:
+    return execute_query(
+        "SELECT problem, listing_id, trim_id, position_id, drive_id "
+        "FROM View_FitmentRangeMismatch ORDER BY listing_id, trim_id"
+    )
+
+
+def create_app():
     try:
         get_pool()
         logger.info("Application initialized successfully")
@@ -551,7 +3191,7 @@ def create_app():
         logger.error(f"Failed to initialize application: {e}")
         with gr.Blocks(title="Auto Parts Fitment Explorer - Connection Error") as app:
             gr.Markdown("# Auto Parts Fitment Explorer")
-            gr.Markdown(f"## Connection Error\n\nFailed to connect to Oracle database: {str(e)}\n\nPlease check your environment variables: ORA_USER, ORA_PASS, ORA_DB")
+            gr.Markdown(f"## Connection Error\n\nFailed to connect to the database: {str(e)}\n\nPlease check your environment variables: ORA_USER, ORA_PASS, ORA_DB (or set DB_BACKEND=sqlite and SQLITE_PATH for the embedded backend)")
         return app
     
     try:
@@ -561,6 +3201,7 @@ def create_app():
         total_listings, total_brands, total_trims = 0, 0, 0
     
     makes = load_makes()
+    vehicle_tree = get_vehicle_tree()
     part_types = load_part_types()
     positions = load_positions()
     drives = load_drives()
@@ -592,6 +3233,15 @@ def create_app():
         
         with gr.Tabs():
             with gr.Tab("Fitment Search"):
+                with gr.Row():
+                    quick_search_input = gr.Textbox(
+                        label="Quick Search",
+                        placeholder="e.g. 2019 Civic front brake pads AWD",
+                        scale=4
+                    )
+                    quick_search_button = gr.Button("Search", variant="primary", scale=1)
+                quick_search_summary = gr.Markdown("")
+                
                 with gr.Row():
                     with gr.Column(scale=1):
                         make_dropdown = gr.Dropdown(
@@ -605,7 +3255,8 @@ def create_app():
                             choices=[],
                             label="Model",
                             value=None,
-                            interactive=True
+                            interactive=True,
+                            allow_custom_value=vehicle_tree is not None
                         )
                         
                         year_input = gr.Number(
@@ -619,7 +3270,8 @@ def create_app():
                             choices=[],
                             label="Trim (Optional)",
                             value=None,
-                            interactive=True
+                            interactive=True,
+                            allow_custom_value=vehicle_tree is not None
                         )
                         
                         part_type_dropdown = gr.Dropdown(
@@ -672,6 +3324,10 @@ def create_app():
                             interactive=False,
                             wrap=True
                         )
+                        with gr.Accordion("Query Plan (Admin)", open=False):
+                            explain_search_button = gr.Button("Explain Plan for Current Filters", variant="secondary")
+                            search_plan_summary = gr.Markdown("")
+                            search_plan_text = gr.Code(label="SQL, Binds and Execution Plan", language=None, interactive=False)
                 
                 def update_models_and_trim(make_id):
                     if not make_id or make_id == "None" or make_id == "":
@@ -679,34 +3335,95 @@ def create_app():
                     models = load_models(make_id)
                     return gr.update(choices=models, value=None), gr.update()
                 
-                make_dropdown.change(
-                    fn=update_models_and_trim,
-                    inputs=[make_dropdown],
-                    outputs=[model_dropdown, trim_dropdown]
-                )
-                
                 def update_trims(model_id, year):
                     if not model_id or model_id == "None" or model_id == "":
                         return gr.update(choices=[], value=None)
                     trims = load_trims(model_id, int(year) if year else None)
                     return gr.update(choices=trims, value=None)
                 
-                model_dropdown.change(
-                    fn=lambda m: update_trims(m, None),
-                    inputs=[model_dropdown],
-                    outputs=[trim_dropdown]
-                )
-                
                 def update_trims_from_year(model_id, year):
                     if not model_id or model_id == "None" or model_id == "":
                         return gr.update(choices=[], value=None)
                     return update_trims(model_id, int(year) if year else None)
                 
-                year_input.change(
-                    fn=update_trims_from_year,
-                    inputs=[model_dropdown, year_input],
-                    outputs=[trim_dropdown]
-                )
+                if vehicle_tree is not None:
+                    # Cascades resolve in the browser; choices set client-side are unknown to the
+                    # server, hence allow_custom_value on the model and trim dropdowns.
+                    tree_url = f"{VEHICLE_TREE_PATH}?v={vehicle_tree['version']}"
+                    make_dropdown.change(
+                        fn=None,
+                        inputs=[make_dropdown],
+                        outputs=[model_dropdown, trim_dropdown],
+                        js=VEHICLE_MODELS_JS.replace("__TREE_URL__", tree_url)
+                    )
+                    model_dropdown.change(
+                        fn=None,
+                        inputs=[model_dropdown],
+                        outputs=[trim_dropdown],
+                        js=VEHICLE_TRIMS_JS.replace("__TREE_URL__", tree_url)
+                    )
+                    year_input.change(
+                        fn=None,
+                        inputs=[model_dropdown, year_input],
+                        outputs=[trim_dropdown],
+                        js=VEHICLE_TRIMS_JS.replace("__TREE_URL__", tree_url)
+                    )
+                else:
+                    make_dropdown.change(
+                        fn=session_handler(update_models_and_trim, "lookup"),
+                        inputs=[make_dropdown],
+                        outputs=[model_dropdown, trim_dropdown],
+                        **workload("lookup")
+                    )
+                    model_dropdown.change(
+                        fn=session_handler(lambda m: update_trims(m, None), "lookup"),
+                        inputs=[model_dropdown],
+                        outputs=[trim_dropdown],
+                        **workload("lookup")
+                    )
+                    year_input.change(
+                        fn=session_handler(update_trims_from_year, "lookup"),
+                        inputs=[model_dropdown, year_input],
+                        outputs=[trim_dropdown],
+                        **workload("lookup")
+                    )
+                
+                fitment_filters = [
+                    make_dropdown,
+                    model_dropdown,
+                    year_input,
+                    trim_dropdown,
+                    part_type_dropdown,
+                    position_dropdown,
+                    drive_dropdown,
+                    price_min_input,
+                    price_max_input,
+                    brand_checkbox
+                ]
+                facet_controls = [part_type_dropdown, position_dropdown, drive_dropdown, brand_checkbox]
+                
+                def update_facets(make_id, model_id, year, trim_id, part_type_id, position_id, drive_id, price_min, price_max, brand_ids):
+                    counts = compute_facets(
+                        make_id, model_id, year, trim_id, part_type_id,
+                        position_id, drive_id, price_min, price_max, brand_ids
+                    )
+                    return (
+                        gr.update(choices=facet_choices(part_types, counts.get("part_type"), part_type_id)),
+                        gr.update(choices=facet_choices(positions, counts.get("position"), position_id)),
+                        gr.update(choices=facet_choices(drives, counts.get("drive"), drive_id)),
+                        gr.update(choices=facet_choices(brands, counts.get("brand"), brand_ids))
+                    )
+                
+                # Cascading resets fire several change events at once; only the last one needs counting.
+                for control in fitment_filters:
+                    event = control.blur if control in (price_min_input, price_max_input) else control.change
+                    event(
+                        fn=session_handler(update_facets, "search", supersede=True),
+                        inputs=fitment_filters,
+                        outputs=facet_controls,
+                        trigger_mode="always_last",
+                        **workload("search")
+                    )
                 
                 def clear_search_results():
                     return pd.DataFrame({"Message": ["Results cleared. Adjust filters and click 'Search Fitment' to run a new query."]})
@@ -726,8 +3443,9 @@ def create_app():
                         pd.DataFrame({"Message": ["All filters cleared. Select new filters and click 'Search Fitment'."]})  # results
                     )
                 
-                search_button.click(
-                    fn=search_fitment,
+                # A new search supersedes (cancels) the session's previous one still in flight.
+                search_events = [search_button.click(
+                    fn=session_handler(search_fitment, "search", supersede=True),
                     inputs=[
                         make_dropdown,
                         model_dropdown,
@@ -740,11 +3458,23 @@ def create_app():
                         price_max_input,
                         brand_checkbox
                     ],
-                    outputs=[fitment_results]
-                )
+                    outputs=[fitment_results],
+                    trigger_mode="multiple",
+                    **workload("search")
+                )]
+                
+                for event in (quick_search_button.click, quick_search_input.submit):
+                    search_events.append(event(
+                        fn=session_handler(quick_search, "search", supersede=True),
+                        inputs=[quick_search_input],
+                        outputs=[quick_search_summary, fitment_results],
+                        trigger_mode="multiple",
+                        **workload("search")
+                    ))
                 
                 clear_filters_button.click(
-                    fn=clear_all_filters,
+                    fn=session_handler(clear_all_filters, cancels=[search_fitment, quick_search]),
+                    cancels=search_events,
                     outputs=[
                         make_dropdown,
                         model_dropdown,
@@ -761,8 +3491,96 @@ def create_app():
                 )
                 
                 clear_search_button.click(
-                    fn=clear_search_results,
-                    outputs=[fitment_results]
+                    fn=session_handler(clear_search_results, cancels=[search_fitment, quick_search]),
+                    outputs=[fitment_results],
+                    cancels=search_events
+                )
+                
+                explain_search_button.click(
+                    fn=explain_fitment_search,
+                    inputs=[
+                        make_dropdown,
+                        model_dropdown,
+                        year_input,
+                        trim_dropdown,
+                        part_type_dropdown,
+                        position_dropdown,
+                        drive_dropdown,
+                        price_min_input,
+                        price_max_input,
+                        brand_checkbox
+                    ],
+                    outputs=[search_plan_summary, search_plan_text]
+                )
+            
+            with gr.Tab("Title Search"):
+                with gr.Row():
+                    title_query_input = gr.Textbox(
+                        label="Find listings mentioning",
+                        placeholder="e.g. ceramic, OEM, 2018-2020",
+                        scale=4
+                    )
+                    title_use_filters = gr.Checkbox(
+                        label="Only listings matching the Fitment Search filters",
+                        value=False,
+                        scale=2
+                    )
+                with gr.Row():
+                    title_search_button = gr.Button("Search Titles", variant="primary")
+                    clear_title_search_button = gr.Button("Clear Results", variant="secondary")
+                title_results = gr.Dataframe(
+                    label="Matching Listings (ranked)",
+                    interactive=False,
+                    wrap=True
+                )
+                
+                title_search_events = [
+                    event(
+                        fn=session_handler(search_listing_titles, "search", supersede=True),
+                        inputs=[title_query_input, title_use_filters] + fitment_filters,
+                        outputs=[title_results],
+                        trigger_mode="multiple",
+                        **workload("search")
+                    )
+                    for event in (title_search_button.click, title_query_input.submit)
+                ]
+                clear_title_search_button.click(
+                    fn=session_handler(clear_search_results, cancels=[search_listing_titles]),
+                    outputs=[title_results],
+                    cancels=title_search_events
+                )
+            
+            with gr.Tab("Reverse Lookup"):
+                gr.Markdown("Which vehicles do these listings fit? Years are collapsed into ranges per model.")
+                reverse_ids_input = gr.Textbox(
+                    label="Listing IDs",
+                    placeholder="e.g. 1001, 1002, 1003 (or paste a column of IDs)",
+                    lines=3
+                )
+                with gr.Row():
+                    reverse_lookup_button = gr.Button("Find Vehicles", variant="primary")
+                    clear_reverse_button = gr.Button("Clear Results", variant="secondary")
+                reverse_summary = gr.Markdown()
+                reverse_results = gr.Dataframe(
+                    label="Vehicles per Listing",
+                    interactive=False,
+                    wrap=True
+                )
+                
+                def clear_reverse_lookup():
+                    return "", pd.DataFrame({"Message": ["Results cleared. Click 'Find Vehicles' to run a new lookup."]})
+                
+                reverse_lookup_event = reverse_lookup_button.click(
+                    fn=session_handler(reverse_fitment_lookup, "search", supersede=True),
+                    inputs=[reverse_ids_input],
+                    outputs=[reverse_summary, reverse_results],
+                    trigger_mode="multiple",
+                    **workload("search")
+                )
+                clear_reverse_button.click(
+                    fn=session_handler(clear_reverse_lookup, cancels=[reverse_fitment_lookup]),
+                    outputs=[reverse_summary, reverse_results],
+                    cancels=[reverse_lookup_event]
                 )
             
             with gr.Tab("Brand & Part Coverage"):
@@ -806,7 +3624,45 @@ def create_app():
                             interactive=False,
                             wrap=True
                         )
-                
+                        with gr.Accordion("Query Plan (Admin)", open=False):
+                            explain_coverage_button = gr.Button("Explain Plan for Current Filters", variant="secondary")
+                            coverage_plan_summary = gr.Markdown("")
+                            coverage_plan_text = gr.Code(label="SQL, Binds and Execution Plan", language=None, interactive=False)
+
+                with gr.Accordion("Coverage Gaps", open=False):
+                    gr.Markdown("Vehicles with no listings for a part type, using the Make, Model and Part Type filters above (Year is ignored).")
+                    with gr.Row():
+                        gap_granularity = gr.Radio(
+                            choices=["Trim", "Model Year"],
+                            value="Trim",
+                            label="Vehicle Level"
+                        )
+                        gap_button = gr.Button("Find Coverage Gaps", variant="primary")
+                    gap_summary = gr.Markdown("")
+                    gap_results = gr.Dataframe(
+                        label="Coverage Gaps",
+                        interactive=False,
+                        wrap=True
+                    )
+                    gap_export = gr.File(label="CSV Export", interactive=False)
+
+                with gr.Accordion("Brand Overlap", open=False):
+                    gr.Markdown("Brand pairs that cover the same (trim, part type, position) slots, using the Make and Part Type filters above.")
+                    with gr.Row():
+                        overlap_brand_dropdown = gr.Dropdown(
+                            choices=brands,
+                            label="Only Pairs With Brand (Optional)",
+                            value=None,
+                            interactive=True
+                        )
+                        overlap_button = gr.Button("Compute Brand Overlap", variant="primary")
+                    overlap_summary = gr.Markdown("")
+                    overlap_results = gr.Dataframe(
+                        label="Brand Overlap",
+                        interactive=False,
+                        wrap=True
+                    )
+
                 def update_coverage_models(make_id):
                     if not make_id or make_id == "None" or make_id == "":
                         return gr.update(choices=[], value=None)
@@ -814,33 +3670,73 @@ def create_app():
                     return gr.update(choices=models, value=None)
                 
                 coverage_make_dropdown.change(
-                    fn=update_coverage_models,
+                    fn=session_handler(update_coverage_models, "lookup"),
                     inputs=[coverage_make_dropdown],
-                    outputs=[coverage_model_dropdown]
+                    outputs=[coverage_model_dropdown],
+                    **workload("lookup")
                 )
                 
                 def clear_coverage():
                     return pd.DataFrame({"Message": ["Results cleared. Click 'Compute Coverage' to run a new query."]})
                 
-                coverage_button.click(
-                    fn=compute_coverage,
+                coverage_event = coverage_button.click(
+                    fn=session_handler(compute_coverage, "analytics", supersede=True),
                     inputs=[
                         coverage_make_dropdown,
                         coverage_model_dropdown,
                         coverage_year_input,
                         coverage_part_type_dropdown
                     ],
-                    outputs=[coverage_results]
+                    outputs=[coverage_results],
+                    **workload("analytics")
                 )
                 
                 clear_coverage_button.click(
-                    fn=clear_coverage,
-                    outputs=[coverage_results]
+                    fn=session_handler(clear_coverage, cancels=[compute_coverage]),
+                    outputs=[coverage_results],
+                    cancels=[coverage_event]
+                )
+                
+                explain_coverage_button.click(
+                    fn=explain_coverage,
+                    inputs=[
+                        coverage_make_dropdown,
+                        coverage_model_dropdown,
+                        coverage_year_input,
+                        coverage_part_type_dropdown
+                    ],
+                    outputs=[coverage_plan_summary, coverage_plan_text]
+                )
+
+                gap_button.click(
+                    fn=session_handler(coverage_gaps, "analytics", supersede=True),
+                    inputs=[
+                        coverage_make_dropdown,
+                        coverage_model_dropdown,
+                        coverage_part_type_dropdown,
+                        gap_granularity
+                    ],
+                    outputs=[gap_summary, gap_results, gap_export],
+                    **workload("analytics")
+                )
+
+                overlap_button.click(
+                    fn=session_handler(compute_brand_overlap, "analytics", supersede=True),
+                    inputs=[
+                        coverage_make_dropdown,
+                        coverage_part_type_dropdown,
+                        overlap_brand_dropdown
+                    ],
+                    outputs=[overlap_summary, overlap_results],
+                    **workload("analytics")
                 )
             
             with gr.Tab("Data Quality"):
                 def clear_dataframe():
                     return pd.DataFrame({"Message": ["Results cleared. Click the button above to load data again."]})
+
+                def clear_oem_mismatches():
+                    return "", clear_dataframe()
                 
                 with gr.Accordion("Alias Collisions", open=True):
                     with gr.Row():
@@ -851,13 +3747,15 @@ def create_app():
                         interactive=False,
                         wrap=True
                     )
-                    alias_button.click(
-                        fn=load_alias_collisions,
-                        outputs=[alias_results]
+                    alias_event = alias_button.click(
+                        fn=session_handler(load_alias_collisions, "analytics", supersede=True),
+                        outputs=[alias_results],
+                        **workload("analytics")
                     )
                     clear_alias_button.click(
-                        fn=clear_dataframe,
-                        outputs=[alias_results]
+                        fn=session_handler(clear_dataframe, cancels=[load_alias_collisions]),
+                        outputs=[alias_results],
+                        cancels=[alias_event]
                     )
                 
                 with gr.Accordion("Listings with Missing MPN", open=True):
@@ -869,57 +3767,163 @@ def create_app():
                         interactive=False,
                         wrap=True
                     )
-                    mpn_button.click(
-                        fn=load_missing_mpn,
-                        outputs=[mpn_results]
+                    mpn_event = mpn_button.click(
+                        fn=session_handler(load_missing_mpn, "analytics", supersede=True),
+                        outputs=[mpn_results],
+                        **workload("analytics")
                     )
                     clear_mpn_button.click(
-                        fn=clear_dataframe,
-                        outputs=[mpn_results]
+                        fn=session_handler(clear_dataframe, cancels=[load_missing_mpn]),
+                        outputs=[mpn_results],
+                        cancels=[mpn_event]
+                    )
+
+                    with gr.Row():
+                        suggest_mpn_button = gr.Button("Suggest MPNs for All Missing", variant="primary")
+                    mpn_suggestion_summary = gr.Markdown("")
+                    mpn_suggestion_results = gr.Dataframe(
+                        label="MPN Suggestions",
+                        interactive=False,
+                        wrap=True
+                    )
+                    mpn_suggestion_export = gr.File(label="CSV Export", interactive=False)
+                    suggest_mpn_button.click(
+                        fn=session_handler(load_mpn_suggestions, "analytics", supersede=True),
+                        outputs=[mpn_suggestion_summary, mpn_suggestion_results, mpn_suggestion_export],
+                        **workload("analytics")
                     )
                 
                 with gr.Accordion("OEM Descriptor vs Brand Mismatch", open=True):
                     with gr.Row():
                         oem_button = gr.Button("Load OEM Descriptor Mismatches", variant="primary")
                         clear_oem_button = gr.Button("Clear Results", variant="secondary")
+                    oem_notice = gr.Markdown("")
                     oem_results = gr.Dataframe(
                         label="OEM Descriptor Mismatches",
                         interactive=False,
                         wrap=True
                     )
-                    oem_button.click(
-                        fn=load_oem_mismatches,
-                        outputs=[oem_results]
+                    oem_event = oem_button.click(
+                        fn=session_handler(load_oem_mismatches, "analytics", supersede=True),
+                        outputs=[oem_notice, oem_results],
+                        **workload("analytics")
                     )
                     clear_oem_button.click(
-                        fn=clear_dataframe,
-                        outputs=[oem_results]
+                        fn=session_handler(clear_oem_mismatches, cancels=[load_oem_mismatches]),
+                        outputs=[oem_notice, oem_results],
+                        cancels=[oem_event]
+                    )
+
+                with gr.Accordion("Price Outliers", open=True):
+                    gr.Markdown("Listings priced far from other listings of the same part type for the same vehicle slot "
+                                "(trim and position), by robust z-score on log price.")
+                    with gr.Row():
+                        price_button = gr.Button("Load Price Outliers", variant="primary")
+                        clear_price_button = gr.Button("Clear Results", variant="secondary")
+                    price_results = gr.Dataframe(
+                        label="Price Outliers",
+                        interactive=False,
+                        wrap=True
+                    )
+                    price_event = price_button.click(
+                        fn=session_handler(load_price_anomalies, "analytics", supersede=True),
+                        outputs=[price_results],
+                        **workload("analytics")
+                    )
+                    clear_price_button.click(
+                        fn=session_handler(clear_dataframe, cancels=[load_price_anomalies]),
+                        outputs=[price_results],
+                        cancels=[price_event]
                     )
+
+                with gr.Accordion("Near-Duplicate Listings", open=True):
+                    gr.Markdown("Listings of the same brand and part type whose titles are near-identical "
+                                "(MinHash over title trigrams, estimated similarity of 0.8 or more).")
+                    with gr.Row():
+                        duplicate_button = gr.Button("Load Near-Duplicate Listings", variant="primary")
+                        clear_duplicate_button = gr.Button("Clear Results", variant="secondary")
+                    duplicate_results = gr.Dataframe(
+                        label="Near-Duplicate Listings",
+                        interactive=False,
+                        wrap=True
+                    )
+                    duplicate_event = duplicate_button.click(
+                        fn=session_handler(load_duplicate_clusters, "analytics", supersede=True),
+                        outputs=[duplicate_results],
+                        **workload("analytics")
+                    )
+                    clear_duplicate_button.click(
+                        fn=session_handler(clear_dataframe, cancels=[load_duplicate_clusters]),
+                        outputs=[duplicate_results],
+                        cancels=[duplicate_event]
+                    )
+            
+            with gr.Tab("Query Plans"):
+                gr.Markdown("Plans captured with **Explain Plan** on the Fitment Search and Coverage tabs, newest first. "
+                            "`CHANGED` marks a capture whose plan hash differs from the previous capture of the same query shape.")
+                with gr.Row():
+                    plan_history_button = gr.Button("Load Plan History", variant="primary")
+                    clear_plan_history_button = gr.Button("Clear Results", variant="secondary")
+                plan_history_results = gr.Dataframe(
+                    label="Captured Plans",
+                    interactive=False,
+                    wrap=True
+                )
+                plan_history_button.click(
+                    fn=session_handler(load_plan_history, "analytics"),
+                    outputs=[plan_history_results],
+                    **workload("analytics")
+                )
+                clear_plan_history_button.click(
+                    fn=lambda: pd.DataFrame({"Message": ["Results cleared. Click 'Load Plan History' to load again."]}),
+                    outputs=[plan_history_results]
+                )
             
             with gr.Tab("Schema Peek"):
                 with gr.Row():
                     with gr.Column(scale=1):
-                        initial_tables = load_tables()
+                        initial_tables = get_schema_tables()
                         table_dropdown = gr.Dropdown(
                             choices=initial_tables,
                             label="Table",
                             value=None,
                             interactive=True
                         )
+                        column_checkbox = gr.CheckboxGroup(
+                            choices=[],
+                            label="Columns (leave empty for all)",
+                            interactive=True
+                        )
+                        with gr.Row():
+                            page_size_input = gr.Number(
+                                label="Rows per Page",
+                                value=BROWSE_PAGE_SIZE,
+                                precision=0,
+                                interactive=True
+                            )
+                            sample_percent_input = gr.Number(
+                                label="Random Sample % (Optional, tables only)",
+                                value=None,
+                                interactive=True
+                            )
+                        row_estimate_text = gr.Markdown("")
                         with gr.Row():
                             preview_button = gr.Button("Preview Rows", variant="primary")
+                            next_page_button = gr.Button("Next Page", variant="secondary")
                             clear_preview_button = gr.Button("Clear Preview", variant="secondary")
                         refresh_tables_button = gr.Button("Refresh Table List", variant="secondary")
                     
                     with gr.Column(scale=2):
                         table_preview = gr.Dataframe(
-                            label="Table Preview (First 50 Rows)",
+                            label="Table Preview",
                             interactive=False,
                             wrap=True
                         )
                 
+                browse_cursor = gr.State(None)
+                
                 def load_tables_for_dropdown():
-                    tables = load_tables()
+                    tables = get_schema_tables(refresh=True)
                     return gr.update(choices=tables)
                 
                 refresh_tables_button.click(
@@ -927,23 +3931,80 @@ def create_app():
                     outputs=[table_dropdown]
                 )
                 
-                def clear_table_preview():
-                    return pd.DataFrame({"Message": ["Preview cleared. Select a table and click 'Preview Rows' to load data."]})
+                def select_browse_table(table_name):
+                    if not table_name or table_name not in get_schema_tables():
+                        return gr.update(choices=[], value=[]), "", None
+                    try:
+                        columns = [str(col) for col in get_table_columns(table_name)['column_name']]
+                    except Exception as e:
+                        logger.error(f"Failed to load columns for {table_name}: {e}")
+                        columns = []
+                    return gr.update(choices=columns, value=[]), get_row_estimate(table_name), None
                 
-                preview_button.click(
-                    fn=preview_table,
+                table_dropdown.change(
+                    fn=session_handler(select_browse_table, "browse"),
                     inputs=[table_dropdown],
-                    outputs=[table_preview]
+                    outputs=[column_checkbox, row_estimate_text, browse_cursor],
+                    **workload("browse")
                 )
                 
+                def browse_page(table_name, columns, page_size, sample_percent, cursor):
+                    if not table_name or table_name == "None":
+                        return pd.DataFrame({"Message": ["Please select a table or view"]}), None
+                    if cursor is not None and cursor.get("after") is None and cursor.get("done"):
+                        return pd.DataFrame({"Message": ["No more rows. Click 'Preview Rows' to start over."]}), cursor
+                    try:
+                        after = cursor.get("after") if cursor else None
+                        df, next_key = browse_table(table_name, columns, page_size, sample_percent, after)
+                        if df.empty:
+                            return pd.DataFrame({"Message": [f"Table/view '{table_name}' has no more rows."]}), {"after": None, "done": True}
+                        page = (cursor.get("page", 0) if cursor else 0) + 1
+                        return df, {"after": next_key, "page": page, "done": next_key is None}
+                    except Exception as e:
+                        logger.error(f"Failed to browse table/view: {e}")
+                        return pd.DataFrame({"Error": [str(e)]}), None
+                
+                def browse_first_page(table_name, columns, page_size, sample_percent):
+                    return browse_page(table_name, columns, page_size, sample_percent, None)
+                
+                browse_events = [
+                    preview_button.click(
+                        fn=session_handler(browse_first_page, "browse", supersede=True),
+                        inputs=[table_dropdown, column_checkbox, page_size_input, sample_percent_input],
+                        outputs=[table_preview, browse_cursor],
+                        **workload("browse")
+                    ),
+                    next_page_button.click(
+                        fn=session_handler(browse_page, "browse", supersede=True),
+                        inputs=[table_dropdown, column_checkbox, page_size_input, sample_percent_input, browse_cursor],
+                        outputs=[table_preview, browse_cursor],
+                        **workload("browse")
+                    )
+                ]
+                
+                def clear_table_preview():
+                    return pd.DataFrame({"Message": ["Preview cleared. Select a table and click 'Preview Rows' to load data."]}), None
+                
                 clear_preview_button.click(
-                    fn=clear_table_preview,
-                    outputs=[table_preview]
+                    fn=session_handler(clear_table_preview, cancels=[browse_first_page, browse_page]),
+                    outputs=[table_preview, browse_cursor],
+                    cancels=browse_events
                 )
     
     return app
 
 
+def create_server() -> FastAPI:
+    """Gradio app plus the vehicle tree, query parser and fitment check routes, served from one FastAPI app."""
+    server = FastAPI()
+    server.add_api_route(VEHICLE_TREE_PATH, vehicle_tree_response, methods=["GET"])
+    server.add_api_route(QUERY_PARSE_PATH, parse_query_response, methods=["GET"])
+    server.add_api_route(FITMENT_CHECK_PATH, fitment_check_response, methods=["GET"])
+    server.add_api_route(FITMENT_CHECK_PATH, fitment_check_batch_response, methods=["POST"])
+    blocks = create_app()
+    start_change_feed()
+    return gr.mount_gradio_app(server, blocks, path="/")
+
+
 if __name__ == "__main__":
-    app = create_app()
-    app.launch(server_name="0.0.0.0", server_port=7860, share=False)
\ No newline at end of file
+    uvicorn.run(create_server(), host="0.0.0.0", port=7860)
\ No newline at end of file
@@ -0,0 +1,81 @@
+"""Brand × brand overlap over fitment slots, as a sparse incidence-matrix product.
+
+A slot is one (trim_id, part_type_id, position_id). The incidence matrix A has a
+row per brand and a column per slot, with a 1 where the brand has a listing for
+the slot; the overlap matrix is A·Aᵀ: the diagonal is each brand's slot count and
+entry (a, b) the slots both cover. A self-join in SQL pairs every listing with
+every other listing of the slot; here each slot contributes one entry per pair of
+distinct brands on it, expanded with numpy index arithmetic a block of slots at a
+time, and only pairs that share a slot are ever materialised.
+"""
+from typing import List, Tuple
+
+import numpy as np
+import pandas as pd
+
+SLOT_COLUMNS = ["trim_id", "part_type_id", "position_id"]
+INCIDENCE_COLUMNS = ["brand_id"] + SLOT_COLUMNS
+OVERLAP_COLUMNS = ["brand_a_id", "brand_b_id", "shared_slots", "brand_a_slots", "brand_b_slots"]
+# Upper bound on brand pairs expanded per vectorized step.
+BLOCK_PAIRS = 5_000_000
+
+
+def _slot_pairs(slot: np.ndarray, brand: np.ndarray, n_brands: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Packed (brand_a * n_brands + brand_b, count) with a < b, for rows sorted by slot then brand."""
+    starts = np.flatnonzero(np.r_[True, slot[1:] != slot[:-1]])
+    sizes = np.diff(np.r_[starts, len(slot)])
+    # The element at offset i of a slot of size k pairs with the k - 1 - i elements after it.
+    partners = np.repeat(sizes, sizes) - (np.arange(len(slot)) - np.repeat(starts, sizes)) - 1
+    slot_pair_ends = np.cumsum(sizes * (sizes - 1) // 2)
+    bounds = np.r_[starts, len(slot)]
+
+    keys: List[np.ndarray] = []
+    counts: List[np.ndarray] = []
+    first_slot, done = 0, 0
+    while first_slot < len(starts):
+        # Whole slots per block, so blocks are independent; one huge slot gets a block of its own.
+        last_slot = int(np.searchsorted(slot_pair_ends, done + BLOCK_PAIRS, side="right"))
+        last_slot = max(last_slot, first_slot + 1)
+        block = np.arange(bounds[first_slot], bounds[last_slot])
+        n = partners[block]
+        left = np.repeat(block, n)
+        right = left + 1 + (np.arange(len(left)) - np.repeat(np.cumsum(n) - n, n))
+        if len(left):
+            block_keys, block_counts = np.unique(brand[left] * n_brands + brand[right], return_counts=True)
+            keys.append(block_keys)
+            counts.append(block_counts)
+        done = int(slot_pair_ends[last_slot - 1])
+        first_slot = last_slot
+
+    if not keys:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    all_keys, inverse = np.unique(np.concatenate(keys), return_inverse=True)
+    return all_keys, np.bincount(inverse, weights=np.concatenate(counts)).astype(np.int64)
+
+
+def brand_overlap(incidence: pd.DataFrame) -> pd.DataFrame:
+    """OVERLAP_COLUMNS for every brand pair sharing at least one slot, from INCIDENCE_COLUMNS rows.
+
+    Each pair appears once, with brand_a_id < brand_b_id.
+    """
+    if incidence.empty:
+        return pd.DataFrame(columns=OVERLAP_COLUMNS)
+    brand_codes, brand_ids = pd.factorize(pd.to_numeric(incidence["brand_id"]), sort=True)
+    slot_codes = incidence.groupby(SLOT_COLUMNS, sort=False, dropna=False).ngroup().to_numpy(dtype=np.int64)
+    n_brands = len(brand_ids)
+
+    # Distinct nonzeros of A, ordered by slot and then brand.
+    cells = np.unique(slot_codes * n_brands + brand_codes.astype(np.int64))
+    slot, brand = cells // n_brands, cells % n_brands
+    brand_slots = np.bincount(brand, minlength=n_brands)
+
+    keys, shared = _slot_pairs(slot, brand, n_brands)
+    a, b = keys // n_brands, keys % n_brands
+    ids = np.asarray(brand_ids, dtype=np.int64)
+    return pd.DataFrame({
+        "brand_a_id": ids[a],
+        "brand_b_id": ids[b],
+        "shared_slots": shared,
+        "brand_a_slots": brand_slots[a],
+        "brand_b_slots": brand_slots[b]
+    })
@@ -0,0 +1,227 @@
+"""Change detection for the catalog tables, so caches can be dropped when their data changes.
+
+Nothing is added to the write path. Each watched table has a fingerprint that is read
+in one query (on Oracle its USER_TAB_MODIFICATIONS counts, on SQLite the counter kept by
+the triggers in sqlite_schema.sql, where writers are serialized anyway). A ChangeFeed keeps
+the last fingerprint per table and a dispatcher thread compares fresh ones:
+
+* every ``poll_seconds`` for all tables (the polling fallback), and
+* shortly after ``notify(table)``, which Oracle Continuous Query Notification calls
+  from its callback after each commit when it is available (see ``subscribe_oracle_cqn``).
+
+Notifications are coalesced: the dispatcher waits ``coalesce_seconds`` after the first
+one, then checks every table notified meanwhile once. A notification from a source in
+COMMIT_SOURCES reports a change even when the fingerprint has not caught up yet, except
+within ``echo_seconds`` after the app's own write to that table (see ``local_write``).
+
+Subscribers register for a set of tables and get one call per dispatch round with a
+{table: TableChange} dict of the tables among theirs that changed.
+"""
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+WATCHED_TABLES = ["make", "model", "trim", "brand", "listing", "listing_fitment", "brand_alias"]
+
+# Notification sources that only fire after a commit to the table.
+COMMIT_SOURCES = {"cqn"}
+
+Fingerprint = Any
+
+
+class TableChange:
+    """One table's coalesced change: the fingerprints either side and what reported it."""
+    __slots__ = ("table", "before", "after", "sources", "notifications", "detected_at")
+
+    def __init__(self, table: str, before: Fingerprint, after: Fingerprint, sources: Set[str], notifications: int):
+        self.table = table
+        self.before = before
+        self.after = after
+        self.sources = sources
+        self.notifications = notifications
+        self.detected_at = time.time()
+
+    def __repr__(self) -> str:
+        return f"TableChange({self.table!r}, {self.before} -> {self.after}, sources={sorted(self.sources)})"
+
+
+class ChangeFeed:
+    def __init__(
+        self,
+        fingerprints: Callable[[List[str]], Dict[str, Fingerprint]],
+        tables: Iterable[str] = WATCHED_TABLES,
+        poll_seconds: float = 30.0,
+        coalesce_seconds: float = 2.0,
+        echo_seconds: float = 10.0
+    ):
+        self.fingerprints = fingerprints
+        self.tables = list(tables)
+        self.poll_seconds = poll_seconds
+        self.coalesce_seconds = coalesce_seconds
+        self.echo_seconds = echo_seconds
+        self._subscribers: List[Tuple[Set[str], Callable[[Dict[str, TableChange]], None]]] = []
+        self._baselines: Dict[str, Fingerprint] = {}
+        # table -> monotonic time until which commit notifications are the app's own echo.
+        self._echo_until: Dict[str, float] = {}
+        # table -> (sources, notification count) waiting for the dispatcher.
+        self._pending: Dict[str, Tuple[Set[str], int]] = {}
+        self._wakeup = threading.Condition()
+        # Held while fingerprints are compared and events dispatched, and across local writes.
+        self._check_lock = threading.RLock()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+
+    def subscribe(self, tables: Iterable[str], callback: Callable[[Dict[str, TableChange]], None]) -> None:
+        tables = set(tables)
+        unknown = tables - set(self.tables)
+        if unknown:
+            raise ValueError(f"Not watched by the change feed: {sorted(unknown)}")
+        if all(existing is not callback for _, existing in self._subscribers):
+            self._subscribers.append((tables, callback))
+
+    def notify(self, table: str, source: str = "notification") -> None:
+        """Ask for ``table`` to be checked soon; safe to call from any thread, e.g. a CQN callback."""
+        table = table.lower()
+        if table not in self.tables:
+            return
+        if source in COMMIT_SOURCES and time.monotonic() < self._echo_until.get(table, 0.0):
+            return
+        with self._wakeup:
+            sources, count = self._pending.get(table, (set(), 0))
+            self._pending[table] = (sources | {source}, count + 1)
+            self._wakeup.notify()
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stopping = False
+        with self._check_lock:
+            self._baselines = self._read(self.tables)
+        self._thread = threading.Thread(target=self._run, name="change-feed", daemon=True)
+        self._thread.start()
+        logger.info(f"Change feed watching {len(self._baselines)} tables, polling every {self.poll_seconds}s")
+
+    def stop(self) -> None:
+        with self._wakeup:
+            self._stopping = True
+            self._wakeup.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def _run(self) -> None:
+        next_poll = time.monotonic() + self.poll_seconds
+        while True:
+            with self._wakeup:
+                while not self._stopping and not self._pending and time.monotonic() < next_poll:
+                    self._wakeup.wait(max(next_poll - time.monotonic(), 0.0))
+                if self._stopping:
+                    return
+                notified = bool(self._pending)
+            if notified:
+                # Let a burst of notifications settle into one check.
+                time.sleep(self.coalesce_seconds)
+            with self._wakeup:
+                pending, self._pending = self._pending, {}
+            if time.monotonic() >= next_poll:
+                for table in self.tables:
+                    sources, count = pending.get(table, (set(), 0))
+                    pending[table] = (sources | {"poll"}, count)
+                next_poll = time.monotonic() + self.poll_seconds
+            try:
+                self.check(pending)
+            except Exception as e:
+                logger.error(f"Change feed check failed: {e}")
+
+    def _read(self, tables: Iterable[str]) -> Dict[str, Fingerprint]:
+        tables = list(tables)
+        try:
+            return self.fingerprints(tables)
+        except Exception as e:
+            logger.warning(f"Change feed could not read fingerprints for {tables}: {e}")
+            return {}
+
+    def check(self, pending: Optional[Dict[str, Tuple[Set[str], int]]] = None) -> Dict[str, TableChange]:
+        """Compare fingerprints for ``pending`` tables (all tables by default) and dispatch what moved."""
+        if pending is None:
+            pending = {table: ({"check"}, 0) for table in self.tables}
+        with self._check_lock:
+            current = self._read(pending)
+            changes = {}
+            for table, after in current.items():
+                before = self._baselines.get(table)
+                sources, count = pending[table]
+                if table in self._baselines and (after != before or sources & COMMIT_SOURCES):
+                    changes[table] = TableChange(table, before, after, sources, count)
+                self._baselines[table] = after
+            if changes:
+                logger.info(f"Change feed detected changes in {sorted(changes)}")
+                self._dispatch(changes)
+        return changes
+
+    def _dispatch(self, changes: Dict[str, TableChange]) -> None:
+        for tables, callback in list(self._subscribers):
+            relevant = {table: change for table, change in changes.items() if table in tables}
+            if not relevant:
+                continue
+            try:
+                callback(relevant)
+            except Exception as e:
+                logger.error(f"Change feed subscriber {getattr(callback, '__name__', callback)} failed: {e}")
+
+    @contextmanager
+    def local_write(self, tables: Iterable[str]) -> Iterator[None]:
+        """Wrap a write the app publishes itself, so it is not reported again as an outside change.
+
+        Outside changes already made to ``tables`` are dispatched first; afterwards the
+        baselines move to the post-write fingerprints and commit notifications for ``tables``
+        are ignored for ``echo_seconds``. Another session's commit to the same tables in
+        that time is folded into the local write.
+        """
+        tables = [table for table in tables if table in self.tables]
+        if not self.running or not tables:
+            yield
+            return
+        with self._check_lock:
+            self.check({table: ({"poll"}, 0) for table in tables})
+            try:
+                yield
+            finally:
+                self._baselines.update(self._read(tables))
+                echo_until = time.monotonic() + self.echo_seconds
+                self._echo_until.update({table: echo_until for table in tables})
+
+
+def subscribe_oracle_cqn(connection: Any, feed: ChangeFeed) -> Any:
+    """Register object-level Continuous Query Notification for the feed's tables on ``connection``.
+
+    ``connection`` must be a thick-mode python-oracledb connection opened with
+    ``events=True``, and the user needs the CHANGE NOTIFICATION privilege. Returns the
+    subscription; a deregistration message stops nothing, the feed's polling carries on.
+    """
+    import oracledb
+
+    def callback(message: Any) -> None:
+        if message.type == oracledb.EVENT_DEREG:
+            logger.warning("Continuous Query Notification deregistered; change feed continues by polling")
+            return
+        for table in getattr(message, "tables", None) or []:
+            feed.notify(table.name.split(".")[-1], source="cqn")
+
+    subscription = connection.subscribe(
+        callback=callback,
+        operations=oracledb.OPCODE_ALLOPS,
+        qos=oracledb.SUBSCR_QOS_RELIABLE
+    )
+    for table in feed.tables:
+        subscription.registerquery(f"SELECT * FROM {table} WHERE 1 = 0")
+    logger.info(f"Continuous Query Notification registered for {len(feed.tables)} tables")
+    return subscription
@@ -0,0 +1,116 @@
+"""Distinct fitment combinations, for answering "this search is empty" without a query.
+
+Every distinct (make, model, year, trim, part type, position, drive, brand) tuple
+in the fitment source is one entry. A filter set has results only if some entry
+satisfies every filter, so an empty match is a definite "no results" for the data
+the index was built from (price is not encoded and never makes a search look empty).
+Callers must drop the index when the source changes.
+
+Each column is dictionary-encoded, and for every set of filtered columns a query
+touches the index packs the entries' codes for those columns into one integer key
+and counts them in a dict. A lookup is then one dict probe per combination of
+accepted ids, whatever the number of entries. The per-column-set dicts are built
+on first use and kept until the index is rebuilt.
+"""
+import itertools
+from typing import Dict, FrozenSet, Hashable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+COMBO_COLUMNS = [
+    "make_id", "model_id", "year", "trim_id",
+    "part_type_id", "position_id", "drive_id", "brand_id"
+]
+MISSING = -1
+
+
+class _Encoded:
+    """Dictionary-encoded combinations and the packed-key counts built from them so far."""
+
+    def __init__(self, combos: pd.DataFrame):
+        self.size = len(combos)
+        self.codes: Dict[str, np.ndarray] = {}
+        self.lookup: Dict[str, Dict[int, int]] = {}
+        for col in COMBO_COLUMNS:
+            values = pd.to_numeric(combos[col]).fillna(MISSING).to_numpy(dtype=np.int64)
+            uniques, codes = np.unique(values, return_inverse=True)
+            self.codes[col] = codes.astype(np.int64)
+            self.lookup[col] = {int(value): code for code, value in enumerate(uniques.tolist())}
+        self.counts: Dict[FrozenSet[str], Dict[Hashable, int]] = {}
+
+    def _strides(self, columns: Tuple[str, ...]) -> Optional[List[int]]:
+        strides, span = [], 1
+        for col in reversed(columns):
+            strides.append(span)
+            span *= max(len(self.lookup[col]), 1)
+        # Packed keys are int64; wider column sets fall back to tuple keys.
+        return strides[::-1] if span < 2 ** 62 else None
+
+    def key_counts(self, columns: Tuple[str, ...]) -> Dict[Hashable, int]:
+        """Packed key -> number of combinations, for ``columns`` in COMBO_COLUMNS order."""
+        counts = self.counts.get(frozenset(columns))
+        if counts is None:
+            strides = self._strides(columns)
+            if strides is not None:
+                packed = sum(self.codes[col] * stride for col, stride in zip(columns, strides))
+                keys, n = np.unique(packed, return_counts=True)
+                counts = dict(zip(keys.tolist(), n.tolist()))
+            else:
+                codes = np.stack([self.codes[col] for col in columns], axis=1)
+                keys, n = np.unique(codes, axis=0, return_counts=True)
+                counts = dict(zip(map(tuple, keys.tolist()), n.tolist()))
+            # Another thread may build the same dict; either copy is correct.
+            self.counts[frozenset(columns)] = counts
+        return counts
+
+    def count(self, filters: Dict[str, Sequence[int]], columns: Sequence[str]) -> int:
+        """Combinations matching the filters on ``columns`` only."""
+        columns = tuple(col for col in COMBO_COLUMNS if col in columns)
+        if not columns:
+            return self.size
+        accepted = []
+        for col in columns:
+            codes = {self.lookup[col][int(v)] for v in filters[col] if int(v) in self.lookup[col]}
+            if not codes:
+                return 0
+            accepted.append(sorted(codes))
+        counts = self.key_counts(columns)
+        strides = self._strides(columns)
+        total = 0
+        for combo in itertools.product(*accepted):
+            key = sum(c * stride for c, stride in zip(combo, strides)) if strides is not None else combo
+            total += counts.get(key, 0)
+        return total
+
+
+class FitmentComboIndex:
+    def __init__(self):
+        self._encoded = _Encoded(pd.DataFrame(columns=COMBO_COLUMNS))
+
+    def __len__(self) -> int:
+        return self._encoded.size
+
+    def build(self, combos: pd.DataFrame) -> None:
+        """Replace the index with distinct COMBO_COLUMNS rows."""
+        self._encoded = _Encoded(combos.drop_duplicates(subset=COMBO_COLUMNS))
+
+    def count(self, filters: Dict[str, Sequence[int]]) -> int:
+        """Number of combinations that satisfy every filter (column -> accepted ids)."""
+        return self._encoded.count(filters, list(filters))
+
+    def explain_empty(self, filters: Dict[str, Sequence[int]]) -> Optional[Dict[str, object]]:
+        """None when the filters match something; otherwise why they match nothing.
+
+        ``blocking`` is the first filter, in the given order, after which nothing is left;
+        ``without`` maps every filter to the combinations left when only that one is dropped.
+        """
+        encoded = self._encoded  # one read, so every count comes from the same version
+        columns = list(filters)
+        if not columns:
+            return None if encoded.size else {"blocking": None, "without": {}}
+        if encoded.count(filters, columns):
+            return None
+        blocking = next(col for i, col in enumerate(columns) if not encoded.count(filters, columns[:i + 1]))
+        without = {col: encoded.count(filters, columns[:i] + columns[i + 1:]) for i, col in enumerate(columns)}
+        return {"blocking": blocking, "without": without}
@@ -0,0 +1,331 @@
+"""Database backends for the Auto Parts Fitment Explorer.
+
+The app talks to a "pool" whose ``acquire()`` yields a DB-API connection with
+``cursor()``/``commit()``. ``OracleDialect`` leaves SQL untouched; ``SQLiteDialect``
+rewrites the few Oracle-only constructs the app uses (FETCH FIRST, LISTAGG,
+SAMPLE, ROWIDTOCHAR, FROM dual, MERGE) so the same query strings run against a
+local file database created from ``sql/sqlite_schema.sql``.
+"""
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+
+class OracleDialect:
+    name = "oracle"
+
+    catalog = {
+        "tables": "SELECT table_name FROM user_tables ORDER BY table_name",
+        "views": "SELECT view_name AS table_name FROM user_views ORDER BY view_name",
+        "columns": """
+            SELECT column_name, data_type, nullable
+            FROM user_tab_columns
+            WHERE table_name = :table_name
+            ORDER BY column_id
+        """,
+        "primary_key": """
+            SELECT cc.column_name
+            FROM user_constraints c
+            JOIN user_cons_columns cc
+              ON c.constraint_name = cc.constraint_name
+            WHERE c.table_name = :table_name
+              AND c.constraint_type = 'P'
+            ORDER BY cc.position
+        """,
+        "row_estimate": "SELECT num_rows, last_analyzed FROM user_tables WHERE table_name = :table_name"
+    }
+
+    def translate(self, query: str) -> str:
+        return query
+
+    def id_list(self, bind: str) -> str:
+        """Subquery over a JSON array of integers bound to :bind, so any number of ids is one bind."""
+        return f"SELECT id FROM JSON_TABLE(:{bind}, '$[*]' COLUMNS (id NUMBER PATH '$'))"
+
+    def upsert_sql(self, table: str, key_columns: Sequence[str], value_columns: Sequence[str]) -> str:
+        columns = list(key_columns) + list(value_columns)
+        source = ", ".join(f":{col} AS {col}" for col in columns)
+        on = " AND ".join(f"t.{col} = s.{col}" for col in key_columns)
+        sql = f"MERGE INTO {table} t USING (SELECT {source} FROM dual) s ON ({on})"
+        if value_columns:
+            sql += " WHEN MATCHED THEN UPDATE SET " + ", ".join(f"t.{col} = s.{col}" for col in value_columns)
+        sql += (
+            f" WHEN NOT MATCHED THEN INSERT ({', '.join(columns)})"
+            f" VALUES ({', '.join(f's.{col}' for col in columns)})"
+        )
+        return sql
+
+
+_FETCH_FIRST = re.compile(r"\bFETCH\s+FIRST\s+(:?\w+)\s+ROWS?\s+ONLY\b", re.IGNORECASE)
+_LISTAGG = re.compile(
+    r"\bLISTAGG\s*\(\s*(DISTINCT\s+)?([^,()]+?)\s*,\s*('[^']*')\s*\)\s*WITHIN\s+GROUP\s*\(\s*ORDER\s+BY\s+[^)]*\)",
+    re.IGNORECASE
+)
+_SAMPLE = re.compile(r"(\bFROM\s+\"?\w+\"?)\s+SAMPLE\s*\(\s*([\d.]+)\s*\)", re.IGNORECASE)
+_ROWIDTOCHAR = re.compile(r"\bROWIDTOCHAR\s*\(\s*ROWID\s*\)", re.IGNORECASE)
+_FROM_DUAL = re.compile(r"\s+FROM\s+dual\b", re.IGNORECASE)
+
+
+class SQLiteDialect:
+    name = "sqlite"
+
+    catalog = {
+        "tables": "SELECT UPPER(name) AS table_name FROM sqlite_master WHERE type = 'table' ORDER BY name",
+        "views": "SELECT UPPER(name) AS table_name FROM sqlite_master WHERE type = 'view' ORDER BY name",
+        "columns": """
+            SELECT UPPER(name) AS column_name, type AS data_type,
+                   CASE "notnull" WHEN 1 THEN 'N' ELSE 'Y' END AS nullable
+            FROM pragma_table_info(:table_name)
+            ORDER BY cid
+        """,
+        "primary_key": """
+            SELECT UPPER(name) AS column_name
+            FROM pragma_table_info(:table_name)
+            WHERE pk > 0
+            ORDER BY pk
+        """,
+        "row_estimate": """
+            SELECT CAST(SUBSTR(stat, 1, INSTR(stat || ' ', ' ') - 1) AS INTEGER) AS num_rows,
+                   NULL AS last_analyzed
+            FROM sqlite_stat1
+            WHERE UPPER(tbl) = UPPER(:table_name)
+            LIMIT 1
+        """
+    }
+
+    def translate(self, query: str) -> str:
+        query = _FETCH_FIRST.sub(r"LIMIT \1", query)
+        query = _LISTAGG.sub(self._listagg, query)
+        query = _SAMPLE.sub(lambda m: f"{m.group(1)} WHERE (ABS(RANDOM()) % 1000000) < {float(m.group(2)) * 10000}", query)
+        query = _ROWIDTOCHAR.sub("rowid", query)
+        query = _FROM_DUAL.sub("", query)
+        return query
+
+    def id_list(self, bind: str) -> str:
+        return f"SELECT value AS id FROM json_each(:{bind})"
+
+    @staticmethod
+    def _listagg(match: "re.Match") -> str:
+        distinct, expr, separator = match.group(1), match.group(2), match.group(3)
+        if distinct:
+            # SQLite only accepts a single argument for DISTINCT aggregates.
+            return f"GROUP_CONCAT(DISTINCT {expr})"
+        return f"GROUP_CONCAT({expr}, {separator})"
+
+    def upsert_sql(self, table: str, key_columns: Sequence[str], value_columns: Sequence[str]) -> str:
+        columns = list(key_columns) + list(value_columns)
+        sql = (
+            f"INSERT INTO {table} ({', '.join(columns)})"
+            f" VALUES ({', '.join(f':{col}' for col in columns)})"
+            f" ON CONFLICT ({', '.join(key_columns)}) DO "
+        )
+        if value_columns:
+            sql += "UPDATE SET " + ", ".join(f"{col} = excluded.{col}" for col in value_columns)
+        else:
+            sql += "NOTHING"
+        return sql
+
+
+_FITMENT_DENORM_COLUMNS = (
+    "listing_id, listing_title, price, brand_id, brand_name, part_type_id, parttype_name, "
+    "trim_id, trim_name, year, make_id, make_name, model_id, model_name, "
+    "position_id, position_code, drive_id, drive_code"
+)
+
+# Set-based equivalents of the PL/SQL procedures in sql/trim_make_backfill.sql and sql/fitment_denorm.sql.
+SQLITE_PROCEDURES: Dict[str, List[str]] = {
+    "backfill_trim_make": [
+        """
+        UPDATE trim
+        SET make_id = (SELECT m.make_id FROM model m WHERE m.model_id = trim.model_id)
+        WHERE model_id IS NOT NULL
+          AND (make_id IS NULL OR make_id <> (SELECT m.make_id FROM model m WHERE m.model_id = trim.model_id))
+        """
+    ],
+    "load_trims_from_stage": [
+        """
+        INSERT INTO trim (trim_id, trim_name, make_id, model_id, year)
+        SELECT s.trim_id, s.trim_name, m.make_id, s.model_id, s.year
+        FROM trim_stage s
+        JOIN model m ON m.model_id = s.model_id
+        WHERE true
+        ON CONFLICT (trim_id) DO UPDATE SET
+            trim_name = excluded.trim_name,
+            make_id = excluded.make_id,
+            model_id = excluded.model_id,
+            year = excluded.year
+        """,
+        "DELETE FROM trim_stage"
+    ],
+    "refresh_fitment_denorm_full": [
+        "DELETE FROM fitment_denorm_dirty",
+        "DELETE FROM fitment_denorm",
+        f"INSERT INTO fitment_denorm ({_FITMENT_DENORM_COLUMNS}) SELECT {_FITMENT_DENORM_COLUMNS} FROM View_NormalizedFitment"
+    ],
+    # One writer at a time in SQLite, so the dirty set cannot change between these statements.
+    "refresh_fitment_denorm_incremental": [
+        "DELETE FROM fitment_denorm WHERE listing_id IN (SELECT listing_id FROM fitment_denorm_dirty)",
+        f"INSERT INTO fitment_denorm ({_FITMENT_DENORM_COLUMNS}) SELECT {_FITMENT_DENORM_COLUMNS} "
+        "FROM View_NormalizedFitment WHERE listing_id IN (SELECT listing_id FROM fitment_denorm_dirty)",
+        "DELETE FROM fitment_denorm_dirty"
+    ]
+}
+
+
+class SQLiteCursor:
+    def __init__(self, connection: "SQLiteConnection"):
+        self._connection = connection
+        self._cursor = connection.raw.cursor()
+        self.arraysize = 100
+
+    def __enter__(self) -> "SQLiteCursor":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    @property
+    def rowcount(self) -> int:
+        return self._cursor.rowcount
+
+    def execute(self, query: str, params: Optional[Dict[str, Any]] = None) -> "SQLiteCursor":
+        self._cursor.execute(self._connection.dialect.translate(query), params or {})
+        return self
+
+    def executemany(self, query: str, rows: Sequence[Dict[str, Any]]) -> None:
+        self._cursor.executemany(self._connection.dialect.translate(query), rows)
+
+    def callproc(self, name: str, parameters: Optional[Sequence[Any]] = None) -> None:
+        statements = SQLITE_PROCEDURES.get(name.lower())
+        if statements is None:
+            raise NotImplementedError(f"Procedure {name} is not available on the SQLite backend")
+        if name.lower() == "load_trims_from_stage":
+            missing = self._cursor.execute(
+                "SELECT COUNT(*) FROM trim_stage s WHERE NOT EXISTS (SELECT 1 FROM model m WHERE m.model_id = s.model_id)"
+            ).fetchone()[0]
+            if missing:
+                raise ValueError(f"TRIM load failed: {missing} staged rows reference a MODEL_ID not found in MODEL table")
+        for statement in statements:
+            self._cursor.execute(statement)
+        self._connection.commit()
+
+    def fetchone(self):
+        return self._cursor.fetchone()
+
+    def fetchmany(self, size: Optional[int] = None):
+        return self._cursor.fetchmany(size or self.arraysize)
+
+    def fetchall(self):
+        return self._cursor.fetchall()
+
+    def close(self) -> None:
+        self._cursor.close()
+
+
+class SQLiteConnection:
+    def __init__(self, raw: sqlite3.Connection, dialect: SQLiteDialect):
+        self.raw = raw
+        self.dialect = dialect
+        self._deadline: Optional[float] = None
+        self._call_timeout = 0
+
+    @property
+    def call_timeout(self) -> int:
+        return self._call_timeout
+
+    @call_timeout.setter
+    def call_timeout(self, value: int) -> None:
+        # Counterpart of oracledb's call_timeout (milliseconds, 0 = none): a progress
+        # handler aborts the running statement once the deadline passes.
+        self._call_timeout = value or 0
+        if self._call_timeout:
+            self._deadline = time.monotonic() + self._call_timeout / 1000
+            self.raw.set_progress_handler(self._past_deadline, 10000)
+        else:
+            self._deadline = None
+            self.raw.set_progress_handler(None, 0)
+
+    def _past_deadline(self) -> int:
+        return 1 if self._deadline is not None and time.monotonic() > self._deadline else 0
+
+    def cancel(self) -> None:
+        self.raw.interrupt()
+
+    def cursor(self) -> SQLiteCursor:
+        return SQLiteCursor(self)
+
+    def commit(self) -> None:
+        self.raw.commit()
+
+    def rollback(self) -> None:
+        self.raw.rollback()
+
+
+class SQLitePool:
+    """One connection per thread to a WAL-mode database file, handed out like a pool."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.dialect = SQLiteDialect()
+        self._local = threading.local()
+
+    def _connect(self) -> SQLiteConnection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            raw = sqlite3.connect(self.path, check_same_thread=False)
+            raw.execute("PRAGMA journal_mode = WAL")
+            raw.execute("PRAGMA foreign_keys = ON")
+            connection = SQLiteConnection(raw, self.dialect)
+            self._local.connection = connection
+        return connection
+
+    @contextmanager
+    def acquire(self) -> Iterator[SQLiteConnection]:
+        connection = self._connect()
+        try:
+            yield connection
+        finally:
+            # Mirror pool release semantics: uncommitted work is discarded.
+            if connection.raw.in_transaction:
+                connection.raw.rollback()
+
+    def close(self) -> None:
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            connection.raw.close()
+            self._local.connection = None
+
+
+def sqlite_script_path() -> str:
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), "sql", "sqlite_schema.sql")
+
+
+_INSERT_STATEMENT = re.compile(r"^\s*(INSERT\s+INTO\b.*?;)\s*$", re.IGNORECASE | re.DOTALL | re.MULTILINE)
+
+
+def create_sqlite_database(path: str, seed_file: Optional[str] = None) -> None:
+    """Create the schema in a SQLite file and optionally load the INSERTs of an Oracle seed script."""
+    with open(sqlite_script_path(), encoding="utf-8") as f:
+        schema = f.read()
+    raw = sqlite3.connect(path)
+    try:
+        raw.execute("PRAGMA foreign_keys = ON")
+        raw.executescript(schema)
+        if seed_file:
+            with open(seed_file, encoding="utf-8") as f:
+                seed = f.read()
+            # Oracle seed scripts wrap their cleanup in PL/SQL blocks; only plain INSERTs apply here.
+            for statement in _INSERT_STATEMENT.findall(seed):
+                raw.execute(statement.rstrip().rstrip(";"))
+        raw.execute("ANALYZE")
+        raw.commit()
+    finally:
+        raw.close()
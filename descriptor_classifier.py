@@ -0,0 +1,145 @@
+"""Token-level classification of OEM / aftermarket descriptors in listing titles.
+
+Titles are normalized (lower case, dots dropped so "O.E.M." reads "oem", every other
+non-alphanumeric run a space) and split into tokens; descriptors are matched as
+whole tokens or token phrases, so "oem" never matches inside "poem" and "OE" is
+found on its own. Vocabularies map a class ("oem", "aftermarket", ...) to its
+descriptors and can be replaced with a JSON file of the same shape.
+
+Brands are resolved to their canonical name through brand_alias and count as OEM
+when that name carries an OEM descriptor or is a vehicle make. A listing is flagged
+when its title descriptors contradict its brand. Each chunk is classified with
+vectorized pandas operations over its exploded tokens.
+"""
+import json
+import re
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_VOCABULARIES: Dict[str, List[str]] = {
+    "oem": ["oem", "oe", "genuine", "original equipment", "factory original", "dealer part"],
+    "aftermarket": ["aftermarket", "replacement", "compatible with", "oe style", "oem style", "oe replacement"],
+    "remanufactured": ["reman", "remanufactured", "rebuilt", "refurbished"]
+}
+OEM_CLASS = "oem"
+TITLE_COLUMNS = ["listing_id", "listing_title", "brand_name"]
+RESULT_COLUMNS = ["listing_id", "title_class", "descriptors", "brand_class", "mismatch"]
+
+_DOTS = re.compile(r"[.']")
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+
+def normalize_text(text: str) -> str:
+    return _NON_ALNUM.sub(" ", _DOTS.sub("", str(text).lower())).strip()
+
+
+def load_vocabularies(path: Optional[str] = None) -> Dict[str, List[str]]:
+    """DEFAULT_VOCABULARIES, or {class: [descriptor, ...]} from a JSON file."""
+    if not path:
+        return DEFAULT_VOCABULARIES
+    with open(path, encoding="utf-8") as f:
+        vocabularies = json.load(f)
+    if not isinstance(vocabularies, dict) or not all(isinstance(v, list) for v in vocabularies.values()):
+        raise ValueError(f"{path} must map each descriptor class to a list of descriptors")
+    return {str(cls): [str(d) for d in descriptors] for cls, descriptors in vocabularies.items()}
+
+
+class DescriptorClassifier:
+    def __init__(
+        self,
+        vocabularies: Dict[str, List[str]],
+        brand_aliases: Optional[Dict[str, str]] = None,
+        makes: Iterable[str] = ()
+    ):
+        self._phrases: Dict[str, str] = {}
+        for cls, descriptors in vocabularies.items():
+            for descriptor in descriptors:
+                normalized = normalize_text(descriptor)
+                if normalized:
+                    self._phrases.setdefault(normalized, cls)
+        self._max_words = max((len(p.split()) for p in self._phrases), default=1)
+        self._aliases = {normalize_text(alias): str(canonical) for alias, canonical in (brand_aliases or {}).items()}
+        self._makes = {normalize_text(make) for make in makes}
+
+    def canonical_brand(self, brand_name: str) -> str:
+        return self._aliases.get(normalize_text(brand_name), str(brand_name))
+
+    def brand_class(self, brand_name: str) -> str:
+        canonical = normalize_text(self.canonical_brand(brand_name))
+        if canonical in self._makes:
+            return OEM_CLASS
+        tokens = canonical.split()
+        for n in range(1, self._max_words + 1):
+            for i in range(len(tokens) - n + 1):
+                if self._phrases.get(" ".join(tokens[i:i + n])) == OEM_CLASS:
+                    return OEM_CLASS
+        return "aftermarket"
+
+    def _matches(self, titles: pd.Series) -> pd.DataFrame:
+        """(row, pos, length, descriptor, class) for every phrase match, overlaps resolved longest first."""
+        tokens = titles.astype(str).map(normalize_text).str.split()
+        exploded = pd.DataFrame({"row": np.arange(len(titles))}).assign(token=tokens.to_numpy()).explode("token")
+        exploded = exploded.dropna(subset=["token"]).reset_index(drop=True)
+        exploded["pos"] = exploded.groupby("row").cumcount()
+        found = []
+        gram = exploded["token"]
+        for n in range(1, self._max_words + 1):
+            if n > 1:
+                following = exploded["token"].shift(-(n - 1))
+                same_row = exploded["row"].shift(-(n - 1)) == exploded["row"]
+                gram = (gram + " " + following).where(same_row)
+            classes = gram.map(self._phrases)
+            hit = classes.notna()
+            found.append(pd.DataFrame({
+                "row": exploded.loc[hit, "row"], "pos": exploded.loc[hit, "pos"], "length": n,
+                "descriptor": gram[hit], "class": classes[hit]
+            }))
+        matches = pd.concat(found, ignore_index=True)
+        if matches.empty:
+            return matches
+        # A token belongs to the longest phrase starting at or covering it.
+        matches = matches.sort_values(["row", "pos", "length"], ascending=[True, True, False])
+        matches = matches.drop_duplicates(subset=["row", "pos"])
+        covered_until = matches.groupby("row")["pos"].shift() + matches.groupby("row")["length"].shift()
+        return matches[~(matches["pos"] < covered_until.fillna(-1))]
+
+    def classify(self, listings: pd.DataFrame) -> pd.DataFrame:
+        """RESULT_COLUMNS for TITLE_COLUMNS rows; title_class is None when no descriptor is present."""
+        listings = listings[TITLE_COLUMNS].reset_index(drop=True)
+        matches = self._matches(listings["listing_title"])
+        rows = pd.RangeIndex(len(listings))
+        # Joined per row with a string sum: matches are already ordered by row and position.
+        found = matches.drop_duplicates(subset=["row", "descriptor"]) if not matches.empty else matches
+        descriptors = (found["descriptor"].astype(object) + ", ").groupby(found["row"]).sum().str[:-2]
+        classes = matches.drop_duplicates(subset=["row", "class"]).sort_values(["row", "class"]) if not matches.empty else matches
+        title_class = (classes["class"].astype(object) + "/").groupby(classes["row"]).sum().str[:-1].reindex(rows)
+        claims_oem = pd.Series(rows.isin(classes.loc[classes["class"] == OEM_CLASS, "row"]), index=rows)
+        other_class = pd.Series(rows.isin(classes.loc[classes["class"] != OEM_CLASS, "row"]), index=rows)
+
+        brand_names = listings["brand_name"].astype(str)
+        distinct = brand_names.unique()
+        brand_classes = brand_names.map({name: self.brand_class(name) for name in distinct})
+        canonical = brand_names.map({name: self.canonical_brand(name) for name in distinct})
+
+        mismatch = pd.Series(None, index=rows, dtype=object)
+        title_class, canonical = title_class.astype(object), canonical.astype(object)
+        oem_claim = claims_oem & ~other_class & (brand_classes != OEM_CLASS)
+        not_oem_claim = other_class & ~claims_oem & (brand_classes == OEM_CLASS)
+        conflicting = claims_oem & other_class
+        if oem_claim.any():
+            mismatch[oem_claim] = "Title claims OEM but " + canonical[oem_claim] + " is not an OEM brand"
+        if not_oem_claim.any():
+            mismatch[not_oem_claim] = ("Title says " + title_class[not_oem_claim] + " but "
+                                       + canonical[not_oem_claim] + " is an OEM brand")
+        if conflicting.any():
+            mismatch[conflicting] = "Title has conflicting descriptors: " + title_class[conflicting]
+
+        return pd.DataFrame({
+            "listing_id": pd.to_numeric(listings["listing_id"]).astype("int64"),
+            "title_class": title_class.where(title_class.notna(), None),
+            "descriptors": descriptors.reindex(rows).astype(object).where(lambda d: d.notna(), None),
+            "brand_class": brand_classes,
+            "mismatch": mismatch
+        })
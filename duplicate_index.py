@@ -0,0 +1,215 @@
+"""Near-duplicate listing detection with MinHash signatures and LSH banding.
+
+A title is shingled into the character trigrams of its normalized form (the same
+normalization as the title index). Trigrams over the 37-letter alphabet are small
+integers already, so they are MinHashed directly: NUM_PERM multiply-shift hash
+functions, keeping each one's minimum over the title's trigrams. Two titles agree on
+a signature position with probability equal to the Jaccard similarity of their
+trigram sets.
+
+Signatures are cut into BANDS bands; listings that share a band exactly, and the
+same (brand_id, part_type_id), land in one bucket. Bucket members become candidate
+pairs (each member against the bucket's first member and its predecessor, which
+keeps the pair count linear for big buckets of identical titles), candidates whose
+signatures agree on at least ``min_similarity`` of positions are kept, and clusters
+are the connected components of the kept pairs.
+
+Signatures are computed once per listing; ingestion only signs inserted and
+updated titles, and deleted listings are masked until the next compaction.
+"""
+import threading
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from title_index import normalize_title
+
+NUM_PERM = 64
+BANDS = 16
+ROWS_PER_BAND = NUM_PERM // BANDS
+MIN_SIMILARITY = 0.8
+TITLE_COLUMNS = ["listing_id", "listing_title", "brand_id", "part_type_id"]
+CLUSTER_COLUMNS = ["cluster_id", "listing_id", "brand_id", "part_type_id", "similarity"]
+
+_ALPHABET = " abcdefghijklmnopqrstuvwxyz0123456789"
+_SEPARATOR = len(_ALPHABET)
+_BASE = len(_ALPHABET) + 1
+_CODES = np.full(256, _SEPARATOR, dtype=np.int64)
+for _i, _ch in enumerate(_ALPHABET):
+    _CODES[ord(_ch)] = _i
+
+# Fixed seed: signatures must not change between processes or rebuilds.
+_rng = np.random.default_rng(20240607)
+_HASH_A = _rng.integers(1, 2 ** 63, NUM_PERM, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+_HASH_B = _rng.integers(0, 2 ** 63, NUM_PERM, dtype=np.uint64)
+_MIX = np.uint64(0x9E3779B97F4A7C15)
+
+
+def shingle_codes(titles: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """(owner, code) for every character trigram of every normalized, space-padded title."""
+    text = "|".join(f" {normalize_title(title)} " for title in titles).encode("ascii", "ignore")
+    chars = _CODES[np.frombuffer(text, dtype=np.uint8)]
+    owner = np.cumsum(chars == _SEPARATOR)
+    codes = chars[:-2] * _BASE * _BASE + chars[1:-1] * _BASE + chars[2:]
+    whole = (chars[:-2] != _SEPARATOR) & (chars[1:-1] != _SEPARATOR) & (chars[2:] != _SEPARATOR)
+    return owner[:-2][whole], codes[whole]
+
+
+def minhash_signatures(titles: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """(signatures (n, NUM_PERM) uint32, has_shingles mask) for titles."""
+    owner, codes = shingle_codes(titles)
+    signatures = np.full((len(titles), NUM_PERM), np.iinfo(np.uint32).max, dtype=np.uint32)
+    if not len(codes):
+        return signatures, np.zeros(len(titles), dtype=bool)
+    owners, starts = np.unique(owner, return_index=True)
+    values = codes.astype(np.uint64)
+    for p in range(NUM_PERM):
+        hashed = (values * _HASH_A[p] + _HASH_B[p]) >> np.uint64(32)
+        signatures[owners, p] = np.minimum.reduceat(hashed, starts).astype(np.uint32)
+    has_shingles = np.zeros(len(titles), dtype=bool)
+    has_shingles[owners] = True
+    return signatures, has_shingles
+
+
+def _band_keys(signatures: np.ndarray, partitions: np.ndarray) -> np.ndarray:
+    """(n, BANDS) uint64 bucket keys mixing the partition, band number and band values."""
+    keys = np.empty((len(signatures), BANDS), dtype=np.uint64)
+    base = (partitions[:, 0].astype(np.uint64) * _MIX) ^ (partitions[:, 1].astype(np.uint64) + _MIX)
+    for band in range(BANDS):
+        key = (base ^ np.uint64(band)) * _MIX
+        for col in range(band * ROWS_PER_BAND, (band + 1) * ROWS_PER_BAND):
+            key = (key ^ signatures[:, col].astype(np.uint64)) * _MIX
+        keys[:, band] = key
+    return keys
+
+
+def _components(n: int, u: np.ndarray, v: np.ndarray) -> np.ndarray:
+    """Connected-component label (smallest member index) for n nodes and edges u-v."""
+    labels = np.arange(n)
+    while True:
+        low = np.minimum(labels[u], labels[v])
+        updated = labels.copy()
+        np.minimum.at(updated, u, low)
+        np.minimum.at(updated, v, low)
+        updated = updated[updated]
+        if np.array_equal(updated, labels):
+            return labels
+        labels = updated
+
+
+class DuplicateIndex:
+    def __init__(self, min_similarity: float = MIN_SIMILARITY):
+        self.min_similarity = min_similarity
+        self._lock = threading.Lock()
+        self._ids = np.zeros(0, dtype=np.int64)
+        self._partitions = np.zeros((0, 2), dtype=np.int64)
+        self._signatures = np.zeros((0, NUM_PERM), dtype=np.uint32)
+        self._keys = np.zeros((0, BANDS), dtype=np.uint64)
+        self._alive = np.zeros(0, dtype=bool)
+        self._row: Dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._row)
+
+    def build(self, listings: pd.DataFrame) -> None:
+        """Replace the index with TITLE_COLUMNS rows."""
+        with self._lock:
+            self._ids = np.zeros(0, dtype=np.int64)
+            self._partitions = np.zeros((0, 2), dtype=np.int64)
+            self._signatures = np.zeros((0, NUM_PERM), dtype=np.uint32)
+            self._keys = np.zeros((0, BANDS), dtype=np.uint64)
+            self._alive = np.zeros(0, dtype=bool)
+            self._row = {}
+            self._append(listings)
+
+    def _append(self, listings: pd.DataFrame) -> None:
+        listings = listings.dropna(subset=TITLE_COLUMNS).drop_duplicates(subset=["listing_id"], keep="last")
+        if listings.empty:
+            return
+        ids = pd.to_numeric(listings["listing_id"]).to_numpy(dtype=np.int64)
+        self._drop(ids)
+        signatures, signed = minhash_signatures(listings["listing_title"].astype(str).tolist())
+        partitions = listings[["brand_id", "part_type_id"]].apply(pd.to_numeric).to_numpy(dtype=np.int64)
+        ids, partitions, signatures = ids[signed], partitions[signed], signatures[signed]
+        start = len(self._ids)
+        self._ids = np.concatenate([self._ids, ids])
+        self._partitions = np.concatenate([self._partitions, partitions])
+        self._signatures = np.concatenate([self._signatures, signatures])
+        self._keys = np.concatenate([self._keys, _band_keys(signatures, partitions)])
+        self._alive = np.concatenate([self._alive, np.ones(len(ids), dtype=bool)])
+        self._row.update(zip(ids.tolist(), range(start, start + len(ids))))
+
+    def _drop(self, listing_ids: Iterable[int]) -> None:
+        for listing_id in listing_ids:
+            row = self._row.pop(int(listing_id), None)
+            if row is not None:
+                self._alive[row] = False
+        if len(self._alive) > 1000 and (~self._alive).sum() * 2 > len(self._alive):
+            keep = self._alive
+            self._ids, self._partitions = self._ids[keep], self._partitions[keep]
+            self._signatures, self._keys = self._signatures[keep], self._keys[keep]
+            self._alive = np.ones(len(self._ids), dtype=bool)
+            self._row = dict(zip(self._ids.tolist(), range(len(self._ids))))
+
+    def apply_listing_changes(self, listing_changes: Dict[str, pd.DataFrame]) -> None:
+        """Apply the "listing" part of a delta-ingestion change set: sign new titles, drop deleted rows."""
+        frames = [listing_changes.get(kind) for kind in ("inserted", "updated")]
+        frames = [df[TITLE_COLUMNS] for df in frames if df is not None and not df.empty]
+        deleted = listing_changes.get("deleted")
+        with self._lock:
+            if deleted is not None and not deleted.empty:
+                self._drop(pd.to_numeric(deleted["listing_id"]).astype(int))
+            if frames:
+                self._append(pd.concat(frames, ignore_index=True))
+
+    def clusters(self) -> pd.DataFrame:
+        """CLUSTER_COLUMNS for every listing in a cluster of two or more near-duplicates.
+
+        ``cluster_id`` is the smallest listing id of the cluster; ``similarity`` is the
+        estimated trigram Jaccard similarity to that listing.
+        """
+        with self._lock:
+            rows = np.flatnonzero(self._alive)
+            ids, partitions = self._ids[rows], self._partitions[rows]
+            signatures, keys = self._signatures[rows], self._keys[rows]
+        n = len(ids)
+        if n < 2:
+            return pd.DataFrame(columns=CLUSTER_COLUMNS)
+
+        # Bucket members are sorted by key, then by row; pair each with its bucket head and predecessor.
+        flat_keys = keys.ravel()
+        members = np.repeat(np.arange(n), BANDS)
+        order = np.lexsort((members, flat_keys))
+        flat_keys, members = flat_keys[order], members[order]
+        same = np.r_[False, flat_keys[1:] == flat_keys[:-1]]
+        heads = np.maximum.accumulate(np.where(~same, np.arange(len(members)), 0))
+        u = np.concatenate([members[same], members[same]])
+        v = np.concatenate([members[heads[same]], members[np.flatnonzero(same) - 1]])
+        pairs = np.unique(np.stack([np.minimum(u, v), np.maximum(u, v)], axis=1), axis=0)
+        pairs = pairs[pairs[:, 0] != pairs[:, 1]]
+        if not len(pairs):
+            return pd.DataFrame(columns=CLUSTER_COLUMNS)
+        u, v = pairs[:, 0], pairs[:, 1]
+        agree = (signatures[u] == signatures[v]).mean(axis=1)
+        keep = (agree >= self.min_similarity) & (partitions[u] == partitions[v]).all(axis=1)
+        u, v = u[keep], v[keep]
+        if not len(u):
+            return pd.DataFrame(columns=CLUSTER_COLUMNS)
+
+        # Label by smallest listing id: order rows by id so the smallest index is the smallest id.
+        by_id = np.argsort(ids, kind="stable")
+        rank = np.empty(n, dtype=np.int64)
+        rank[by_id] = np.arange(n)
+        labels = _components(n, rank[u], rank[v])
+        sizes = np.bincount(labels, minlength=n)
+        in_cluster = np.flatnonzero(sizes[labels] > 1)
+        members = by_id[in_cluster]
+        heads = by_id[labels[in_cluster]]
+        return pd.DataFrame({
+            "cluster_id": ids[heads],
+            "listing_id": ids[members],
+            "brand_id": partitions[members, 0],
+            "part_type_id": partitions[members, 1],
+            "similarity": (signatures[members] == signatures[heads]).mean(axis=1).round(2)
+        })
@@ -0,0 +1,152 @@
+"""Membership index over listing_fitment for "does listing X fit this vehicle?" checks.
+
+Every (listing_id, trim_id, position_id, drive_id) row is packed into one uint64 key,
+fields laid out most significant first with just enough bits for the largest id (plus
+headroom for growth). The keys live in one sorted numpy array, so a check is a binary
+search and a batch of checks is a single vectorized ``searchsorted``. Leaving position
+or drive out of a check (``-1``) asks whether any fitment row matches the rest.
+
+Readers never lock: each update builds a new key array and swaps it in whole.
+"""
+import threading
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+KEY_FIELDS = ["listing_id", "trim_id", "position_id", "drive_id"]
+ANY = -1
+
+
+def _field_bits(maxima: Sequence[int]) -> Tuple[int, ...]:
+    """Bits per field: one bit of headroom each when it fits, so new ids rarely force a repack."""
+    exact = [max(int(m), 1).bit_length() for m in maxima]
+    if sum(exact) > 64:
+        raise ValueError(f"Fitment ids need {sum(exact)} bits and cannot be packed into 64-bit keys")
+    spare = 64 - sum(exact)
+    return tuple(bits + (1 if i < spare else 0) for i, bits in enumerate(exact))
+
+
+class _Layout:
+    def __init__(self, bits: Tuple[int, ...]):
+        self.bits = bits
+        self.limits = [(1 << b) - 1 for b in bits]
+        self.shifts = [sum(bits[i + 1:]) for i in range(len(bits))]
+
+    def fits(self, columns: Sequence[np.ndarray]) -> np.ndarray:
+        ok = np.ones(len(columns[0]), dtype=bool)
+        for values, limit in zip(columns, self.limits):
+            ok &= (values >= 0) & (values <= limit)
+        return ok
+
+    def pack(self, columns: Sequence[np.ndarray]) -> np.ndarray:
+        key = np.zeros(len(columns[0]), dtype=np.uint64)
+        for values, shift in zip(columns, self.shifts):
+            key |= values.astype(np.uint64) << np.uint64(shift)
+        return key
+
+    def unpack(self, keys: np.ndarray, field: int) -> np.ndarray:
+        return ((keys >> np.uint64(self.shifts[field])) & np.uint64(self.limits[field])).astype(np.int64)
+
+
+def _columns(df: pd.DataFrame) -> Tuple[np.ndarray, ...]:
+    return tuple(pd.to_numeric(df[field]).to_numpy(dtype=np.int64) for field in KEY_FIELDS)
+
+
+class FitmentIndex:
+    def __init__(self):
+        self._write_lock = threading.Lock()
+        # (layout, keys) is swapped as one reference so readers always see a matching pair.
+        self._state = (_Layout(_field_bits([1] * len(KEY_FIELDS))), np.zeros(0, dtype=np.uint64))
+
+    def __len__(self) -> int:
+        return len(self._state[1])
+
+    def build(self, fitment: pd.DataFrame) -> None:
+        """Replace the index with listing_fitment rows (KEY_FIELDS columns)."""
+        columns = _columns(fitment)
+        with self._write_lock:
+            self._swap(columns)
+
+    def _swap(self, columns: Tuple[np.ndarray, ...]) -> None:
+        maxima = [int(values.max()) if len(values) else 1 for values in columns]
+        layout = _Layout(_field_bits(maxima))
+        self._state = (layout, np.unique(layout.pack(columns)))
+
+    def apply_changes(self, changes: Dict[str, Dict[str, pd.DataFrame]]) -> None:
+        """Apply a delta-ingestion change set: listing_fitment inserts/deletes and deleted listings."""
+        fitment = changes.get("listing_fitment", {})
+        inserted = fitment.get("inserted")
+        deleted = fitment.get("deleted")
+        listings = changes.get("listing", {}).get("deleted")
+        with self._write_lock:
+            layout, keys = self._state
+            if deleted is not None and not deleted.empty:
+                columns = _columns(deleted)
+                ok = layout.fits(columns)
+                keys = np.setdiff1d(keys, layout.pack([c[ok] for c in columns]), assume_unique=True)
+            if listings is not None and not listings.empty:
+                gone = pd.to_numeric(listings['listing_id']).to_numpy(dtype=np.int64)
+                keys = keys[~np.isin(layout.unpack(keys, 0), gone)]
+            if inserted is not None and not inserted.empty:
+                columns = _columns(inserted)
+                if not layout.fits(columns).all():
+                    # An id outgrew its bit field: repack everything with a wider layout.
+                    current = tuple(layout.unpack(keys, i) for i in range(len(KEY_FIELDS)))
+                    self._swap(tuple(np.concatenate(pair) for pair in zip(current, columns)))
+                    return
+                keys = np.union1d(keys, layout.pack(columns))
+            self._state = (layout, keys)
+
+    def check(
+        self,
+        listing_ids: Iterable[int],
+        trim_ids: Iterable[int],
+        position_ids: Optional[Iterable[int]] = None,
+        drive_ids: Optional[Iterable[int]] = None
+    ) -> np.ndarray:
+        """Vectorized membership test; ANY (-1) or None position/drive matches any value."""
+        listing = np.asarray(list(listing_ids), dtype=np.int64)
+        trim = np.asarray(list(trim_ids), dtype=np.int64)
+        n = len(listing)
+        position = np.full(n, ANY, dtype=np.int64) if position_ids is None else np.asarray(list(position_ids), dtype=np.int64)
+        drive = np.full(n, ANY, dtype=np.int64) if drive_ids is None else np.asarray(list(drive_ids), dtype=np.int64)
+        if not (len(trim) == len(position) == len(drive) == n):
+            raise ValueError("listing, trim, position and drive ids must have the same length")
+
+        layout, keys = self._state
+        any_position, any_drive = position == ANY, drive == ANY
+        lo = [listing, trim, np.where(any_position, 0, position), np.where(any_drive, 0, drive)]
+        hi = [listing, trim,
+              np.where(any_position, layout.limits[2], position),
+              np.where(any_drive, layout.limits[3], drive)]
+        valid = layout.fits(lo) & layout.fits(hi)
+        result = np.zeros(n, dtype=bool)
+        if not valid.any() or not len(keys):
+            return result
+        start = np.searchsorted(keys, layout.pack([c[valid] for c in lo]), side="left")
+        stop = np.searchsorted(keys, layout.pack([c[valid] for c in hi]), side="right")
+        result[valid] = stop > start
+
+        # A fixed drive under a wildcard position is not a key prefix: look inside the
+        # (listing, trim) slice, which holds only a handful of rows.
+        rows = np.flatnonzero(valid)
+        for i in np.flatnonzero(any_position[rows] & ~any_drive[rows] & (stop > start)):
+            row = rows[i]
+            result[row] = bool((layout.unpack(keys[start[i]:stop[i]], 3) == drive[row]).any())
+        return result
+
+    def fits(self, listing_id: int, trim_id: int, position_id: Optional[int] = None, drive_id: Optional[int] = None) -> bool:
+        """Single check with plain integer packing, avoiding the array setup of check()."""
+        position = ANY if position_id is None else int(position_id)
+        drive = ANY if drive_id is None else int(drive_id)
+        if position == ANY and drive != ANY:
+            return bool(self.check([listing_id], [trim_id], [position], [drive])[0])
+        layout, keys = self._state
+        lo = [int(listing_id), int(trim_id), 0 if position == ANY else position, 0 if drive == ANY else drive]
+        hi = lo[:2] + [layout.limits[2] if position == ANY else position, layout.limits[3] if drive == ANY else drive]
+        if not all(0 <= value <= limit for value, limit in zip(lo + hi, layout.limits * 2)):
+            return False
+        lo_key = sum(value << shift for value, shift in zip(lo, layout.shifts))
+        hi_key = sum(value << shift for value, shift in zip(hi, layout.shifts))
+        return bool(keys.searchsorted(np.uint64(hi_key), side="right") > keys.searchsorted(np.uint64(lo_key), side="left"))
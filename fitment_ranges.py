@@ -0,0 +1,86 @@
+"""Range-compressed encoding of listing_fitment.
+
+listing_fitment has one row per (listing, trim, position, drive), and trims are
+per model year, so a part that fits a model run explodes into one row per year
+and trim. The range encoding stores one row per run of consecutive years instead:
+
+    listing_id, model_id, trim_name, year_from, year_to, position_id, drive_id, trim_id
+
+A range row stands for every trim of ``model_id`` named ``trim_name`` with a year
+in ``[year_from, year_to]``. Runs only cover consecutive calendar years that are all
+fitted, so expanding a range can never pick up a year the listing does not fit.
+Trims that a (model, year, name) triple does not identify uniquely, or that lack
+one of those fields, are kept as exact rows with ``trim_id`` set.
+
+``View_ListingFitmentExpanded`` (sql/fitment_ranges.sql) expands the ranges back
+into listing_fitment rows; ``expand_ranges`` does the same in memory.
+"""
+from typing import List
+
+import pandas as pd
+
+FITMENT_KEY = ["listing_id", "trim_id", "position_id", "drive_id"]
+TRIM_COLUMNS = ["trim_id", "model_id", "trim_name", "year"]
+RANGE_COLUMNS = [
+    "listing_id", "model_id", "trim_name", "year_from", "year_to",
+    "position_id", "drive_id", "trim_id"
+]
+_RUN_KEY = ["listing_id", "model_id", "trim_name", "position_id", "drive_id"]
+
+
+def year_runs(rows: pd.DataFrame, key: List[str], year: str = "year") -> pd.DataFrame:
+    """Collapse (key, year) rows into runs of consecutive years: key columns + year_from, year_to.
+
+    Rows with a null key or year each form their own run.
+    """
+    rows = rows[key + [year]].drop_duplicates().sort_values(key + [year])
+    if rows.empty:
+        return pd.DataFrame(columns=key + ["year_from", "year_to"])
+    # A new run starts whenever the key changes or the year is not the previous year + 1.
+    same_key = (rows[key] == rows[key].shift()).all(axis=1)
+    consecutive = rows[year] == rows[year].shift() + 1
+    grouped = rows.groupby((~(same_key & consecutive)).cumsum().to_numpy(), dropna=False)
+    runs = grouped[key].first()
+    runs["year_from"] = grouped[year].min()
+    runs["year_to"] = grouped[year].max()
+    return runs.reset_index(drop=True)
+
+
+def ambiguous_trim_ids(trims: pd.DataFrame) -> pd.Series:
+    """Trim ids that (model_id, trim_name, year) cannot stand for unambiguously."""
+    incomplete = trims[TRIM_COLUMNS[1:]].isna().any(axis=1)
+    shared = trims.duplicated(subset=TRIM_COLUMNS[1:], keep=False)
+    return trims.loc[incomplete | shared, "trim_id"]
+
+
+def compress_fitment(fitment: pd.DataFrame, trims: pd.DataFrame) -> pd.DataFrame:
+    """Encode listing_fitment rows (FITMENT_KEY columns) as RANGE_COLUMNS rows."""
+    fitment = fitment[FITMENT_KEY].drop_duplicates()
+    exact_ids = ambiguous_trim_ids(trims)
+    rows = fitment.merge(trims[TRIM_COLUMNS], on="trim_id", how="left")
+
+    exact = rows[rows["trim_id"].isin(exact_ids) | rows["model_id"].isna()].copy()
+    exact["trim_name"] = None
+    exact["year_from"] = exact["year"]
+    exact["year_to"] = exact["year"]
+
+    runs = year_runs(rows[~rows.index.isin(exact.index)], _RUN_KEY)
+    runs["trim_id"] = None
+
+    result = pd.concat([runs[RANGE_COLUMNS], exact[RANGE_COLUMNS]], ignore_index=True)
+    for col in ["listing_id", "model_id", "year_from", "year_to", "position_id", "drive_id", "trim_id"]:
+        result[col] = pd.to_numeric(result[col]).astype("Int64")
+    result["trim_name"] = result["trim_name"].astype(object).where(result["trim_name"].notna(), None)
+    return result.sort_values(["listing_id", "model_id", "year_from"], kind="stable").reset_index(drop=True)
+
+
+def expand_ranges(ranges: pd.DataFrame, trims: pd.DataFrame) -> pd.DataFrame:
+    """Decode RANGE_COLUMNS rows back into listing_fitment rows (FITMENT_KEY columns)."""
+    exact = ranges[ranges["trim_id"].notna()]
+    ranged = ranges[ranges["trim_id"].isna()].drop(columns=["trim_id"])
+    ranged = ranged.merge(trims[TRIM_COLUMNS], on=["model_id", "trim_name"])
+    ranged = ranged[(ranged["year"] >= ranged["year_from"]) & (ranged["year"] <= ranged["year_to"])]
+    expanded = pd.concat([ranged[FITMENT_KEY], exact[FITMENT_KEY]], ignore_index=True)
+    for col in FITMENT_KEY:
+        expanded[col] = pd.to_numeric(expanded[col]).astype("Int64")
+    return expanded.sort_values(FITMENT_KEY).reset_index(drop=True)
@@ -0,0 +1,138 @@
+"""Trim × part type coverage matrix, for "which vehicles have no listings of this part type?".
+
+Only covered cells are stored: every (trim_id, part_type_id) pair with at least one
+listing is packed into one uint64 key (trim id in the high 32 bits) in a sorted numpy
+array, with its count of distinct listings alongside. A gap is a pair whose key is
+absent, so a report is a vectorized ``searchsorted`` over the cross product of the
+filtered trims and part types rather than an anti-join over the whole catalog.
+
+Incremental refreshes replace whole trims: the caller recounts every trim a change
+touched and swaps those trims' cells in, so counts cannot drift from the tables.
+"""
+import threading
+from typing import Iterable, Iterator, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+CELL_COLUMNS = ["trim_id", "part_type_id", "listings"]
+VEHICLE_COLUMNS = ["make_id", "make_name", "model_id", "model_name", "year", "trim_id", "trim_name"]
+MODEL_YEAR_COLUMNS = ["make_id", "make_name", "model_id", "model_name", "year"]
+PART_TYPE_COLUMNS = ["part_type_id", "parttype_name"]
+# Upper bound on (trim, part type) cells probed per vectorized step.
+BLOCK_CELLS = 4_000_000
+
+
+def _pack(trim_ids: np.ndarray, part_type_ids: np.ndarray) -> np.ndarray:
+    return (trim_ids.astype(np.uint64) << np.uint64(32)) | part_type_ids.astype(np.uint64)
+
+
+def _ids(values: Iterable[int]) -> np.ndarray:
+    return pd.to_numeric(pd.Series(list(values), dtype=object)).to_numpy(dtype=np.int64)
+
+
+def _sorted_cells(cells: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+    cells = cells[pd.to_numeric(cells["listings"]) > 0]
+    keys = _pack(_ids(cells["trim_id"]), _ids(cells["part_type_id"]))
+    counts = _ids(cells["listings"])
+    order = np.argsort(keys, kind="stable")
+    return keys[order], counts[order]
+
+
+class CoverageMatrix:
+    def __init__(self):
+        self._write_lock = threading.Lock()
+        # (keys, counts) is swapped as one reference so readers always see a matching pair.
+        self._state = (np.zeros(0, dtype=np.uint64), np.zeros(0, dtype=np.int64))
+        self.vehicles = pd.DataFrame(columns=VEHICLE_COLUMNS)
+        self.part_types = pd.DataFrame(columns=PART_TYPE_COLUMNS)
+
+    def __len__(self) -> int:
+        return len(self._state[0])
+
+    def build(self, cells: pd.DataFrame, vehicles: pd.DataFrame, part_types: pd.DataFrame) -> None:
+        """Replace the matrix: covered cells (CELL_COLUMNS), the trims and the part types to report on."""
+        self.vehicles = vehicles[VEHICLE_COLUMNS].sort_values(
+            ["make_name", "model_name", "year", "trim_name"], kind="stable"
+        ).reset_index(drop=True)
+        self.part_types = part_types[PART_TYPE_COLUMNS].sort_values("parttype_name").reset_index(drop=True)
+        state = _sorted_cells(cells)
+        with self._write_lock:
+            self._state = state
+
+    def replace_trims(self, trim_ids: Iterable[int], cells: pd.DataFrame) -> None:
+        """Swap in fresh counts for trim_ids; ``cells`` must hold every covered cell of those trims."""
+        trims = _ids(trim_ids).astype(np.uint64)
+        fresh_keys, fresh_counts = _sorted_cells(cells)
+        with self._write_lock:
+            keys, counts = self._state
+            keep = ~np.isin(keys >> np.uint64(32), trims)
+            keys = np.concatenate([keys[keep], fresh_keys])
+            counts = np.concatenate([counts[keep], fresh_counts])
+            order = np.argsort(keys, kind="stable")
+            self._state = (keys[order], counts[order])
+
+    def listing_counts(self, trim_ids: Sequence[int], part_type_ids: Sequence[int]) -> np.ndarray:
+        """Listings per cell of the cross product, shape (len(trim_ids), len(part_type_ids))."""
+        trims, part_types = _ids(trim_ids), _ids(part_type_ids)
+        keys, counts = self._state
+        grid = _pack(np.repeat(trims, len(part_types)), np.tile(part_types, len(trims)))
+        result = np.zeros(len(grid), dtype=np.int64)
+        if len(keys) and len(grid):
+            pos = np.minimum(np.searchsorted(keys, grid), len(keys) - 1)
+            hit = keys[pos] == grid
+            result[hit] = counts[pos[hit]]
+        return result.reshape(len(trims), len(part_types))
+
+    def _covered_blocks(self, vehicles: pd.DataFrame, part_types: pd.DataFrame) -> Iterator[Tuple[int, np.ndarray]]:
+        """(first vehicle row, covered bool block) over vehicles, BLOCK_CELLS cells at a time."""
+        part_type_ids = part_types["part_type_id"].to_numpy()
+        step = max(1, BLOCK_CELLS // max(len(part_type_ids), 1))
+        trim_ids = vehicles["trim_id"].to_numpy()
+        for start in range(0, len(trim_ids), step):
+            yield start, self.listing_counts(trim_ids[start:start + step], part_type_ids) > 0
+
+    def gaps(
+        self,
+        make_id: Optional[int] = None,
+        model_id: Optional[int] = None,
+        part_type_ids: Optional[Sequence[int]] = None,
+        by_model_year: bool = False
+    ) -> pd.DataFrame:
+        """Vehicles with no listings of a part type, one row per (vehicle, part type).
+
+        Vehicles are trims, or model years when ``by_model_year`` (a model year is covered
+        when any of its trims is). Columns: the vehicle columns plus PART_TYPE_COLUMNS.
+        """
+        vehicles = self.vehicles
+        if make_id is not None:
+            vehicles = vehicles[vehicles["make_id"] == make_id]
+        if model_id is not None:
+            vehicles = vehicles[vehicles["model_id"] == model_id]
+        vehicles = vehicles.reset_index(drop=True)
+        part_types = self.part_types
+        if part_type_ids is not None:
+            part_types = part_types[part_types["part_type_id"].isin(list(part_type_ids))]
+        part_types = part_types.reset_index(drop=True)
+
+        if by_model_year:
+            # Groups are numbered in order of first appearance, matching drop_duplicates.
+            group = vehicles.groupby(MODEL_YEAR_COLUMNS, sort=False, dropna=False).ngroup().to_numpy()
+            rows = vehicles.drop_duplicates(subset=MODEL_YEAR_COLUMNS)[MODEL_YEAR_COLUMNS].reset_index(drop=True)
+            covered = np.zeros((len(rows), len(part_types)), dtype=bool)
+            for start, block in self._covered_blocks(vehicles, part_types):
+                np.logical_or.at(covered, group[start:start + len(block)], block)
+            vehicle_idx, part_type_idx = np.nonzero(~covered)
+        else:
+            rows = vehicles
+            vehicle_parts, part_type_parts = [np.zeros(0, dtype=np.int64)], [np.zeros(0, dtype=np.int64)]
+            for start, block in self._covered_blocks(vehicles, part_types):
+                v, p = np.nonzero(~block)
+                vehicle_parts.append(start + v)
+                part_type_parts.append(p)
+            vehicle_idx, part_type_idx = np.concatenate(vehicle_parts), np.concatenate(part_type_parts)
+
+        result = rows.iloc[vehicle_idx].reset_index(drop=True)
+        for col in PART_TYPE_COLUMNS:
+            result[col] = part_types[col].to_numpy()[part_type_idx]
+        return result
@@ -0,0 +1,197 @@
+import argparse
+import logging
+import sys
+
+import pandas as pd
+
+import app
+from db_backend import create_sqlite_database
+from snapshot import write_snapshot
+
+logger = logging.getLogger("manage")
+
+
+def cmd_ingest(args: argparse.Namespace) -> int:
+    listings_feed = pd.read_csv(args.listings)
+    fitment_feed = pd.read_csv(args.fitment)
+
+    changes = app.apply_listing_delta(
+        listings_feed,
+        fitment_feed,
+        full_snapshot=not args.partial,
+        dry_run=args.dry_run
+    )
+
+    for table, table_changes in changes.items():
+        counts = ", ".join(f"{kind}={len(df)}" for kind, df in table_changes.items())
+        print(f"{table}: {counts}")
+    if args.dry_run:
+        print("Dry run: no changes were written.")
+    return 0
+
+
+def cmd_load_trims(args: argparse.Namespace) -> int:
+    mismatches = app.bulk_load_trims(pd.read_csv(args.trims))
+    if mismatches.empty:
+        print("Trim load complete: View_TrimMakeMismatch is empty.")
+        return 0
+    print(f"Trim load complete but {len(mismatches)} trims are inconsistent with MODEL:")
+    print(mismatches.to_string(index=False))
+    return 2
+
+
+def cmd_init_sqlite(args: argparse.Namespace) -> int:
+    create_sqlite_database(args.path, args.seed)
+    print(f"SQLite database ready at {args.path}. Run the app with DB_BACKEND=sqlite SQLITE_PATH={args.path}")
+    return 0
+
+
+def cmd_snapshot(args: argparse.Namespace) -> int:
+    if not args.dir:
+        print("No snapshot directory: pass --dir or set FITMENT_SNAPSHOT_DIR.")
+        return 1
+    name = write_snapshot(app.iter_query(app.FITMENT_SNAPSHOT_SQL, chunk_size=args.chunk_size), args.dir)
+    print(f"Snapshot {name} is now CURRENT in {args.dir}")
+    return 0
+
+
+def cmd_refresh_denorm(args: argparse.Namespace) -> int:
+    app.refresh_fitment_denorm(full=args.full)
+    kind = "Full" if args.full else "Incremental"
+    print(f"{kind} refresh of fitment_denorm complete.")
+    return 0
+
+
+def cmd_compress_fitment(args: argparse.Namespace) -> int:
+    counts = app.rebuild_fitment_ranges()
+    ratio = counts["fitment_rows"] / max(counts["range_rows"], 1)
+    print(f"Encoded {counts['fitment_rows']} listing_fitment rows as {counts['range_rows']} range rows ({ratio:.1f}x).")
+    mismatches = app.validate_fitment_ranges()
+    if mismatches.empty:
+        print("View_FitmentRangeMismatch is empty: the ranges expand to exactly listing_fitment.")
+        return 0
+    print(f"{len(mismatches)} rows differ between the expanded ranges and listing_fitment:")
+    print(mismatches.to_string(index=False))
+    return 2
+
+
+def cmd_price_anomalies(args: argparse.Namespace) -> int:
+    anomalies = app.scan_listing_prices()
+    if anomalies.empty:
+        print("No price outliers found.")
+        return 0
+    report = app.price_anomaly_report(anomalies)
+    if args.csv:
+        report.to_csv(args.csv, index=False)
+        print(f"Wrote {len(report)} price outliers to {args.csv}.")
+    else:
+        print(report.head(args.limit).to_string(index=False))
+    return 2
+
+
+def cmd_suggest_mpn(args: argparse.Namespace) -> int:
+    report = app.suggest_missing_mpns(args.min_confidence)
+    if report.empty:
+        print("No MPN suggestions.")
+        return 0
+    report.to_csv(args.csv, index=False)
+    print(f"Wrote {len(report)} MPN suggestions to {args.csv}.")
+    return 0
+
+
+def cmd_classify_descriptors(args: argparse.Namespace) -> int:
+    classified, flagged = app.classify_listing_descriptors()
+    print(f"Classified {classified} listings into listing_descriptor; {flagged} OEM descriptor mismatches.")
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Auto Parts Fitment Explorer maintenance commands")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    ingest = subparsers.add_parser(
+        "ingest",
+        help="Apply a listing/listing_fitment feed as a delta (inserts, updates, deletes only)"
+    )
+    ingest.add_argument("--listings", required=True, help="CSV with listing_id, listing_title, price, brand_id, part_type_id, mpn")
+    ingest.add_argument("--fitment", required=True, help="CSV with listing_id, trim_id, position_id, drive_id")
+    ingest.add_argument(
+        "--partial",
+        action="store_true",
+        help="Feed only covers the listings it contains: never delete listings, replace fitment only for listings in the fitment file"
+    )
+    ingest.add_argument("--dry-run", action="store_true", help="Compute and print the change set without writing")
+    ingest.set_defaults(func=cmd_ingest)
+
+    load_trims = subparsers.add_parser(
+        "load-trims",
+        help="Bulk load trims through trim_stage with a set-based make_id join instead of the row trigger, then validate"
+    )
+    load_trims.add_argument("--trims", required=True, help="CSV with trim_id, trim_name, model_id, year")
+    load_trims.set_defaults(func=cmd_load_trims)
+
+    init_sqlite = subparsers.add_parser(
+        "init-sqlite",
+        help="Create the embedded SQLite database (tables + View_NormalizedFitment), optionally seeded"
+    )
+    init_sqlite.add_argument("--path", default=app.SQLITE_PATH, help="Database file to create or update")
+    init_sqlite.add_argument("--seed", help="Seed script whose INSERT statements are loaded, e.g. sql/web_demo_seed.sql")
+    init_sqlite.set_defaults(func=cmd_init_sqlite)
+
+    snapshot = subparsers.add_parser(
+        "snapshot",
+        help="Export View_NormalizedFitment to a new Arrow snapshot version and make it CURRENT"
+    )
+    snapshot.add_argument("--dir", default=app.FITMENT_SNAPSHOT_DIR, help="Snapshot directory (default: FITMENT_SNAPSHOT_DIR)")
+    snapshot.add_argument("--chunk-size", type=int, default=50000, help="Rows fetched per round trip while exporting")
+    snapshot.set_defaults(func=cmd_snapshot)
+
+    refresh_denorm = subparsers.add_parser(
+        "refresh-denorm",
+        help="Rebuild fitment_denorm rows for listings marked dirty since the last refresh"
+    )
+    refresh_denorm.add_argument("--full", action="store_true", help="Rebuild the whole table from View_NormalizedFitment")
+    refresh_denorm.set_defaults(func=cmd_refresh_denorm)
+
+    compress_fitment = subparsers.add_parser(
+        "compress-fitment",
+        help="Rebuild listing_fitment_range (year-range encoding of listing_fitment) and validate it"
+    )
+    compress_fitment.set_defaults(func=cmd_compress_fitment)
+
+    price_anomalies = subparsers.add_parser(
+        "price-anomalies",
+        help="Scan listing prices for outliers within each (part type, trim, position) slot; exits 2 when any are found"
+    )
+    price_anomalies.add_argument("--csv", help="Write every flagged listing to this CSV instead of printing")
+    price_anomalies.add_argument("--limit", type=int, default=50, help="Rows to print without --csv (default 50)")
+    price_anomalies.set_defaults(func=cmd_price_anomalies)
+
+    suggest_mpn = subparsers.add_parser(
+        "suggest-mpn",
+        help="Suggest an MPN for every listing with a NULL mpn from similar listings of the same brand and part type"
+    )
+    suggest_mpn.add_argument("--csv", required=True, help="Output CSV, most confident suggestions first")
+    suggest_mpn.add_argument("--min-confidence", type=float, default=0.0, help="Leave out suggestions below this confidence (0-1)")
+    suggest_mpn.set_defaults(func=cmd_suggest_mpn)
+
+    classify_descriptors = subparsers.add_parser(
+        "classify-descriptors",
+        help="Reclassify OEM/aftermarket descriptors in every listing title into listing_descriptor"
+    )
+    classify_descriptors.set_defaults(func=cmd_classify_descriptors)
+
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    try:
+        return args.func(args)
+    except Exception as e:
+        logger.error(f"{args.command} failed: {e}")
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
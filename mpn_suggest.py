@@ -0,0 +1,132 @@
+"""MPN suggestions for listings without one, from similar listings that have one.
+
+Listings with an MPN are indexed by (brand_id, part_type_id, title token): the
+partition and token are factorized to integer codes and packed into one int64 key,
+and the keys sit in a sorted numpy array next to the listing rows they point to.
+A listing missing its MPN looks up each of its tokens within its own brand and part
+type, so the work is linear in the postings touched; tokens shared by more than
+``max_postings`` listings are too common to tell parts apart and are not looked up.
+
+Similarity is the IDF-weighted Jaccard of the two token sets. Each candidate MPN
+scores the similarity of its best matching listing, and the confidence of the best
+MPN is that similarity scaled by its share of the top two scores, so a close
+runner-up halves it at worst.
+"""
+from typing import Iterable, List
+
+import numpy as np
+import pandas as pd
+
+from title_index import normalize_title
+
+MPN_INDEX_COLUMNS = ["listing_id", "listing_title", "brand_id", "part_type_id", "mpn"]
+MPN_QUERY_COLUMNS = ["listing_id", "listing_title", "brand_id", "part_type_id"]
+SUGGESTION_COLUMNS = [
+    "listing_id", "suggested_mpn", "confidence", "similarity", "matched_listing_id",
+    "runner_up_mpn", "runner_up_similarity"
+]
+MAX_POSTINGS = 2000
+
+
+def _tokens(titles: pd.Series) -> pd.DataFrame:
+    """Distinct (row, token) pairs for titles, row being the position in ``titles``."""
+    tokens = titles.astype(str).map(normalize_title).str.split()
+    exploded = pd.DataFrame({"row": np.arange(len(titles))}).assign(token=tokens.to_numpy()).explode("token")
+    return exploded.dropna(subset=["token"]).drop_duplicates()
+
+
+def normalize_mpn(mpn: str) -> str:
+    return "".join(ch for ch in str(mpn).upper() if ch.isalnum())
+
+
+class MpnSuggester:
+    def __init__(self, max_postings: int = MAX_POSTINGS):
+        self.max_postings = max_postings
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def build(self, listings: pd.DataFrame) -> None:
+        """Index MPN_INDEX_COLUMNS rows that have an MPN."""
+        listings = listings[MPN_INDEX_COLUMNS].dropna()
+        listings = listings[listings["mpn"].astype(str).map(normalize_mpn) != ""].reset_index(drop=True)
+        tokens = _tokens(listings["listing_title"])
+        self._vocabulary = pd.Index(tokens["token"].unique())
+        self._partitions = pd.MultiIndex.from_frame(
+            listings[["brand_id", "part_type_id"]].apply(pd.to_numeric).drop_duplicates()
+        )
+        token_codes = self._vocabulary.get_indexer(tokens["token"])
+        frequency = np.bincount(token_codes, minlength=len(self._vocabulary))
+        self._idf = np.log((len(listings) + 1) / (frequency + 1)) + 1.0
+        self._unknown_idf = np.log(len(listings) + 1) + 1.0
+
+        rows = tokens["row"].to_numpy(dtype=np.int64)
+        keys = self._keys(listings.iloc[rows], token_codes)
+        order = np.argsort(keys, kind="stable")
+        self._postings_keys, self._postings_rows = keys[order], rows[order]
+        self._weights = np.bincount(rows, weights=self._idf[token_codes], minlength=len(listings))
+        self._ids = pd.to_numeric(listings["listing_id"]).to_numpy(dtype=np.int64)
+        self._mpns = listings["mpn"].astype(str).to_numpy()
+        self._mpn_keys = listings["mpn"].astype(str).map(normalize_mpn).to_numpy()
+        self._size = len(listings)
+
+    def _keys(self, rows: pd.DataFrame, token_codes: np.ndarray) -> np.ndarray:
+        """Packed (partition, token) keys; -1 where the partition or token is not indexed."""
+        partitions = self._partitions.get_indexer(
+            pd.MultiIndex.from_frame(rows[["brand_id", "part_type_id"]].apply(pd.to_numeric))
+        )
+        keys = partitions.astype(np.int64) * max(len(self._vocabulary), 1) + token_codes
+        return np.where((partitions < 0) | (token_codes < 0), -1, keys)
+
+    def suggest(self, missing: pd.DataFrame) -> pd.DataFrame:
+        """SUGGESTION_COLUMNS for MPN_QUERY_COLUMNS rows; listings with no similar indexed listing are left out."""
+        missing = missing[MPN_QUERY_COLUMNS].dropna().reset_index(drop=True)
+        if missing.empty or not self._size:
+            return pd.DataFrame(columns=SUGGESTION_COLUMNS)
+        tokens = _tokens(missing["listing_title"])
+        token_codes = self._vocabulary.get_indexer(tokens["token"])
+        query_rows = tokens["row"].to_numpy(dtype=np.int64)
+        token_idf = np.where(token_codes >= 0, self._idf[np.maximum(token_codes, 0)], self._unknown_idf)
+        query_weights = np.bincount(query_rows, weights=token_idf, minlength=len(missing))
+
+        keys = self._keys(missing.iloc[query_rows], token_codes)
+        lo = np.searchsorted(self._postings_keys, keys, side="left")
+        hi = np.searchsorted(self._postings_keys, keys, side="right")
+        n = np.where((keys >= 0) & (hi - lo <= self.max_postings), hi - lo, 0)
+        q = np.repeat(query_rows, n)
+        r = self._postings_rows[np.repeat(lo, n) + (np.arange(n.sum()) - np.repeat(np.cumsum(n) - n, n))]
+        if not len(q):
+            return pd.DataFrame(columns=SUGGESTION_COLUMNS)
+        pairs, inverse = np.unique(q * self._size + r, return_inverse=True)
+        shared = np.bincount(inverse, weights=np.repeat(token_idf, n))
+        q, r = pairs // self._size, pairs % self._size
+        similarity = shared / (query_weights[q] + self._weights[r] - shared)
+
+        matches = pd.DataFrame({"q": q, "r": r, "similarity": similarity, "mpn_key": self._mpn_keys[r]})
+        # Best listing per (query, MPN), then the top two MPNs per query.
+        matches = matches.sort_values(["q", "similarity", "r"], ascending=[True, False, True])
+        best = matches.drop_duplicates(subset=["q", "mpn_key"])
+        rank = best.groupby("q").cumcount()
+        top, runner_up = best[rank == 0].set_index("q"), best[rank == 1].set_index("q")
+        second = runner_up["similarity"].reindex(top.index).fillna(0.0)
+        result = pd.DataFrame({
+            "listing_id": pd.to_numeric(missing["listing_id"]).to_numpy(dtype=np.int64)[top.index],
+            "suggested_mpn": self._mpns[top["r"]],
+            "confidence": (top["similarity"] * top["similarity"] / (top["similarity"] + second)).round(3).to_numpy(),
+            "similarity": top["similarity"].round(3).to_numpy(),
+            "matched_listing_id": self._ids[top["r"]],
+            "runner_up_mpn": pd.Series(self._mpns[runner_up["r"]], index=runner_up.index).reindex(top.index).to_numpy(),
+            "runner_up_similarity": runner_up["similarity"].round(3).reindex(top.index).to_numpy()
+        })
+        return result.sort_values(["confidence", "listing_id"], ascending=[False, True]).reset_index(drop=True)
+
+    def suggest_batches(self, chunks: Iterable[pd.DataFrame]) -> pd.DataFrame:
+        """suggest() over a stream of missing-MPN chunks, most confident first."""
+        results: List[pd.DataFrame] = [self.suggest(chunk) for chunk in chunks]
+        results = [df for df in results if not df.empty]
+        if not results:
+            return pd.DataFrame(columns=SUGGESTION_COLUMNS)
+        return pd.concat(results, ignore_index=True).sort_values(
+            ["confidence", "listing_id"], ascending=[False, True]
+        ).reset_index(drop=True)
@@ -0,0 +1,88 @@
+"""Robust price-outlier scoring over a streamed (part type, vehicle slot) extract.
+
+Listings are compared with the other listings of the same part type that fit the
+same vehicle slot, (trim_id, position_id). Prices are compared on a log scale, so
+a part at three times the going price is as far out as one at a third of it. Each
+group's centre and spread are the median and MAD of log prices, which a handful of
+mispriced rows cannot drag along, and a price is scored with the modified z-score
+0.6745 * (log price - median) / MAD. Rows without a positive price are skipped.
+
+The extract must arrive ordered by GROUP_COLUMNS so groups are contiguous. Each
+chunk is scored in one vectorized groupby pass; the last group of a chunk may
+continue in the next one, so it is carried over instead of scored. Memory is
+bounded by the chunk size plus the largest group, and only flagged rows are kept.
+"""
+from typing import Iterable, List
+
+import numpy as np
+import pandas as pd
+
+GROUP_COLUMNS = ["part_type_id", "trim_id", "position_id"]
+EXTRACT_COLUMNS = GROUP_COLUMNS + ["listing_id", "price"]
+FLAGGED_COLUMNS = EXTRACT_COLUMNS + ["group_size", "median_price", "log_mad", "z_score"]
+ANOMALY_COLUMNS = FLAGGED_COLUMNS + ["outlier_slots"]
+# Iglewicz and Hoaglin's cut-off for the modified z-score.
+Z_THRESHOLD = 3.5
+MIN_GROUP_SIZE = 8
+# MAD is zero when most of a group shares one price; the mean absolute deviation,
+# rescaled to the same units, still separates the rows that differ.
+MEAN_AD_SCALE = 1.253314
+# Prices within this factor of the slot median are never flagged, however tight the group.
+MIN_PRICE_RATIO = 1.5
+
+
+def score_groups(rows: pd.DataFrame, threshold: float = Z_THRESHOLD, min_group_size: int = MIN_GROUP_SIZE) -> pd.DataFrame:
+    """FLAGGED_COLUMNS rows whose |z| exceeds threshold, for complete groups of EXTRACT_COLUMNS rows."""
+    price = np.log(pd.to_numeric(rows["price"]).astype(float))
+    groups = rows[GROUP_COLUMNS].astype("int64")
+    grouped = price.groupby([groups[col] for col in GROUP_COLUMNS], sort=False)
+    size = grouped.transform("size")
+    median = grouped.transform("median")
+    deviation = (price - median).abs()
+    by_deviation = deviation.groupby([groups[col] for col in GROUP_COLUMNS], sort=False)
+    mad = by_deviation.transform("median")
+    spread = (mad / 0.6745).where(mad > 0, by_deviation.transform("mean") * MEAN_AD_SCALE)
+    z = (price - median) / spread.where(spread > 0)
+
+    flagged = (size >= min_group_size) & (z.abs() > threshold) & (deviation > np.log(MIN_PRICE_RATIO))
+    result = rows.loc[flagged, EXTRACT_COLUMNS].copy()
+    result["group_size"] = size[flagged].astype("int64")
+    result["median_price"] = np.exp(median[flagged]).round(2)
+    result["log_mad"] = mad[flagged].round(4)
+    result["z_score"] = z[flagged].round(2)
+    return result
+
+
+def scan_price_anomalies(
+    chunks: Iterable[pd.DataFrame],
+    threshold: float = Z_THRESHOLD,
+    min_group_size: int = MIN_GROUP_SIZE
+) -> pd.DataFrame:
+    """One row per flagged listing (ANOMALY_COLUMNS): its worst slot and how many slots flag it.
+
+    ``chunks`` are EXTRACT_COLUMNS frames ordered by GROUP_COLUMNS.
+    """
+    flagged: List[pd.DataFrame] = []
+    carry = pd.DataFrame(columns=EXTRACT_COLUMNS)
+    for chunk in chunks:
+        rows = pd.concat([carry, chunk[EXTRACT_COLUMNS]], ignore_index=True) if len(carry) else chunk[EXTRACT_COLUMNS]
+        rows = rows[pd.to_numeric(rows["price"]) > 0].reset_index(drop=True)
+        if rows.empty:
+            continue
+        keys = rows[GROUP_COLUMNS].to_numpy(dtype=np.int64)
+        # Rows are ordered by group, so the last group is the run of rows sharing the last key.
+        tail = int(np.argmax((keys == keys[-1]).all(axis=1)))
+        carry = rows.iloc[tail:]
+        if tail:
+            flagged.append(score_groups(rows.iloc[:tail], threshold, min_group_size))
+    if len(carry):
+        flagged.append(score_groups(carry, threshold, min_group_size))
+
+    flagged = [df for df in flagged if not df.empty]
+    if not flagged:
+        return pd.DataFrame(columns=ANOMALY_COLUMNS)
+    rows = pd.concat(flagged, ignore_index=True)
+    rows = rows.iloc[np.argsort(-rows["z_score"].abs().to_numpy(), kind="stable")]
+    worst = rows.drop_duplicates(subset=["listing_id"]).copy()
+    worst["outlier_slots"] = worst["listing_id"].map(rows["listing_id"].value_counts()).astype("int64")
+    return worst[ANOMALY_COLUMNS].reset_index(drop=True)
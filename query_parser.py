@@ -0,0 +1,198 @@
+"""Free-text vehicle + part query parser.
+
+Turns "2019 Civic front brake pads AWD" into the filter set ``search_fitment``
+accepts, using only in-memory dictionaries:
+
+- every name (make, model, trim, part type, position, drive, brand, brand alias)
+  is tokenized and inserted into a token trie, so multi-word names ("3 Series",
+  "Brake Pad") match as one phrase and the longest phrase wins;
+- tokens that miss the trie are retried through a symmetric-delete index, which
+  finds vocabulary words within one edit ("bremb" -> "brembo", "acord" -> "accord")
+  without scanning the vocabulary.
+"""
+import re
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+KINDS = ["make", "model", "trim", "part_type", "position", "drive", "brand"]
+
+FUZZY_MIN_LENGTH = 4
+YEAR_RANGE = (1900, 2100)
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN.findall(str(text).lower())
+
+
+def _singular(token: str) -> Optional[str]:
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return None
+
+
+def _deletes(word: str) -> Set[str]:
+    return {word[:i] + word[i + 1:] for i in range(len(word))}
+
+
+class _TrieNode:
+    __slots__ = ("children", "entities")
+
+    def __init__(self):
+        self.children: Dict[str, "_TrieNode"] = {}
+        self.entities: List[Dict[str, Any]] = []
+
+
+class VehicleQueryParser:
+    def __init__(self):
+        self._root = _TrieNode()
+        self._vocabulary: Set[str] = set()
+        self._delete_index: Dict[str, Set[str]] = {}
+        self._brands_by_name: Dict[str, int] = {}
+
+    def add(self, kind: str, entity_id: int, name: str, **attrs: Any) -> None:
+        """Register an entity under its name; attrs carry parents (make_id, model_id, year)."""
+        entity = {"kind": kind, "id": int(entity_id), "name": str(name), **attrs}
+        self._insert(tokenize(name), entity)
+        if kind == "brand":
+            self._brands_by_name[str(name).strip().lower()] = int(entity_id)
+
+    def add_brand_alias(self, alias: str, canonical_name: str) -> bool:
+        brand_id = self._brands_by_name.get(str(canonical_name).strip().lower())
+        if brand_id is None:
+            return False
+        self._insert(tokenize(alias), {"kind": "brand", "id": brand_id, "name": str(canonical_name)})
+        return True
+
+    def _insert(self, tokens: List[str], entity: Dict[str, Any]) -> None:
+        if not tokens:
+            return
+        phrases = [tokens]
+        if len(tokens) > 1:
+            # "F-150" is also typed as "f150".
+            phrases.append(["".join(tokens)])
+        for phrase in phrases:
+            node = self._root
+            for token in phrase:
+                node = node.children.setdefault(token, _TrieNode())
+                self._index_word(token)
+            if entity not in node.entities:
+                node.entities.append(entity)
+
+    def _index_word(self, word: str) -> None:
+        if word in self._vocabulary:
+            return
+        self._vocabulary.add(word)
+        if len(word) >= FUZZY_MIN_LENGTH:
+            for deleted in _deletes(word) | {word}:
+                self._delete_index.setdefault(deleted, set()).add(word)
+
+    def _candidates(self, token: str) -> List[Tuple[str, bool]]:
+        """Vocabulary words a query token may stand for, as (word, is_fuzzy), exact first."""
+        candidates = []
+        for form in (token, _singular(token)):
+            if form and form in self._vocabulary:
+                candidates.append((form, False))
+        if candidates or len(token) < FUZZY_MIN_LENGTH:
+            return candidates
+        fuzzy: Set[str] = set()
+        for deleted in _deletes(token) | {token}:
+            fuzzy |= self._delete_index.get(deleted, set())
+        return [(word, True) for word in sorted(fuzzy)]
+
+    def _match_at(self, tokens: List[str], start: int) -> Tuple[int, List[Dict[str, Any]]]:
+        """Longest phrase starting at tokens[start] as (length, entities); exact beats fuzzy at equal length."""
+        best: Tuple[int, List[Dict[str, Any]]] = (0, [])
+        frontier = [(self._root, False)]
+        for length in range(1, len(tokens) - start + 1):
+            candidates = self._candidates(tokens[start + length - 1])
+            next_frontier = []
+            for node, fuzzy in frontier:
+                for word, word_fuzzy in candidates:
+                    child = node.children.get(word)
+                    if child is not None:
+                        next_frontier.append((child, fuzzy or word_fuzzy))
+            if not next_frontier:
+                break
+            frontier = next_frontier
+            exact = [(node, fuzzy) for node, fuzzy in frontier if node.entities and not fuzzy]
+            matched = exact or [(node, fuzzy) for node, fuzzy in frontier if node.entities]
+            if matched:
+                entities = [entity for node, _ in matched for entity in node.entities]
+                best = (length, entities)
+        return best
+
+    def parse(self, query: str) -> Dict[str, Any]:
+        """Resolve a free-text query into search_fitment filters.
+
+        Returns {"filters": {...search_fitment keyword arguments...},
+        "matches": [(text, kind, name)], "unmatched": [token]}.
+        """
+        tokens = tokenize(query)
+        found: Dict[str, List[List[Dict[str, Any]]]] = {kind: [] for kind in KINDS}
+        matches: List[Tuple[str, str, str]] = []
+        unmatched: List[str] = []
+        year: Optional[int] = None
+
+        i = 0
+        while i < len(tokens):
+            token = tokens[i]
+            if token.isdigit() and len(token) == 4 and YEAR_RANGE[0] <= int(token) <= YEAR_RANGE[1] and year is None:
+                year = int(token)
+                matches.append((token, "year", token))
+                i += 1
+                continue
+            length, entities = self._match_at(tokens, i)
+            if not length:
+                unmatched.append(token)
+                i += 1
+                continue
+            # A phrase names one thing; KINDS order breaks ties such as make "Honda" vs alias "HONDA".
+            kind = next(k for k in KINDS if any(e["kind"] == k for e in entities))
+            kind_entities = [e for e in entities if e["kind"] == kind]
+            found[kind].append(kind_entities)
+            matches.append((" ".join(tokens[i:i + length]), kind, kind_entities[0]["name"]))
+            i += length
+
+        return {"filters": self._resolve(found, year), "matches": matches, "unmatched": unmatched}
+
+    @staticmethod
+    def _resolve(found: Dict[str, List[List[Dict[str, Any]]]], year: Optional[int]) -> Dict[str, Any]:
+        filters: Dict[str, Any] = {
+            "make_id": None, "model_id": None, "year": year, "trim_id": None,
+            "part_type_id": None, "position_id": None, "drive_id": None,
+            "price_min": None, "price_max": None, "brand_ids": []
+        }
+
+        def first(kind: str, keep=lambda entity: True) -> Optional[Dict[str, Any]]:
+            for group in found[kind]:
+                for entity in group:
+                    if keep(entity):
+                        return entity
+            return None
+
+        make = first("make")
+        model = first("model", lambda m: make is None or m["make_id"] == make["id"])
+        if model is not None and make is None:
+            make = {"id": model["make_id"]}
+        if make is not None:
+            filters["make_id"] = str(make["id"])
+        if model is not None:
+            filters["model_id"] = str(model["id"])
+            # A trim id is specific to one model year, so only pin it when that is unambiguous.
+            trims = [
+                t for group in found["trim"] for t in group
+                if t["model_id"] == model["id"] and (year is None or t["year"] == year)
+            ]
+            if len({t["id"] for t in trims}) == 1:
+                filters["trim_id"] = str(trims[0]["id"])
+                if filters["year"] is None:
+                    filters["year"] = trims[0]["year"]
+
+        for kind, key in [("part_type", "part_type_id"), ("position", "position_id"), ("drive", "drive_id")]:
+            entity = first(kind)
+            if entity is not None:
+                filters[key] = str(entity["id"])
+
+        filters["brand_ids"] = sorted({str(e["id"]) for group in found["brand"] for e in group[:1]}, key=int)
+        return filters
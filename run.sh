@@ -83,6 +83,27 @@ main() {
     echo "⚠️  Warning: fix_view.sql not found, skipping..."
   fi
 
+  # Step 4: Set-based trim make_id backfill for bulk loads
+  if [[ -f "${SQL_DIR}/trim_make_backfill.sql" ]]; then
+    run_sql_file "Set-based trim make_id backfill (bulk trim loads)" "${SQL_DIR}/trim_make_backfill.sql"
+  else
+    echo "⚠️  Warning: trim_make_backfill.sql not found, skipping..."
+  fi
+
+  # Step 5: Query plan history for the Query Plans tab
+  if [[ -f "${SQL_DIR}/query_plan_history.sql" ]]; then
+    run_sql_file "Query plan history table" "${SQL_DIR}/query_plan_history.sql"
+  else
+    echo "⚠️  Warning: query_plan_history.sql not found, skipping..."
+  fi
+
+  # Step 6: OEM descriptor classification results
+  if [[ -f "${SQL_DIR}/listing_descriptor.sql" ]]; then
+    run_sql_file "Listing descriptor table" "${SQL_DIR}/listing_descriptor.sql"
+  else
+    echo "⚠️  Warning: listing_descriptor.sql not found, skipping..."
+  fi
+
   echo "========================================="
   echo "Schema prep complete (no demo data)."
   echo ""
@@ -0,0 +1,272 @@
+"""Columnar, memory-mapped snapshots of View_NormalizedFitment.
+
+A snapshot directory holds versioned Arrow IPC files plus a ``CURRENT`` pointer:
+
+    fitment-20250101T120000Z-1a2b3c4d.arrow
+    CURRENT            -> "fitment-20250101T120000Z-1a2b3c4d.arrow"
+
+Files and the pointer are written to a temporary name and ``os.replace``d, so
+readers only ever see complete snapshots. Readers memory-map the file, which lets
+every worker process on a host share one copy of the catalog in the page cache.
+"""
+import hashlib
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:  # optional dependency, only needed when snapshots are used
+    pa = None
+    pc = None
+
+logger = logging.getLogger(__name__)
+
+CURRENT_POINTER = "CURRENT"
+KEEP_VERSIONS = 3
+
+FITMENT_COLUMNS = [
+    "listing_id", "listing_title", "price",
+    "brand_id", "brand_name",
+    "part_type_id", "parttype_name",
+    "trim_id", "trim_name", "year",
+    "make_id", "make_name",
+    "model_id", "model_name",
+    "position_id", "position_code",
+    "drive_id", "drive_code"
+]
+
+STRING_COLUMNS = [
+    "listing_title", "brand_name", "parttype_name", "trim_name",
+    "make_name", "model_name", "position_code", "drive_code"
+]
+
+SEARCH_OUTPUT = [
+    ("make_name", "make"),
+    ("model_name", "model"),
+    ("year", "year"),
+    ("trim_name", "trim"),
+    ("brand_name", "brand"),
+    ("parttype_name", "part type"),
+    ("position_code", "position"),
+    ("drive_code", "drive"),
+    ("listing_title", "listing title"),
+    ("price", "price")
+]
+
+SEARCH_ORDER = ["make_name", "model_name", "year", "brand_name", "price"]
+SEARCH_LIMIT = 1000
+
+
+def _require_pyarrow() -> None:
+    if pa is None:
+        raise RuntimeError("pyarrow is required for fitment snapshots (pip install pyarrow)")
+
+
+def _to_arrow(chunk: pd.DataFrame) -> "pa.Table":
+    chunk = chunk.reindex(columns=FITMENT_COLUMNS)
+    arrays = []
+    for col in FITMENT_COLUMNS:
+        values = chunk[col]
+        if col in STRING_COLUMNS:
+            arrays.append(pa.array(values.astype(object).where(values.notna(), None), type=pa.string()))
+        elif col == "price":
+            arrays.append(pa.array(pd.to_numeric(values), type=pa.float64(), from_pandas=True))
+        elif col == "year":
+            arrays.append(pa.array(pd.to_numeric(values).astype("Int32"), type=pa.int32(), from_pandas=True))
+        else:
+            arrays.append(pa.array(pd.to_numeric(values).astype("Int64"), type=pa.int64(), from_pandas=True))
+    return pa.Table.from_arrays(arrays, names=FITMENT_COLUMNS)
+
+
+def _binds_column(param: str, column: str) -> bool:
+    # brand_id_0, brand_id_1, ... all filter brand_id.
+    return param == column or param.startswith(column + "_")
+
+
+def write_snapshot(chunks: Iterable[pd.DataFrame], directory: str) -> str:
+    """Write a new snapshot version from DataFrame chunks and make it CURRENT.
+
+    Returns the file name of the new version.
+    """
+    _require_pyarrow()
+    os.makedirs(directory, exist_ok=True)
+
+    tables = [_to_arrow(chunk) for chunk in chunks]
+    table = pa.concat_tables(tables) if tables else _to_arrow(pd.DataFrame(columns=FITMENT_COLUMNS))
+    # One dictionary per string column keeps repeated names (make, brand, ...) as small integer codes.
+    for col in STRING_COLUMNS:
+        index = table.schema.get_field_index(col)
+        table = table.set_column(index, col, pc.dictionary_encode(table.column(col)))
+    table = table.unify_dictionaries().combine_chunks()
+
+    stamp = time.strftime("%Y%m%dT%H%M%SZ", time.gmtime())
+    digest = hashlib.sha1(f"{stamp}-{table.num_rows}-{os.getpid()}".encode()).hexdigest()[:8]
+    name = f"fitment-{stamp}-{digest}.arrow"
+    path = os.path.join(directory, name)
+
+    tmp_path = path + ".tmp"
+    with pa.OSFile(tmp_path, "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp_path, path)
+
+    pointer_tmp = os.path.join(directory, CURRENT_POINTER + ".tmp")
+    with open(pointer_tmp, "w", encoding="utf-8") as f:
+        f.write(name)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(pointer_tmp, os.path.join(directory, CURRENT_POINTER))
+
+    _prune_versions(directory, keep=KEEP_VERSIONS)
+    logger.info(f"Wrote fitment snapshot {name} with {table.num_rows} rows")
+    return name
+
+
+def _prune_versions(directory: str, keep: int) -> None:
+    versions = sorted(f for f in os.listdir(directory) if f.startswith("fitment-") and f.endswith(".arrow"))
+    # Open memory maps keep unlinked files alive, so readers on an old version are unaffected.
+    for old in versions[:-keep]:
+        try:
+            os.remove(os.path.join(directory, old))
+        except OSError as e:
+            logger.warning(f"Could not remove old snapshot {old}: {e}")
+
+
+def current_version(directory: str) -> Optional[str]:
+    try:
+        with open(os.path.join(directory, CURRENT_POINTER), encoding="utf-8") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+class FitmentSnapshot:
+    """Read-only, memory-mapped fitment catalog that follows the CURRENT pointer."""
+
+    def __init__(self, directory: str, check_interval: float = 30.0):
+        _require_pyarrow()
+        self.directory = directory
+        self.check_interval = check_interval
+        self.version: Optional[str] = None
+        self.table: Optional["pa.Table"] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self.refresh()
+
+    def refresh(self) -> bool:
+        """Swap to the CURRENT version if it changed. Returns True when a new version was mapped."""
+        with self._lock:
+            self._checked_at = time.monotonic()
+            version = current_version(self.directory)
+            if version is None or version == self.version:
+                return False
+            source = pa.memory_map(os.path.join(self.directory, version), "r")
+            table = pa.ipc.open_file(source).read_all()
+            self.table, self.version = table, version
+            logger.info(f"Mapped fitment snapshot {version} ({table.num_rows} rows)")
+            return True
+
+    def available(self) -> bool:
+        """Pick up a newer CURRENT at most every check_interval seconds; True once a version is mapped."""
+        if time.monotonic() - self._checked_at >= self.check_interval:
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error(f"Snapshot refresh failed, keeping {self.version}: {e}")
+        return self.table is not None
+
+    def _current_table(self) -> "pa.Table":
+        if not self.available():
+            raise RuntimeError(f"No fitment snapshot found in {self.directory}")
+        return self.table
+
+    def _filter(self, table: "pa.Table", params: Dict[str, Any]) -> "pa.Table":
+        mask = None
+        brand_ids: List[int] = []
+        for key, value in params.items():
+            if key.startswith("brand_id_"):
+                brand_ids.append(int(value))
+                continue
+            if key == "price_min":
+                condition = pc.greater_equal(table["price"], float(value))
+            elif key == "price_max":
+                condition = pc.less_equal(table["price"], float(value))
+            else:
+                condition = pc.equal(table[key], value)
+            mask = condition if mask is None else pc.and_(mask, condition)
+        if brand_ids:
+            condition = pc.is_in(table["brand_id"], value_set=pa.array(brand_ids, type=pa.int64()))
+            mask = condition if mask is None else pc.and_(mask, condition)
+        if mask is None:
+            return table
+        # Null comparisons (e.g. price filters on unpriced rows) drop the row, as in SQL.
+        return table.filter(pc.fill_null(mask, False))
+
+    def search(self, params: Dict[str, Any], limit: int = SEARCH_LIMIT) -> pd.DataFrame:
+        """Same rows, order and columns as search_fitment's SQL for the given bind params."""
+        table = self._filter(self._current_table(), params)
+        table = table.select([src for src, _ in SEARCH_OUTPUT])
+        # Arrow cannot sort dictionary columns; decode only the filtered rows.
+        table = table.cast(pa.schema([
+            pa.field(f.name, pa.string()) if pa.types.is_dictionary(f.type) else f for f in table.schema
+        ]))
+        table = table.sort_by([(col, "ascending") for col in SEARCH_ORDER]).slice(0, limit)
+        df = table.to_pandas()
+        df.columns = [alias for _, alias in SEARCH_OUTPUT]
+        return df
+
+    def distinct(self, columns: List[str]) -> pd.DataFrame:
+        """Distinct rows of ``columns``, e.g. the fitment combinations behind the empty-result index."""
+        table = self._current_table().select(columns)
+        return table.group_by(columns).aggregate([]).to_pandas()
+
+    def listing_ids(self, params: Dict[str, Any]) -> List[int]:
+        table = self._filter(self._current_table(), params)
+        return pc.unique(table["listing_id"]).to_pylist()
+
+    def facets(self, params: Dict[str, Any], dimensions: Dict[str, Tuple[str, str]]) -> pd.DataFrame:
+        """Distinct-listing hits per value of each dimension, ignoring that dimension's own filter.
+
+        Returns the same facet/value_id/value_name/hits frame as the GROUPING SETS query.
+        """
+        id_cols = [id_col for id_col, _ in dimensions.values()]
+        shared = {k: v for k, v in params.items() if not any(_binds_column(k, c) for c in id_cols)}
+        base = self._filter(self._current_table(), shared)
+        frames = []
+        for facet, (id_col, name_col) in dimensions.items():
+            others = {k: v for k, v in params.items() if k not in shared and not _binds_column(k, id_col)}
+            table = self._filter(base, others).select([id_col, name_col, "listing_id"])
+            table = table.cast(pa.schema([pa.field(name_col, pa.string()) if f.name == name_col else f for f in table.schema]))
+            grouped = table.group_by([id_col, name_col]).aggregate([("listing_id", "count_distinct")]).to_pandas()
+            frames.append(pd.DataFrame({
+                "facet": facet,
+                "value_id": grouped[id_col],
+                "value_name": grouped[name_col].astype(object),
+                "hits": grouped["listing_id_count_distinct"]
+            }))
+        return pd.concat(frames, ignore_index=True)
+
+    def coverage(self, params: Dict[str, Any]) -> pd.DataFrame:
+        """Same result as compute_coverage's GROUP BY for the given bind params."""
+        table = self._filter(self._current_table(), params)
+        grouped = table.group_by(["brand_name", "parttype_name"]).aggregate([
+            ("listing_id", "count"),
+            ("price", "min")
+        ])
+        df = grouped.to_pandas()
+        df = df.rename(columns={
+            "brand_name": "brand name",
+            "parttype_name": "part type",
+            "listing_id_count": "listing count",
+            "price_min": "cheapest price"
+        })
+        df = df[["brand name", "part type", "listing count", "cheapest price"]]
+        for col in ["brand name", "part type"]:
+            df[col] = df[col].astype(object)
+        return df.sort_values(["brand name", "part type"]).reset_index(drop=True)
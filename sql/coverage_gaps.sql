@@ -0,0 +1,15 @@
+-- coverage_gaps.sql
+-- Supports the in-memory coverage-gap matrix (gap_matrix.py): after an ingestion delta the
+-- app recounts listings per part type for each touched trim, which probes listing_fitment
+-- by trim_id. The primary key leads with listing_id, so it cannot serve that probe.
+
+SET SERVEROUTPUT ON
+
+DECLARE
+  e_exists EXCEPTION; PRAGMA EXCEPTION_INIT(e_exists, -955);
+BEGIN
+  EXECUTE IMMEDIATE 'CREATE INDEX ix_lf_trim_listing ON listing_fitment (trim_id, listing_id)';
+EXCEPTION WHEN e_exists THEN NULL; END;
+/
+
+PROMPT === coverage_gaps.sql complete ===
@@ -0,0 +1,292 @@
+-- fitment_denorm.sql
+-- Physical, denormalized copy of View_NormalizedFitment for read-heavy catalogs.
+--
+--   fitment_denorm                      one row per view row, list-partitioned by make_id
+--                                       (one partition per make, created automatically)
+--   fitment_denorm_dirty                listing ids whose rows must be rebuilt
+--   trg_*_denorm_dirty                  mark listings dirty when listing, listing_fitment or a
+--                                       dimension they reference changes
+--   refresh_fitment_denorm_full         rebuild everything in one transaction
+--   refresh_fitment_denorm_incremental  rebuild only the dirty listings
+--
+-- The app reads the table instead of the view when FITMENT_DENORM=1. Run the full refresh
+-- once after creating the table; `python manage.py ingest` runs the incremental refresh.
+-- Requires Oracle 12.2+ for automatic list partitioning.
+
+SET SERVEROUTPUT ON
+
+---------------------------
+-- TABLE: FITMENT_DENORM
+---------------------------
+DECLARE
+  e_exists EXCEPTION; PRAGMA EXCEPTION_INIT(e_exists, -955);
+BEGIN
+  EXECUTE IMMEDIATE q'[
+    CREATE TABLE fitment_denorm (
+      listing_id    NUMBER        CONSTRAINT nn_fd_listing NOT NULL,
+      listing_title VARCHAR2(200),
+      price         NUMBER(10,2),
+      brand_id      NUMBER,
+      brand_name    VARCHAR2(100),
+      part_type_id  NUMBER,
+      parttype_name VARCHAR2(100),
+      trim_id       NUMBER,
+      trim_name     VARCHAR2(50),
+      year          NUMBER(4),
+      make_id       NUMBER        CONSTRAINT nn_fd_make NOT NULL,
+      make_name     VARCHAR2(100),
+      model_id      NUMBER,
+      model_name    VARCHAR2(100),
+      position_id   NUMBER,
+      position_code VARCHAR2(20),
+      drive_id      NUMBER,
+      drive_code    VARCHAR2(20)
+    )
+    PARTITION BY LIST (make_id) AUTOMATIC (
+      PARTITION p_make_0 VALUES (0)
+    )
+  ]';
+EXCEPTION WHEN e_exists THEN NULL; END;
+/
+
+-- Local indexes: make_id itself is answered by partition pruning.
+DECLARE
+  e_exists EXCEPTION; PRAGMA EXCEPTION_INIT(e_exists, -955);
+BEGIN
+  EXECUTE IMMEDIATE 'CREATE INDEX ix_fd_model_year ON fitment_denorm (model_id, year, trim_id) LOCAL';
+EXCEPTION WHEN e_exists THEN NULL; END;
+/
+
+DECLARE
+  e_exists EXCEPTION; PRAGMA EXCEPTION_INIT(e_exists, -955);
+BEGIN
+  EXECUTE IMMEDIATE 'CREATE INDEX ix_fd_listing ON fitment_denorm (listing_id) LOCAL';
+EXCEPTION WHEN e_exists THEN NULL; END;
+/
+
+DECLARE
+  e_exists EXCEPTION; PRAGMA EXCEPTION_INIT(e_exists, -955);
+BEGIN
+  EXECUTE IMMEDIATE 'CREATE INDEX ix_fd_part_brand ON fitment_denorm (part_type_id, brand_id) LOCAL';
+EXCEPTION WHEN e_exists THEN NULL; END;
+/
+
+---------------------------
+-- TABLE: FITMENT_DENORM_DIRTY
+---------------------------
+DECLARE
+  e_exists EXCEPTION; PRAGMA EXCEPTION_INIT(e_exists, -955);
+BEGIN
+  EXECUTE IMMEDIATE q'[
+    CREATE TABLE fitment_denorm_dirty (
+      listing_id NUMBER CONSTRAINT pk_fitment_denorm_dirty PRIMARY KEY
+    ) ORGANIZATION INDEX
+  ]';
+EXCEPTION WHEN e_exists THEN NULL; END;
+/
+
+---------------------------
+-- TRIGGERS: mark affected listings dirty
+---------------------------
+CREATE OR REPLACE TRIGGER trg_listing_denorm_dirty
+AFTER INSERT OR UPDATE OR DELETE ON listing
+FOR EACH ROW
+BEGIN
+  MERGE INTO fitment_denorm_dirty d
+  USING (SELECT NVL(:NEW.listing_id, :OLD.listing_id) AS listing_id FROM dual) s
+  ON (d.listing_id = s.listing_id)
+  WHEN NOT MATCHED THEN INSERT (listing_id) VALUES (s.listing_id);
+END;
+/
+
+CREATE OR REPLACE TRIGGER trg_lf_denorm_dirty
+AFTER INSERT OR UPDATE OR DELETE ON listing_fitment
+FOR EACH ROW
+BEGIN
+  MERGE INTO fitment_denorm_dirty d
+  USING (SELECT NVL(:NEW.listing_id, :OLD.listing_id) AS listing_id FROM dual) s
+  ON (d.listing_id = s.listing_id)
+  WHEN NOT MATCHED THEN INSERT (listing_id) VALUES (s.listing_id);
+  IF UPDATING AND :NEW.listing_id <> :OLD.listing_id THEN
+    MERGE INTO fitment_denorm_dirty d
+    USING (SELECT :OLD.listing_id AS listing_id FROM dual) s
+    ON (d.listing_id = s.listing_id)
+    WHEN NOT MATCHED THEN INSERT (listing_id) VALUES (s.listing_id);
+  END IF;
+END;
+/
+
+-- Dimension edits (renames, a trim moved to another model) rewrite every listing that shows them.
+CREATE OR REPLACE TRIGGER trg_brand_denorm_dirty
+AFTER UPDATE OF brand_name ON brand
+FOR EACH ROW
+BEGIN
+  MERGE INTO fitment_denorm_dirty d
+  USING (SELECT listing_id FROM listing WHERE brand_id = :OLD.brand_id) s
+  ON (d.listing_id = s.listing_id)
+  WHEN NOT MATCHED THEN INSERT (listing_id) VALUES (s.listing_id);
+END;
+/
+
+CREATE OR REPLACE TRIGGER trg_part_type_denorm_dirty
+AFTER UPDATE OF parttype_name ON part_type
+FOR EACH ROW
+BEGIN
+  MERGE INTO fitment_denorm_dirty d
+  USING (SELECT listing_id FROM listing WHERE part_type_id = :OLD.part_type_id) s
+  ON (d.listing_id = s.listing_id)
+  WHEN NOT MATCHED THEN INSERT (listing_id) VALUES (s.listing_id);
+END;
+/
+
+CREATE OR REPLACE TRIGGER trg_trim_denorm_dirty
+AFTER UPDATE OF trim_name, year, make_id, model_id ON trim
+FOR EACH ROW
+BEGIN
+  MERGE INTO fitment_denorm_dirty d
+  USING (SELECT DISTINCT listing_id FROM listing_fitment WHERE trim_id = :OLD.trim_id) s
+  ON (d.listing_id = s.listing_id)
+  WHEN NOT MATCHED THEN INSERT (listing_id) VALUES (s.listing_id);
+END;
+/
+
+CREATE OR REPLACE TRIGGER trg_make_denorm_dirty
+AFTER UPDATE OF make_name ON make
+FOR EACH ROW
+BEGIN
+  MERGE INTO fitment_denorm_dirty d
+  USING (
+    SELECT DISTINCT lf.listing_id
+    FROM   listing_fitment lf
+    JOIN   trim t ON t.trim_id = lf.trim_id
+    WHERE  t.make_id = :OLD.make_id
+  ) s
+  ON (d.listing_id = s.listing_id)
+  WHEN NOT MATCHED THEN INSERT (listing_id) VALUES (s.listing_id);
+END;
+/
+
+CREATE OR REPLACE TRIGGER trg_model_denorm_dirty
+AFTER UPDATE OF model_name ON model
+FOR EACH ROW
+BEGIN
+  MERGE INTO fitment_denorm_dirty d
+  USING (
+    SELECT DISTINCT lf.listing_id
+    FROM   listing_fitment lf
+    JOIN   trim t ON t.trim_id = lf.trim_id
+    WHERE  t.model_id = :OLD.model_id
+  ) s
+  ON (d.listing_id = s.listing_id)
+  WHEN NOT MATCHED THEN INSERT (listing_id) VALUES (s.listing_id);
+END;
+/
+
+CREATE OR REPLACE TRIGGER trg_position_denorm_dirty
+AFTER UPDATE OF position_code ON position
+FOR EACH ROW
+BEGIN
+  MERGE INTO fitment_denorm_dirty d
+  USING (SELECT DISTINCT listing_id FROM listing_fitment WHERE position_id = :OLD.position_id) s
+  ON (d.listing_id = s.listing_id)
+  WHEN NOT MATCHED THEN INSERT (listing_id) VALUES (s.listing_id);
+END;
+/
+
+CREATE OR REPLACE TRIGGER trg_drive_denorm_dirty
+AFTER UPDATE OF drive_code ON drive_train
+FOR EACH ROW
+BEGIN
+  MERGE INTO fitment_denorm_dirty d
+  USING (SELECT DISTINCT listing_id FROM listing_fitment WHERE drive_id = :OLD.drive_id) s
+  ON (d.listing_id = s.listing_id)
+  WHEN NOT MATCHED THEN INSERT (listing_id) VALUES (s.listing_id);
+END;
+/
+
+---------------------------
+-- PROCEDURE: REFRESH_FITMENT_DENORM_FULL
+---------------------------
+CREATE OR REPLACE PROCEDURE refresh_fitment_denorm_full AS
+BEGIN
+  -- Clear the dirty set first: anything committed after this point is either already in the
+  -- view read below or left dirty for the next incremental refresh. DELETE instead of TRUNCATE
+  -- keeps the old rows visible to readers until the COMMIT.
+  DELETE FROM fitment_denorm_dirty;
+  DELETE FROM fitment_denorm;
+
+  INSERT INTO fitment_denorm (
+    listing_id, listing_title, price, brand_id, brand_name, part_type_id, parttype_name,
+    trim_id, trim_name, year, make_id, make_name, model_id, model_name,
+    position_id, position_code, drive_id, drive_code
+  )
+  SELECT
+    listing_id, listing_title, price, brand_id, brand_name, part_type_id, parttype_name,
+    trim_id, trim_name, year, make_id, make_name, model_id, model_name,
+    position_id, position_code, drive_id, drive_code
+  FROM View_NormalizedFitment;
+
+  DBMS_OUTPUT.PUT_LINE('refresh_fitment_denorm_full: ' || SQL%ROWCOUNT || ' rows loaded');
+  COMMIT;
+
+  DBMS_STATS.GATHER_TABLE_STATS(USER, 'FITMENT_DENORM', granularity => 'AUTO');
+EXCEPTION
+  WHEN OTHERS THEN
+    ROLLBACK;
+    RAISE;
+END;
+/
+
+SHOW ERRORS PROCEDURE refresh_fitment_denorm_full;
+
+---------------------------
+-- PROCEDURE: REFRESH_FITMENT_DENORM_INCREMENTAL
+---------------------------
+CREATE OR REPLACE PROCEDURE refresh_fitment_denorm_incremental (p_batch_size IN NUMBER DEFAULT 10000) AS
+  TYPE t_ids IS TABLE OF fitment_denorm_dirty.listing_id%TYPE;
+  v_ids   t_ids;
+  v_total NUMBER := 0;
+BEGIN
+  LOOP
+    -- Claim a batch: the deleted dirty rows stay locked until COMMIT, so a concurrent change
+    -- to the same listing waits and is re-marked dirty afterwards instead of being lost.
+    DELETE FROM fitment_denorm_dirty
+    WHERE  ROWNUM <= p_batch_size
+    RETURNING listing_id BULK COLLECT INTO v_ids;
+
+    EXIT WHEN v_ids.COUNT = 0;
+
+    FORALL i IN 1 .. v_ids.COUNT
+      DELETE FROM fitment_denorm WHERE listing_id = v_ids(i);
+
+    FORALL i IN 1 .. v_ids.COUNT
+      INSERT INTO fitment_denorm (
+        listing_id, listing_title, price, brand_id, brand_name, part_type_id, parttype_name,
+        trim_id, trim_name, year, make_id, make_name, model_id, model_name,
+        position_id, position_code, drive_id, drive_code
+      )
+      SELECT
+        listing_id, listing_title, price, brand_id, brand_name, part_type_id, parttype_name,
+        trim_id, trim_name, year, make_id, make_name, model_id, model_name,
+        position_id, position_code, drive_id, drive_code
+      FROM View_NormalizedFitment
+      WHERE listing_id = v_ids(i);
+
+    v_total := v_total + v_ids.COUNT;
+    COMMIT;
+  END LOOP;
+
+  DBMS_OUTPUT.PUT_LINE('refresh_fitment_denorm_incremental: ' || v_total || ' listings rebuilt');
+EXCEPTION
+  WHEN OTHERS THEN
+    ROLLBACK;
+    RAISE;
+END;
+/
+
+SHOW ERRORS PROCEDURE refresh_fitment_denorm_incremental;
+
+COMMIT;
+
+PROMPT === fitment_denorm.sql complete ===
+PROMPT === Load it with: EXEC refresh_fitment_denorm_full; then run the app with FITMENT_DENORM=1 ===
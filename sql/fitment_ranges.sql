@@ -0,0 +1,249 @@
+-- fitment_ranges.sql
+-- Range-compressed copy of listing_fitment (see fitment_ranges.py for the encoding).
+--
+--   listing_fitment_range          one row per listing, model, trim name, position and drive
+--                                  for each run of consecutive model years; exact rows
+--                                  (trim_id set) for trims that need it
+--   View_ListingFitmentExpanded    expands ranges back into listing_fitment rows
+--   View_NormalizedFitmentRanged   View_NormalizedFitment over the ranges; range and exact rows
+--                                  are separate branches so filters push into each join
+--   View_FitmentRangeMismatch      validation: must return no rows
+--   fitment_range_dirty            listing ids whose ranges must be re-encoded
+--   trg_*_range_dirty              mark listings dirty when their listing_fitment rows change or
+--                                  a trim is added, changed or removed inside one of their ranges
+--
+-- Fill it with `python manage.py compress-fitment`; run the app with FITMENT_RANGES=1 to read
+-- fitment through View_NormalizedFitmentRanged. Every app process re-encodes the dirty listings
+-- after its own writes and after outside writes reported by the change feed.
+
+SET SERVEROUTPUT ON
+
+---------------------------
+-- TABLE: LISTING_FITMENT_RANGE
+---------------------------
+DECLARE
+  e_exists EXCEPTION; PRAGMA EXCEPTION_INIT(e_exists, -955);
+BEGIN
+  EXECUTE IMMEDIATE q'[
+    CREATE TABLE listing_fitment_range (
+      listing_id  NUMBER       CONSTRAINT nn_lfr_listing  NOT NULL,
+      model_id    NUMBER,
+      trim_name   VARCHAR2(50),
+      year_from   NUMBER(4),
+      year_to     NUMBER(4),
+      position_id NUMBER       CONSTRAINT nn_lfr_position NOT NULL,
+      drive_id    NUMBER       CONSTRAINT nn_lfr_drive    NOT NULL,
+      trim_id     NUMBER,
+      CONSTRAINT ck_lfr_form CHECK (
+        trim_id IS NOT NULL
+        OR (model_id IS NOT NULL AND trim_name IS NOT NULL AND year_from <= year_to)
+      )
+    ) COMPRESS
+  ]';
+EXCEPTION WHEN e_exists THEN NULL; END;
+/
+
+DECLARE
+  e_exists EXCEPTION; PRAGMA EXCEPTION_INIT(e_exists, -955);
+BEGIN
+  EXECUTE IMMEDIATE 'CREATE INDEX ix_lfr_listing ON listing_fitment_range (listing_id)';
+EXCEPTION WHEN e_exists THEN NULL; END;
+/
+
+DECLARE
+  e_exists EXCEPTION; PRAGMA EXCEPTION_INIT(e_exists, -955);
+BEGIN
+  EXECUTE IMMEDIATE 'CREATE INDEX ix_lfr_model_years ON listing_fitment_range (model_id, trim_name, year_from, year_to)';
+EXCEPTION WHEN e_exists THEN NULL; END;
+/
+
+-- Expanding a range probes TRIM by model, name and year.
+DECLARE
+  e_exists EXCEPTION; PRAGMA EXCEPTION_INIT(e_exists, -955);
+BEGIN
+  EXECUTE IMMEDIATE 'CREATE INDEX ix_trim_model_name_year ON trim (model_id, trim_name, year)';
+EXCEPTION WHEN e_exists THEN NULL; END;
+/
+
+---------------------------
+-- TABLE: FITMENT_RANGE_DIRTY
+---------------------------
+DECLARE
+  e_exists EXCEPTION; PRAGMA EXCEPTION_INIT(e_exists, -955);
+BEGIN
+  EXECUTE IMMEDIATE q'[
+    CREATE TABLE fitment_range_dirty (
+      listing_id NUMBER CONSTRAINT pk_fitment_range_dirty PRIMARY KEY
+    ) ORGANIZATION INDEX
+  ]';
+EXCEPTION WHEN e_exists THEN NULL; END;
+/
+
+---------------------------
+-- TRIGGERS: mark listings whose ranges changed meaning
+---------------------------
+CREATE OR REPLACE TRIGGER trg_lf_range_dirty
+AFTER INSERT OR UPDATE OR DELETE ON listing_fitment
+FOR EACH ROW
+BEGIN
+  MERGE INTO fitment_range_dirty d
+  USING (
+    SELECT :NEW.listing_id AS listing_id FROM dual WHERE :NEW.listing_id IS NOT NULL
+    UNION
+    SELECT :OLD.listing_id FROM dual WHERE :OLD.listing_id IS NOT NULL
+  ) s
+  ON (d.listing_id = s.listing_id)
+  WHEN NOT MATCHED THEN INSERT (listing_id) VALUES (s.listing_id);
+END;
+/
+
+-- A range expands to every trim of its model and name in its years, so a trim that appears in,
+-- moves into or leaves a range changes the listing's fitment without touching listing_fitment.
+CREATE OR REPLACE TRIGGER trg_trim_range_dirty
+AFTER INSERT OR UPDATE OF trim_name, year, model_id OR DELETE ON trim
+FOR EACH ROW
+BEGIN
+  MERGE INTO fitment_range_dirty d
+  USING (
+    SELECT r.listing_id FROM listing_fitment_range r
+    WHERE  r.model_id = :NEW.model_id AND r.trim_name = :NEW.trim_name
+    AND    :NEW.year BETWEEN r.year_from AND r.year_to AND r.trim_id IS NULL
+    UNION
+    SELECT r.listing_id FROM listing_fitment_range r
+    WHERE  r.model_id = :OLD.model_id AND r.trim_name = :OLD.trim_name
+    AND    :OLD.year BETWEEN r.year_from AND r.year_to AND r.trim_id IS NULL
+    UNION
+    SELECT lf.listing_id FROM listing_fitment lf WHERE lf.trim_id = :OLD.trim_id
+  ) s
+  ON (d.listing_id = s.listing_id)
+  WHEN NOT MATCHED THEN INSERT (listing_id) VALUES (s.listing_id);
+END;
+/
+
+---------------------------
+-- VIEW: VIEW_LISTINGFITMENTEXPANDED
+---------------------------
+CREATE OR REPLACE VIEW View_ListingFitmentExpanded AS
+SELECT r.listing_id, t.trim_id, r.position_id, r.drive_id
+FROM listing_fitment_range r
+JOIN trim t
+  ON  t.model_id = r.model_id
+  AND t.trim_name = r.trim_name
+  AND t.year BETWEEN r.year_from AND r.year_to
+WHERE r.trim_id IS NULL
+UNION ALL
+SELECT r.listing_id, r.trim_id, r.position_id, r.drive_id
+FROM listing_fitment_range r
+WHERE r.trim_id IS NOT NULL;
+
+---------------------------
+-- VIEW: VIEW_NORMALIZEDFITMENTRANGED
+---------------------------
+CREATE OR REPLACE VIEW View_NormalizedFitmentRanged AS
+SELECT
+  l.listing_id,
+  l.listing_title,
+  l.price,
+  l.brand_id,
+  b.brand_name,
+  l.part_type_id,
+  pt.parttype_name,
+  t.trim_id,
+  t.trim_name,
+  t.year,
+  t.make_id,
+  mk.make_name,
+  t.model_id,
+  md.model_name,
+  r.position_id,
+  p.position_code,
+  r.drive_id,
+  d.drive_code
+FROM listing l
+JOIN brand b
+  ON l.brand_id = b.brand_id
+JOIN part_type pt
+  ON l.part_type_id = pt.part_type_id
+JOIN listing_fitment_range r
+  ON l.listing_id = r.listing_id
+JOIN trim t
+  ON  t.model_id = r.model_id
+  AND t.trim_name = r.trim_name
+  AND t.year BETWEEN r.year_from AND r.year_to
+JOIN make mk
+  ON t.make_id = mk.make_id
+JOIN model md
+  ON t.model_id = md.model_id
+JOIN position p
+  ON r.position_id = p.position_id
+JOIN drive_train d
+  ON r.drive_id = d.drive_id
+WHERE r.trim_id IS NULL
+UNION ALL
+SELECT
+  l.listing_id,
+  l.listing_title,
+  l.price,
+  l.brand_id,
+  b.brand_name,
+  l.part_type_id,
+  pt.parttype_name,
+  t.trim_id,
+  t.trim_name,
+  t.year,
+  t.make_id,
+  mk.make_name,
+  t.model_id,
+  md.model_name,
+  r.position_id,
+  p.position_code,
+  r.drive_id,
+  d.drive_code
+FROM listing l
+JOIN brand b
+  ON l.brand_id = b.brand_id
+JOIN part_type pt
+  ON l.part_type_id = pt.part_type_id
+JOIN listing_fitment_range r
+  ON l.listing_id = r.listing_id
+JOIN trim t
+  ON r.trim_id = t.trim_id
+JOIN make mk
+  ON t.make_id = mk.make_id
+JOIN model md
+  ON t.model_id = md.model_id
+JOIN position p
+  ON r.position_id = p.position_id
+JOIN drive_train d
+  ON r.drive_id = d.drive_id
+WHERE r.trim_id IS NOT NULL;
+
+---------------------------
+-- VIEW: VIEW_FITMENTRANGEMISMATCH (validation)
+---------------------------
+CREATE OR REPLACE VIEW View_FitmentRangeMismatch AS
+SELECT 'missing' AS problem, lf.listing_id, lf.trim_id, lf.position_id, lf.drive_id
+FROM listing_fitment lf
+WHERE NOT EXISTS (
+  SELECT 1 FROM View_ListingFitmentExpanded e
+  WHERE e.listing_id = lf.listing_id AND e.trim_id = lf.trim_id
+    AND e.position_id = lf.position_id AND e.drive_id = lf.drive_id
+)
+UNION ALL
+SELECT 'extra' AS problem, e.listing_id, e.trim_id, e.position_id, e.drive_id
+FROM View_ListingFitmentExpanded e
+WHERE NOT EXISTS (
+  SELECT 1 FROM listing_fitment lf
+  WHERE lf.listing_id = e.listing_id AND lf.trim_id = e.trim_id
+    AND lf.position_id = e.position_id AND lf.drive_id = e.drive_id
+)
+UNION ALL
+SELECT 'duplicate' AS problem, e.listing_id, e.trim_id, e.position_id, e.drive_id
+FROM View_ListingFitmentExpanded e
+GROUP BY e.listing_id, e.trim_id, e.position_id, e.drive_id
+HAVING COUNT(*) > 1;
+
+COMMIT;
+
+PROMPT === fitment_ranges.sql complete ===
+PROMPT === Validate with: SELECT COUNT(*) FROM View_FitmentRangeMismatch;  (expect 0) ===
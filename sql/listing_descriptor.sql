@@ -0,0 +1,24 @@
+-- listing_descriptor.sql
+-- Per-listing output of the token-level OEM descriptor classifier (descriptor_classifier.py),
+-- written chunk by chunk by `python manage.py classify-descriptors` and refreshed for changed
+-- listings after each ingestion delta. The OEM mismatch report reads the flagged rows instead
+-- of scanning listing titles with LIKE '%OEM%'.
+
+SET SERVEROUTPUT ON
+
+DECLARE
+  e_exists EXCEPTION; PRAGMA EXCEPTION_INIT(e_exists, -955);
+BEGIN
+  EXECUTE IMMEDIATE q'[
+    CREATE TABLE listing_descriptor (
+      listing_id  NUMBER CONSTRAINT pk_listing_descriptor PRIMARY KEY,
+      title_class VARCHAR2(100),
+      descriptors VARCHAR2(400),
+      brand_class VARCHAR2(20),
+      mismatch    VARCHAR2(400)
+    )
+  ]';
+EXCEPTION WHEN e_exists THEN NULL; END;
+/
+
+PROMPT === listing_descriptor.sql complete ===
@@ -0,0 +1,47 @@
+-- query_plan_history.sql
+-- Stores execution plans captured by the app's Query Plans tab, one row per capture.
+-- Plans are keyed by query shape (hash of the generated SQL text) so a changed
+-- plan_hash_value for the same shape between deploys is easy to spot.
+--
+-- The capturing user also needs read access to the cursor cache, e.g. as SYSTEM:
+--   GRANT SELECT ON v_$session TO <app_user>;
+--   GRANT SELECT ON v_$sql TO <app_user>;
+--   GRANT SELECT ON v_$sql_plan TO <app_user>;
+--   GRANT SELECT ON v_$sql_plan_statistics_all TO <app_user>;
+
+SET SERVEROUTPUT ON
+
+DECLARE
+  e_exists EXCEPTION; PRAGMA EXCEPTION_INIT(e_exists, -955);
+BEGIN
+  EXECUTE IMMEDIATE q'[
+    CREATE TABLE app_query_plan (
+      capture_id      NUMBER GENERATED BY DEFAULT AS IDENTITY CONSTRAINT pk_app_query_plan PRIMARY KEY,
+      shape_id        VARCHAR2(16)  CONSTRAINT nn_aqp_shape NOT NULL,
+      query_name      VARCHAR2(50)  CONSTRAINT nn_aqp_name  NOT NULL,
+      app_version     VARCHAR2(50),
+      sql_id          VARCHAR2(13),
+      child_number    NUMBER,
+      plan_hash_value NUMBER,
+      elapsed_ms      NUMBER,
+      buffer_gets     NUMBER,
+      rows_processed  NUMBER,
+      captured_at     TIMESTAMP DEFAULT SYSTIMESTAMP CONSTRAINT nn_aqp_captured NOT NULL,
+      sql_text        CLOB,
+      bind_values     VARCHAR2(4000),
+      plan_text       CLOB
+    )
+  ]';
+EXCEPTION WHEN e_exists THEN NULL; END;
+/
+
+DECLARE
+  e_exists EXCEPTION; PRAGMA EXCEPTION_INIT(e_exists, -955);
+BEGIN
+  EXECUTE IMMEDIATE 'CREATE INDEX ix_aqp_shape ON app_query_plan (shape_id, captured_at)';
+EXCEPTION WHEN e_exists THEN NULL; END;
+/
+
+COMMIT;
+
+PROMPT === query_plan_history.sql complete ===
@@ -0,0 +1,692 @@
+-- sqlite_schema.sql
+-- Embedded (SQLite) version of the Auto-Parts web schema used by DB_BACKEND=sqlite.
+-- Mirrors web_schema.sql + add_listing_fitment.sql + fix_view.sql + trim_make_backfill.sql
+-- + query_plan_history.sql + fitment_denorm.sql + fitment_ranges.sql + coverage_gaps.sql
+-- + listing_descriptor.sql, plus the change feed's counters (SQLite only).
+-- Create a database with:
+--   python manage.py init-sqlite --path fitment.db --seed sql/web_demo_seed.sql
+
+PRAGMA foreign_keys = ON;
+
+CREATE TABLE IF NOT EXISTS make (
+  make_id   INTEGER CONSTRAINT pk_make PRIMARY KEY,
+  make_name VARCHAR(100) NOT NULL CONSTRAINT uk_make_name UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS model (
+  model_id   INTEGER CONSTRAINT pk_model PRIMARY KEY,
+  model_name VARCHAR(100) NOT NULL,
+  make_id    INTEGER NOT NULL CONSTRAINT fk_model_make REFERENCES make(make_id)
+);
+
+-- make_id is nullable here because SQLite triggers cannot assign NEW values;
+-- trg_trim_set_make fills it in right after the insert instead.
+CREATE TABLE IF NOT EXISTS trim (
+  trim_id   INTEGER CONSTRAINT pk_trim PRIMARY KEY,
+  trim_name VARCHAR(50) NOT NULL,
+  make_id   INTEGER CONSTRAINT fk_trim_make REFERENCES make(make_id),
+  year      INTEGER,
+  model_id  INTEGER CONSTRAINT fk_trim_model REFERENCES model(model_id)
+);
+
+CREATE TRIGGER IF NOT EXISTS trg_trim_set_make
+AFTER INSERT ON trim
+FOR EACH ROW
+WHEN NEW.model_id IS NOT NULL AND NEW.make_id IS NULL
+BEGIN
+  UPDATE trim
+  SET make_id = (SELECT m.make_id FROM model m WHERE m.model_id = NEW.model_id)
+  WHERE trim_id = NEW.trim_id;
+END;
+
+-- Oracle's trigger also fires on UPDATE, so moving a trim to another model resyncs make_id.
+CREATE TRIGGER IF NOT EXISTS trg_trim_update_make
+AFTER UPDATE OF model_id ON trim
+FOR EACH ROW
+WHEN NEW.model_id IS NOT NULL
+BEGIN
+  UPDATE trim
+  SET make_id = (SELECT m.make_id FROM model m WHERE m.model_id = NEW.model_id)
+  WHERE trim_id = NEW.trim_id;
+END;
+
+CREATE TABLE IF NOT EXISTS engine_spec (
+  engine_id   INTEGER CONSTRAINT pk_engine_spec PRIMARY KEY,
+  engine_code VARCHAR(50) NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS drive_train (
+  drive_id   INTEGER CONSTRAINT pk_drive_train PRIMARY KEY,
+  drive_code VARCHAR(20) NOT NULL CONSTRAINT uk_drive_code UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS position (
+  position_id   INTEGER CONSTRAINT pk_position PRIMARY KEY,
+  position_code VARCHAR(20) NOT NULL CONSTRAINT uk_position_code UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS brand (
+  brand_id   INTEGER CONSTRAINT pk_brand PRIMARY KEY,
+  brand_name VARCHAR(100) NOT NULL CONSTRAINT uk_brand_name UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS part_type (
+  part_type_id  INTEGER CONSTRAINT pk_part_type PRIMARY KEY,
+  parttype_name VARCHAR(100) NOT NULL CONSTRAINT uk_parttype_name UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS parttype_brand (
+  part_type_id INTEGER NOT NULL CONSTRAINT fk_ptb_parttype REFERENCES part_type(part_type_id),
+  brand_id     INTEGER NOT NULL CONSTRAINT fk_ptb_brand REFERENCES brand(brand_id),
+  CONSTRAINT pk_parttype_brand PRIMARY KEY (part_type_id, brand_id)
+);
+
+CREATE TABLE IF NOT EXISTS listing (
+  listing_id    INTEGER CONSTRAINT pk_listing PRIMARY KEY,
+  listing_title VARCHAR(200) NOT NULL,
+  price         NUMERIC(10,2),
+  brand_id      INTEGER NOT NULL CONSTRAINT fk_listing_brand REFERENCES brand(brand_id),
+  part_type_id  INTEGER NOT NULL CONSTRAINT fk_listing_part_type REFERENCES part_type(part_type_id),
+  trim_id       INTEGER CONSTRAINT fk_listing_trim REFERENCES trim(trim_id),
+  drive_id      INTEGER CONSTRAINT fk_listing_drive REFERENCES drive_train(drive_id),
+  position_id   INTEGER CONSTRAINT fk_listing_position REFERENCES position(position_id),
+  mpn           VARCHAR(100)
+);
+
+CREATE TABLE IF NOT EXISTS listing_fitment (
+  listing_id  INTEGER NOT NULL CONSTRAINT fk_lf_listing REFERENCES listing(listing_id),
+  trim_id     INTEGER NOT NULL CONSTRAINT fk_lf_trim REFERENCES trim(trim_id),
+  position_id INTEGER NOT NULL CONSTRAINT fk_lf_position REFERENCES position(position_id),
+  drive_id    INTEGER NOT NULL CONSTRAINT fk_lf_drive REFERENCES drive_train(drive_id),
+  CONSTRAINT pk_listing_fitment PRIMARY KEY (listing_id, trim_id, position_id, drive_id)
+);
+
+-- coverage_gaps.sql: recounting a trim's coverage probes listing_fitment by trim.
+CREATE INDEX IF NOT EXISTS ix_lf_trim_listing ON listing_fitment (trim_id, listing_id);
+
+-- listing_descriptor.sql: OEM descriptor classifier results, one row per classified listing.
+CREATE TABLE IF NOT EXISTS listing_descriptor (
+  listing_id  INTEGER CONSTRAINT pk_listing_descriptor PRIMARY KEY,
+  title_class VARCHAR(100),
+  descriptors VARCHAR(400),
+  brand_class VARCHAR(20),
+  mismatch    VARCHAR(400)
+);
+
+CREATE TABLE IF NOT EXISTS brand_alias (
+  alias_text      VARCHAR(100) NOT NULL,
+  canonical_value VARCHAR(100) NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS trim_stage (
+  trim_id   INTEGER NOT NULL,
+  trim_name VARCHAR(50) NOT NULL,
+  model_id  INTEGER NOT NULL,
+  year      INTEGER
+);
+
+CREATE TABLE IF NOT EXISTS app_query_plan (
+  capture_id      INTEGER CONSTRAINT pk_app_query_plan PRIMARY KEY AUTOINCREMENT,
+  shape_id        VARCHAR(16) NOT NULL,
+  query_name      VARCHAR(50) NOT NULL,
+  app_version     VARCHAR(50),
+  sql_id          VARCHAR(13),
+  child_number    INTEGER,
+  plan_hash_value INTEGER,
+  elapsed_ms      NUMERIC,
+  buffer_gets     INTEGER,
+  rows_processed  INTEGER,
+  captured_at     TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  sql_text        TEXT,
+  bind_values     VARCHAR(4000),
+  plan_text       TEXT
+);
+
+CREATE INDEX IF NOT EXISTS ix_aqp_shape ON app_query_plan (shape_id, captured_at);
+
+DROP VIEW IF EXISTS View_NormalizedFitment;
+CREATE VIEW View_NormalizedFitment AS
+SELECT
+  l.listing_id,
+  l.listing_title,
+  l.price,
+  l.brand_id,
+  b.brand_name,
+  l.part_type_id,
+  pt.parttype_name,
+  lf.trim_id,
+  t.trim_name,
+  t.year,
+  t.make_id,
+  mk.make_name,
+  t.model_id,
+  md.model_name,
+  lf.position_id,
+  p.position_code,
+  lf.drive_id,
+  d.drive_code
+FROM listing l
+JOIN brand b
+  ON l.brand_id = b.brand_id
+JOIN part_type pt
+  ON l.part_type_id = pt.part_type_id
+JOIN listing_fitment lf
+  ON l.listing_id = lf.listing_id
+JOIN trim t
+  ON lf.trim_id = t.trim_id
+JOIN make mk
+  ON t.make_id = mk.make_id
+JOIN model md
+  ON t.model_id = md.model_id
+JOIN position p
+  ON lf.position_id = p.position_id
+JOIN drive_train d
+  ON lf.drive_id = d.drive_id;
+
+DROP VIEW IF EXISTS View_TrimMakeMismatch;
+CREATE VIEW View_TrimMakeMismatch AS
+SELECT
+  t.trim_id,
+  t.trim_name,
+  t.model_id,
+  t.make_id   AS trim_make_id,
+  m.make_id   AS model_make_id
+FROM trim t
+LEFT JOIN model m
+  ON t.model_id = m.model_id
+WHERE t.model_id IS NOT NULL
+  AND (m.model_id IS NULL OR t.make_id IS NULL OR t.make_id <> m.make_id);
+
+-- No partitioning in SQLite; the (make_id, ...) index keeps each make's rows together instead.
+CREATE TABLE IF NOT EXISTS fitment_denorm (
+  listing_id    INTEGER NOT NULL,
+  listing_title VARCHAR(200),
+  price         NUMERIC(10,2),
+  brand_id      INTEGER,
+  brand_name    VARCHAR(100),
+  part_type_id  INTEGER,
+  parttype_name VARCHAR(100),
+  trim_id       INTEGER,
+  trim_name     VARCHAR(50),
+  year          INTEGER,
+  make_id       INTEGER NOT NULL,
+  make_name     VARCHAR(100),
+  model_id      INTEGER,
+  model_name    VARCHAR(100),
+  position_id   INTEGER,
+  position_code VARCHAR(20),
+  drive_id      INTEGER,
+  drive_code    VARCHAR(20)
+);
+
+CREATE INDEX IF NOT EXISTS ix_fd_make_model_year ON fitment_denorm (make_id, model_id, year, trim_id);
+CREATE INDEX IF NOT EXISTS ix_fd_listing ON fitment_denorm (listing_id);
+CREATE INDEX IF NOT EXISTS ix_fd_part_brand ON fitment_denorm (part_type_id, brand_id);
+
+CREATE TABLE IF NOT EXISTS fitment_denorm_dirty (
+  listing_id INTEGER CONSTRAINT pk_fitment_denorm_dirty PRIMARY KEY
+);
+
+-- The triggers skip listings already marked with NOT EXISTS / NOT IN rather than
+-- INSERT OR IGNORE: inside a trigger fired by an upsert (INSERT ... ON CONFLICT DO
+-- UPDATE, as delta ingestion issues) SQLite applies the outer statement's conflict
+-- handling, so OR IGNORE would still fail on an already-dirty listing.
+
+CREATE TRIGGER IF NOT EXISTS trg_listing_ins_denorm_dirty
+AFTER INSERT ON listing
+FOR EACH ROW
+BEGIN
+  INSERT INTO fitment_denorm_dirty (listing_id)
+  SELECT NEW.listing_id WHERE NOT EXISTS (SELECT 1 FROM fitment_denorm_dirty WHERE listing_id = NEW.listing_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_listing_upd_denorm_dirty
+AFTER UPDATE ON listing
+FOR EACH ROW
+BEGIN
+  INSERT INTO fitment_denorm_dirty (listing_id)
+  SELECT NEW.listing_id WHERE NOT EXISTS (SELECT 1 FROM fitment_denorm_dirty WHERE listing_id = NEW.listing_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_listing_del_denorm_dirty
+AFTER DELETE ON listing
+FOR EACH ROW
+BEGIN
+  INSERT INTO fitment_denorm_dirty (listing_id)
+  SELECT OLD.listing_id WHERE NOT EXISTS (SELECT 1 FROM fitment_denorm_dirty WHERE listing_id = OLD.listing_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_lf_ins_denorm_dirty
+AFTER INSERT ON listing_fitment
+FOR EACH ROW
+BEGIN
+  INSERT INTO fitment_denorm_dirty (listing_id)
+  SELECT NEW.listing_id WHERE NOT EXISTS (SELECT 1 FROM fitment_denorm_dirty WHERE listing_id = NEW.listing_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_lf_upd_denorm_dirty
+AFTER UPDATE ON listing_fitment
+FOR EACH ROW
+BEGIN
+  INSERT INTO fitment_denorm_dirty (listing_id)
+  SELECT id FROM (SELECT NEW.listing_id AS id UNION SELECT OLD.listing_id)
+  WHERE id NOT IN (SELECT listing_id FROM fitment_denorm_dirty);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_lf_del_denorm_dirty
+AFTER DELETE ON listing_fitment
+FOR EACH ROW
+BEGIN
+  INSERT INTO fitment_denorm_dirty (listing_id)
+  SELECT OLD.listing_id WHERE NOT EXISTS (SELECT 1 FROM fitment_denorm_dirty WHERE listing_id = OLD.listing_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_brand_denorm_dirty
+AFTER UPDATE OF brand_name ON brand
+FOR EACH ROW
+BEGIN
+  INSERT INTO fitment_denorm_dirty (listing_id)
+  SELECT DISTINCT listing_id FROM listing WHERE brand_id = OLD.brand_id
+  AND listing_id NOT IN (SELECT listing_id FROM fitment_denorm_dirty);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_part_type_denorm_dirty
+AFTER UPDATE OF parttype_name ON part_type
+FOR EACH ROW
+BEGIN
+  INSERT INTO fitment_denorm_dirty (listing_id)
+  SELECT DISTINCT listing_id FROM listing WHERE part_type_id = OLD.part_type_id
+  AND listing_id NOT IN (SELECT listing_id FROM fitment_denorm_dirty);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_trim_denorm_dirty
+AFTER UPDATE OF trim_name, year, make_id, model_id ON trim
+FOR EACH ROW
+BEGIN
+  INSERT INTO fitment_denorm_dirty (listing_id)
+  SELECT DISTINCT listing_id FROM listing_fitment WHERE trim_id = OLD.trim_id
+  AND listing_id NOT IN (SELECT listing_id FROM fitment_denorm_dirty);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_make_denorm_dirty
+AFTER UPDATE OF make_name ON make
+FOR EACH ROW
+BEGIN
+  INSERT INTO fitment_denorm_dirty (listing_id)
+  SELECT DISTINCT lf.listing_id FROM listing_fitment lf JOIN trim t ON t.trim_id = lf.trim_id WHERE t.make_id = OLD.make_id
+  AND lf.listing_id NOT IN (SELECT listing_id FROM fitment_denorm_dirty);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_model_denorm_dirty
+AFTER UPDATE OF model_name ON model
+FOR EACH ROW
+BEGIN
+  INSERT INTO fitment_denorm_dirty (listing_id)
+  SELECT DISTINCT lf.listing_id FROM listing_fitment lf JOIN trim t ON t.trim_id = lf.trim_id WHERE t.model_id = OLD.model_id
+  AND lf.listing_id NOT IN (SELECT listing_id FROM fitment_denorm_dirty);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_position_denorm_dirty
+AFTER UPDATE OF position_code ON position
+FOR EACH ROW
+BEGIN
+  INSERT INTO fitment_denorm_dirty (listing_id)
+  SELECT DISTINCT listing_id FROM listing_fitment WHERE position_id = OLD.position_id
+  AND listing_id NOT IN (SELECT listing_id FROM fitment_denorm_dirty);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_drive_denorm_dirty
+AFTER UPDATE OF drive_code ON drive_train
+FOR EACH ROW
+BEGIN
+  INSERT INTO fitment_denorm_dirty (listing_id)
+  SELECT DISTINCT listing_id FROM listing_fitment WHERE drive_id = OLD.drive_id
+  AND listing_id NOT IN (SELECT listing_id FROM fitment_denorm_dirty);
+END;
+
+CREATE TABLE IF NOT EXISTS listing_fitment_range (
+  listing_id  INTEGER NOT NULL,
+  model_id    INTEGER,
+  trim_name   VARCHAR(50),
+  year_from   INTEGER,
+  year_to     INTEGER,
+  position_id INTEGER NOT NULL,
+  drive_id    INTEGER NOT NULL,
+  trim_id     INTEGER,
+  CONSTRAINT ck_lfr_form CHECK (
+    trim_id IS NOT NULL
+    OR (model_id IS NOT NULL AND trim_name IS NOT NULL AND year_from <= year_to)
+  )
+);
+
+CREATE INDEX IF NOT EXISTS ix_lfr_listing ON listing_fitment_range (listing_id);
+CREATE INDEX IF NOT EXISTS ix_lfr_model_years ON listing_fitment_range (model_id, trim_name, year_from, year_to);
+CREATE INDEX IF NOT EXISTS ix_trim_model_name_year ON trim (model_id, trim_name, year);
+
+CREATE TABLE IF NOT EXISTS fitment_range_dirty (
+  listing_id INTEGER CONSTRAINT pk_fitment_range_dirty PRIMARY KEY
+);
+
+CREATE TRIGGER IF NOT EXISTS trg_lf_ins_range_dirty
+AFTER INSERT ON listing_fitment
+FOR EACH ROW
+BEGIN
+  INSERT INTO fitment_range_dirty (listing_id)
+  SELECT NEW.listing_id WHERE NOT EXISTS (SELECT 1 FROM fitment_range_dirty WHERE listing_id = NEW.listing_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_lf_upd_range_dirty
+AFTER UPDATE ON listing_fitment
+FOR EACH ROW
+BEGIN
+  INSERT INTO fitment_range_dirty (listing_id)
+  SELECT id FROM (SELECT NEW.listing_id AS id UNION SELECT OLD.listing_id)
+  WHERE id NOT IN (SELECT listing_id FROM fitment_range_dirty);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_lf_del_range_dirty
+AFTER DELETE ON listing_fitment
+FOR EACH ROW
+BEGIN
+  INSERT INTO fitment_range_dirty (listing_id)
+  SELECT OLD.listing_id WHERE NOT EXISTS (SELECT 1 FROM fitment_range_dirty WHERE listing_id = OLD.listing_id);
+END;
+
+-- A trim that appears in, moves into or leaves a listing's year range changes its fitment.
+CREATE TRIGGER IF NOT EXISTS trg_trim_ins_range_dirty
+AFTER INSERT ON trim
+FOR EACH ROW
+BEGIN
+  INSERT INTO fitment_range_dirty (listing_id)
+  SELECT DISTINCT listing_id FROM listing_fitment_range
+  WHERE model_id = NEW.model_id AND trim_name = NEW.trim_name
+  AND NEW.year BETWEEN year_from AND year_to AND trim_id IS NULL
+  AND listing_id NOT IN (SELECT listing_id FROM fitment_range_dirty);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_trim_upd_range_dirty
+AFTER UPDATE OF trim_name, year, model_id ON trim
+FOR EACH ROW
+BEGIN
+  INSERT INTO fitment_range_dirty (listing_id)
+  SELECT listing_id FROM listing_fitment_range
+  WHERE model_id = NEW.model_id AND trim_name = NEW.trim_name
+  AND NEW.year BETWEEN year_from AND year_to AND trim_id IS NULL
+  UNION
+  SELECT listing_id FROM listing_fitment_range
+  WHERE model_id = OLD.model_id AND trim_name = OLD.trim_name
+  AND OLD.year BETWEEN year_from AND year_to AND trim_id IS NULL
+  UNION
+  SELECT listing_id FROM listing_fitment WHERE trim_id = OLD.trim_id
+  EXCEPT
+  SELECT listing_id FROM fitment_range_dirty;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_trim_del_range_dirty
+AFTER DELETE ON trim
+FOR EACH ROW
+BEGIN
+  INSERT INTO fitment_range_dirty (listing_id)
+  SELECT DISTINCT listing_id FROM listing_fitment_range
+  WHERE model_id = OLD.model_id AND trim_name = OLD.trim_name
+  AND OLD.year BETWEEN year_from AND year_to AND trim_id IS NULL
+  AND listing_id NOT IN (SELECT listing_id FROM fitment_range_dirty);
+END;
+
+DROP VIEW IF EXISTS View_ListingFitmentExpanded;
+CREATE VIEW View_ListingFitmentExpanded AS
+SELECT r.listing_id, t.trim_id, r.position_id, r.drive_id
+FROM listing_fitment_range r
+JOIN trim t
+  ON  t.model_id = r.model_id
+  AND t.trim_name = r.trim_name
+  AND t.year BETWEEN r.year_from AND r.year_to
+WHERE r.trim_id IS NULL
+UNION ALL
+SELECT r.listing_id, r.trim_id, r.position_id, r.drive_id
+FROM listing_fitment_range r
+WHERE r.trim_id IS NOT NULL;
+
+DROP VIEW IF EXISTS View_NormalizedFitmentRanged;
+CREATE VIEW View_NormalizedFitmentRanged AS
+SELECT
+  l.listing_id,
+  l.listing_title,
+  l.price,
+  l.brand_id,
+  b.brand_name,
+  l.part_type_id,
+  pt.parttype_name,
+  t.trim_id,
+  t.trim_name,
+  t.year,
+  t.make_id,
+  mk.make_name,
+  t.model_id,
+  md.model_name,
+  r.position_id,
+  p.position_code,
+  r.drive_id,
+  d.drive_code
+FROM listing l
+JOIN brand b
+  ON l.brand_id = b.brand_id
+JOIN part_type pt
+  ON l.part_type_id = pt.part_type_id
+JOIN listing_fitment_range r
+  ON l.listing_id = r.listing_id
+JOIN trim t
+  ON  t.model_id = r.model_id
+  AND t.trim_name = r.trim_name
+  AND t.year BETWEEN r.year_from AND r.year_to
+JOIN make mk
+  ON t.make_id = mk.make_id
+JOIN model md
+  ON t.model_id = md.model_id
+JOIN position p
+  ON r.position_id = p.position_id
+JOIN drive_train d
+  ON r.drive_id = d.drive_id
+WHERE r.trim_id IS NULL
+UNION ALL
+SELECT
+  l.listing_id,
+  l.listing_title,
+  l.price,
+  l.brand_id,
+  b.brand_name,
+  l.part_type_id,
+  pt.parttype_name,
+  t.trim_id,
+  t.trim_name,
+  t.year,
+  t.make_id,
+  mk.make_name,
+  t.model_id,
+  md.model_name,
+  r.position_id,
+  p.position_code,
+  r.drive_id,
+  d.drive_code
+FROM listing l
+JOIN brand b
+  ON l.brand_id = b.brand_id
+JOIN part_type pt
+  ON l.part_type_id = pt.part_type_id
+JOIN listing_fitment_range r
+  ON l.listing_id = r.listing_id
+JOIN trim t
+  ON r.trim_id = t.trim_id
+JOIN make mk
+  ON t.make_id = mk.make_id
+JOIN model md
+  ON t.model_id = md.model_id
+JOIN position p
+  ON r.position_id = p.position_id
+JOIN drive_train d
+  ON r.drive_id = d.drive_id
+WHERE r.trim_id IS NOT NULL;
+
+DROP VIEW IF EXISTS View_FitmentRangeMismatch;
+CREATE VIEW View_FitmentRangeMismatch AS
+SELECT 'missing' AS problem, lf.listing_id, lf.trim_id, lf.position_id, lf.drive_id
+FROM listing_fitment lf
+WHERE NOT EXISTS (
+  SELECT 1 FROM View_ListingFitmentExpanded e
+  WHERE e.listing_id = lf.listing_id AND e.trim_id = lf.trim_id
+    AND e.position_id = lf.position_id AND e.drive_id = lf.drive_id
+)
+UNION ALL
+SELECT 'extra' AS problem, e.listing_id, e.trim_id, e.position_id, e.drive_id
+FROM View_ListingFitmentExpanded e
+WHERE NOT EXISTS (
+  SELECT 1 FROM listing_fitment lf
+  WHERE lf.listing_id = e.listing_id AND lf.trim_id = e.trim_id
+    AND lf.position_id = e.position_id AND lf.drive_id = e.drive_id
+)
+UNION ALL
+SELECT 'duplicate' AS problem, e.listing_id, e.trim_id, e.position_id, e.drive_id
+FROM View_ListingFitmentExpanded e
+GROUP BY e.listing_id, e.trim_id, e.position_id, e.drive_id
+HAVING COUNT(*) > 1;
+
+-- Per-table change counters read by the app's change feed (SQLite only: Oracle uses
+-- USER_TAB_MODIFICATIONS and CQN instead). SQLite has one writer at a time, so the counter row
+-- adds no lock contention; it has no statement-level triggers, so every changed row bumps it.
+CREATE TABLE IF NOT EXISTS app_table_change (
+  table_name   VARCHAR(30) CONSTRAINT pk_app_table_change PRIMARY KEY,
+  change_count INTEGER DEFAULT 0 NOT NULL
+);
+
+INSERT INTO app_table_change (table_name)
+SELECT name FROM (
+  SELECT 'make' AS name UNION ALL SELECT 'model' UNION ALL SELECT 'trim' UNION ALL SELECT 'brand'
+  UNION ALL SELECT 'listing' UNION ALL SELECT 'listing_fitment' UNION ALL SELECT 'brand_alias'
+)
+WHERE name NOT IN (SELECT table_name FROM app_table_change);
+
+CREATE TRIGGER IF NOT EXISTS trg_chg_make_ins
+AFTER INSERT ON make
+BEGIN
+  UPDATE app_table_change SET change_count = change_count + 1 WHERE table_name = 'make';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_chg_make_upd
+AFTER UPDATE ON make
+BEGIN
+  UPDATE app_table_change SET change_count = change_count + 1 WHERE table_name = 'make';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_chg_make_del
+AFTER DELETE ON make
+BEGIN
+  UPDATE app_table_change SET change_count = change_count + 1 WHERE table_name = 'make';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_chg_model_ins
+AFTER INSERT ON model
+BEGIN
+  UPDATE app_table_change SET change_count = change_count + 1 WHERE table_name = 'model';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_chg_model_upd
+AFTER UPDATE ON model
+BEGIN
+  UPDATE app_table_change SET change_count = change_count + 1 WHERE table_name = 'model';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_chg_model_del
+AFTER DELETE ON model
+BEGIN
+  UPDATE app_table_change SET change_count = change_count + 1 WHERE table_name = 'model';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_chg_trim_ins
+AFTER INSERT ON trim
+BEGIN
+  UPDATE app_table_change SET change_count = change_count + 1 WHERE table_name = 'trim';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_chg_trim_upd
+AFTER UPDATE ON trim
+BEGIN
+  UPDATE app_table_change SET change_count = change_count + 1 WHERE table_name = 'trim';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_chg_trim_del
+AFTER DELETE ON trim
+BEGIN
+  UPDATE app_table_change SET change_count = change_count + 1 WHERE table_name = 'trim';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_chg_brand_ins
+AFTER INSERT ON brand
+BEGIN
+  UPDATE app_table_change SET change_count = change_count + 1 WHERE table_name = 'brand';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_chg_brand_upd
+AFTER UPDATE ON brand
+BEGIN
+  UPDATE app_table_change SET change_count = change_count + 1 WHERE table_name = 'brand';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_chg_brand_del
+AFTER DELETE ON brand
+BEGIN
+  UPDATE app_table_change SET change_count = change_count + 1 WHERE table_name = 'brand';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_chg_listing_ins
+AFTER INSERT ON listing
+BEGIN
+  UPDATE app_table_change SET change_count = change_count + 1 WHERE table_name = 'listing';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_chg_listing_upd
+AFTER UPDATE ON listing
+BEGIN
+  UPDATE app_table_change SET change_count = change_count + 1 WHERE table_name = 'listing';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_chg_listing_del
+AFTER DELETE ON listing
+BEGIN
+  UPDATE app_table_change SET change_count = change_count + 1 WHERE table_name = 'listing';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_chg_listing_fitment_ins
+AFTER INSERT ON listing_fitment
+BEGIN
+  UPDATE app_table_change SET change_count = change_count + 1 WHERE table_name = 'listing_fitment';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_chg_listing_fitment_upd
+AFTER UPDATE ON listing_fitment
+BEGIN
+  UPDATE app_table_change SET change_count = change_count + 1 WHERE table_name = 'listing_fitment';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_chg_listing_fitment_del
+AFTER DELETE ON listing_fitment
+BEGIN
+  UPDATE app_table_change SET change_count = change_count + 1 WHERE table_name = 'listing_fitment';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_chg_brand_alias_ins
+AFTER INSERT ON brand_alias
+BEGIN
+  UPDATE app_table_change SET change_count = change_count + 1 WHERE table_name = 'brand_alias';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_chg_brand_alias_upd
+AFTER UPDATE ON brand_alias
+BEGIN
+  UPDATE app_table_change SET change_count = change_count + 1 WHERE table_name = 'brand_alias';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_chg_brand_alias_del
+AFTER DELETE ON brand_alias
+BEGIN
+  UPDATE app_table_change SET change_count = change_count + 1 WHERE table_name = 'brand_alias';
+END;
@@ -0,0 +1,160 @@
+-- trim_make_backfill.sql
+-- Set-based alternative to the trg_trim_set_make row trigger for bulk TRIM loads.
+--
+--   trim_stage               staging table, no trigger and no NOT NULL on make_id
+--   backfill_trim_make       one MERGE that derives TRIM.MAKE_ID from MODEL.MAKE_ID
+--   trim_load_ctl            session flag that makes trg_trim_set_make skip its lookup
+--   trg_trim_set_make        web_schema.sql's trigger, plus the trim_load_ctl check
+--   load_trims_from_stage    flag on -> set-based upsert from trim_stage -> backfill
+--                            -> flag off -> clear stage
+--   View_TrimMakeMismatch    validation: must return no rows after a load
+
+SET SERVEROUTPUT ON
+
+---------------------------
+-- TABLE: TRIM_STAGE
+---------------------------
+DECLARE
+  e_exists EXCEPTION; PRAGMA EXCEPTION_INIT(e_exists, -955);
+BEGIN
+  EXECUTE IMMEDIATE q'[
+    CREATE TABLE trim_stage (
+      trim_id   NUMBER       CONSTRAINT nn_trim_stage_id   NOT NULL,
+      trim_name VARCHAR2(50) CONSTRAINT nn_trim_stage_name NOT NULL,
+      model_id  NUMBER       CONSTRAINT nn_trim_stage_model NOT NULL,
+      year      NUMBER(4)
+    )
+  ]';
+EXCEPTION WHEN e_exists THEN NULL; END;
+/
+
+---------------------------
+-- PACKAGE: TRIM_LOAD_CTL
+---------------------------
+-- Package state is private to the session, so a bulk load in one session leaves the
+-- trigger working for trims inserted by every other session (disabling the trigger
+-- would commit and switch it off for all of them).
+CREATE OR REPLACE PACKAGE trim_load_ctl AS
+  bulk_load BOOLEAN := FALSE;
+END trim_load_ctl;
+/
+
+SHOW ERRORS PACKAGE trim_load_ctl;
+
+---------------------------
+-- TRIGGER: TRG_TRIM_SET_MAKE (session-aware)
+---------------------------
+CREATE OR REPLACE TRIGGER trg_trim_set_make
+BEFORE INSERT OR UPDATE ON trim
+FOR EACH ROW
+BEGIN
+  IF trim_load_ctl.bulk_load THEN
+    RETURN;
+  END IF;
+
+  IF :NEW.model_id IS NOT NULL THEN
+    SELECT make_id
+    INTO   :NEW.make_id
+    FROM   model
+    WHERE  model_id = :NEW.model_id;
+  END IF;
+END;
+/
+
+SHOW ERRORS TRIGGER trg_trim_set_make;
+
+---------------------------
+-- PROCEDURE: BACKFILL_TRIM_MAKE
+---------------------------
+CREATE OR REPLACE PROCEDURE backfill_trim_make AS
+BEGIN
+  MERGE INTO trim t
+  USING model m
+  ON (t.model_id = m.model_id)
+  WHEN MATCHED THEN UPDATE
+    SET t.make_id = m.make_id
+    WHERE t.make_id IS NULL OR t.make_id <> m.make_id;
+
+  DBMS_OUTPUT.PUT_LINE('backfill_trim_make: ' || SQL%ROWCOUNT || ' trim rows updated');
+END;
+/
+
+SHOW ERRORS PROCEDURE backfill_trim_make;
+
+---------------------------
+-- PROCEDURE: LOAD_TRIMS_FROM_STAGE
+---------------------------
+CREATE OR REPLACE PROCEDURE load_trims_from_stage AS
+  v_missing NUMBER;
+BEGIN
+  SELECT COUNT(*)
+  INTO   v_missing
+  FROM   trim_stage s
+  WHERE  NOT EXISTS (SELECT 1 FROM model m WHERE m.model_id = s.model_id);
+
+  IF v_missing > 0 THEN
+    RAISE_APPLICATION_ERROR(
+      -20002,
+      'TRIM load failed: ' || v_missing || ' staged rows reference a MODEL_ID not found in MODEL table'
+    );
+  END IF;
+
+  trim_load_ctl.bulk_load := TRUE;
+
+  BEGIN
+    -- make_id is resolved in the same statement, so the NOT NULL constraint holds
+    -- without any per-row trigger work.
+    MERGE INTO trim t
+    USING (
+      SELECT s.trim_id, s.trim_name, s.model_id, s.year, m.make_id
+      FROM   trim_stage s
+      JOIN   model m ON m.model_id = s.model_id
+    ) src
+    ON (t.trim_id = src.trim_id)
+    WHEN MATCHED THEN UPDATE
+      SET t.trim_name = src.trim_name,
+          t.model_id  = src.model_id,
+          t.year      = src.year,
+          t.make_id   = src.make_id
+    WHEN NOT MATCHED THEN INSERT (trim_id, trim_name, make_id, model_id, year)
+      VALUES (src.trim_id, src.trim_name, src.make_id, src.model_id, src.year);
+
+    DBMS_OUTPUT.PUT_LINE('load_trims_from_stage: ' || SQL%ROWCOUNT || ' trim rows merged');
+
+    backfill_trim_make;
+
+    DELETE FROM trim_stage;
+    COMMIT;
+  EXCEPTION
+    WHEN OTHERS THEN
+      ROLLBACK;
+      trim_load_ctl.bulk_load := FALSE;
+      RAISE;
+  END;
+
+  trim_load_ctl.bulk_load := FALSE;
+END;
+/
+
+SHOW ERRORS PROCEDURE load_trims_from_stage;
+
+---------------------------
+-- VIEW: VIEW_TRIMMAKEMISMATCH (validation)
+---------------------------
+CREATE OR REPLACE VIEW View_TrimMakeMismatch AS
+SELECT
+  t.trim_id,
+  t.trim_name,
+  t.model_id,
+  t.make_id   AS trim_make_id,
+  m.make_id   AS model_make_id
+FROM trim t
+LEFT JOIN model m
+  ON t.model_id = m.model_id
+WHERE t.model_id IS NOT NULL
+  AND (m.model_id IS NULL OR t.make_id IS NULL OR t.make_id <> m.make_id);
+
+COMMIT;
+
+PROMPT === trim_make_backfill.sql complete ===
+PROMPT === Validate with: SELECT COUNT(*) FROM View_TrimMakeMismatch;  (expect 0) ===
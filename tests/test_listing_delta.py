@@ -0,0 +1,85 @@
+import pandas as pd
+import pytest
+
+import app
+from db_backend import create_sqlite_database
+
+LISTINGS = pd.DataFrame({
+    "listing_id": [1, 2],
+    "listing_title": ["Front brake pads", "Rear rotor"],
+    "price": [49.99, 89.5],
+    "brand_id": [1, 1],
+    "part_type_id": [1, 1],
+    "mpn": ["BP-1", "RT-2"]
+})
+
+FITMENT = pd.DataFrame({
+    "listing_id": [1, 1, 2],
+    "trim_id": [1, 2, 1],
+    "position_id": [1, 1, 1],
+    "drive_id": [1, 1, 1]
+})
+
+
+@pytest.fixture
+def catalog(tmp_path, monkeypatch):
+    path = str(tmp_path / "fitment.db")
+    create_sqlite_database(path)
+    monkeypatch.setattr(app, "DB_BACKEND", "sqlite")
+    monkeypatch.setattr(app, "SQLITE_PATH", path)
+    monkeypatch.setattr(app, "_pool", None)
+    monkeypatch.setattr(app, "_dialect", None)
+    app.execute_batches([
+        ("INSERT INTO make (make_id, make_name) VALUES (:id, :name)", [{"id": 1, "name": "Honda"}]),
+        ("INSERT INTO model (model_id, model_name, make_id) VALUES (1, 'Civic', 1)", [{}]),
+        ("INSERT INTO trim (trim_id, trim_name, year, model_id) VALUES (:id, :name, 2019, 1)",
+         [{"id": 1, "name": "LX"}, {"id": 2, "name": "EX"}]),
+        ("INSERT INTO brand (brand_id, brand_name) VALUES (1, 'Acme')", [{}]),
+        ("INSERT INTO part_type (part_type_id, parttype_name) VALUES (1, 'Brakes')", [{}]),
+        ("INSERT INTO position (position_id, position_code) VALUES (1, 'Front')", [{}]),
+        ("INSERT INTO drive_train (drive_id, drive_code) VALUES (1, 'FWD')", [{}])
+    ])
+    app.apply_listing_delta(LISTINGS, FITMENT)
+    return path
+
+
+def _fitment_rows(listing_id):
+    df = app.execute_query(
+        "SELECT trim_id FROM listing_fitment WHERE listing_id = :listing_id ORDER BY trim_id",
+        {"listing_id": listing_id}
+    )
+    return list(df["trim_id"])
+
+
+def test_partial_ingest_never_deletes_listings_only_in_fitment_feed(catalog):
+    listings = LISTINGS[LISTINGS["listing_id"] == 1].assign(price=39.99)
+    fitment = FITMENT[FITMENT["listing_id"] == 2]
+
+    changes = app.apply_listing_delta(listings, fitment, full_snapshot=False)
+
+    assert changes["listing"]["deleted"].empty
+    assert list(changes["listing"]["updated"]["listing_id"]) == [1]
+    assert changes["listing_fitment"]["deleted"].empty
+    assert sorted(app.execute_query("SELECT listing_id FROM listing")["listing_id"]) == [1, 2]
+    # Listing 1 is not in the fitment file, so its fitment is left alone.
+    assert _fitment_rows(1) == [1, 2]
+    assert _fitment_rows(2) == [1]
+
+
+def test_partial_ingest_replaces_fitment_for_listings_in_fitment_feed(catalog):
+    fitment = FITMENT[(FITMENT["listing_id"] == 1) & (FITMENT["trim_id"] == 2)]
+
+    changes = app.apply_listing_delta(LISTINGS.iloc[0:0], fitment, full_snapshot=False)
+
+    assert changes["listing"]["deleted"].empty
+    assert changes["listing_fitment"]["deleted"][["listing_id", "trim_id"]].values.tolist() == [[1, 1]]
+    assert _fitment_rows(1) == [2]
+    assert _fitment_rows(2) == [1]
+
+
+def test_full_snapshot_deletes_missing_listings(catalog):
+    changes = app.apply_listing_delta(LISTINGS[LISTINGS["listing_id"] == 1], FITMENT[FITMENT["listing_id"] == 1])
+
+    assert list(changes["listing"]["deleted"]["listing_id"]) == [2]
+    assert list(app.execute_query("SELECT listing_id FROM listing")["listing_id"]) == [1]
+    assert _fitment_rows(2) == []
@@ -0,0 +1,169 @@
+"""Trigram inverted index over listing titles.
+
+The bulk of the index is a compact, immutable base: trigram codes map to slices of
+one sorted numpy array of listing ids. Inserts and updates land in a small delta of
+Python sets, and replaced or deleted listings are masked out of the base by a
+tombstone set. Once the delta grows past ``merge_threshold`` listings it is folded
+into a new base, so the index can follow ingestion without full rebuilds.
+"""
+import re
+import threading
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+import pandas as pd
+
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+
+def normalize_title(text: str) -> str:
+    return _NON_ALNUM.sub(" ", str(text).lower()).strip()
+
+
+def trigrams(text: str) -> Set[str]:
+    normalized = normalize_title(text)
+    if not normalized:
+        return set()
+    padded = f" {normalized} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TitleIndex:
+    def __init__(self, merge_threshold: int = 50000):
+        self.merge_threshold = merge_threshold
+        self._lock = threading.RLock()
+        self._titles: Dict[int, str] = {}
+        self._codes: Dict[str, int] = {}
+        self._offsets = np.zeros(1, dtype=np.int64)
+        self._postings = np.zeros(0, dtype=np.int64)
+        self._base_ids: Set[int] = set()
+        self._dead: Set[int] = set()
+        self._delta: Dict[str, Set[int]] = {}
+        self._delta_ids: Set[int] = set()
+
+    def __len__(self) -> int:
+        return len(self._titles)
+
+    def build(self, rows: Iterable[Tuple[int, str]]) -> None:
+        """Replace the whole index with (listing_id, title) rows."""
+        titles = {int(listing_id): str(title) for listing_id, title in rows if title is not None}
+        with self._lock:
+            self._titles = titles
+            self._rebuild_base()
+
+    def _rebuild_base(self) -> None:
+        codes: Dict[str, int] = {}
+        gram_codes: List[int] = []
+        gram_ids: List[int] = []
+        for listing_id, title in self._titles.items():
+            for gram in trigrams(title):
+                gram_codes.append(codes.setdefault(gram, len(codes)))
+                gram_ids.append(listing_id)
+        code_array = np.asarray(gram_codes, dtype=np.int64)
+        id_array = np.asarray(gram_ids, dtype=np.int64)
+        order = np.lexsort((id_array, code_array))
+        self._postings = id_array[order]
+        self._offsets = np.zeros(len(codes) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(code_array, minlength=len(codes)), out=self._offsets[1:])
+        self._codes = codes
+        self._base_ids = set(self._titles)
+        self._dead = set()
+        self._delta = {}
+        self._delta_ids = set()
+
+    def _drop_from_delta(self, listing_id: int) -> None:
+        if listing_id not in self._delta_ids:
+            return
+        for gram in trigrams(self._titles[listing_id]):
+            ids = self._delta.get(gram)
+            if ids is not None:
+                ids.discard(listing_id)
+        self._delta_ids.discard(listing_id)
+
+    def upsert(self, listing_id: int, title: str) -> None:
+        listing_id = int(listing_id)
+        with self._lock:
+            self._remove(listing_id)
+            self._titles[listing_id] = str(title)
+            for gram in trigrams(title):
+                self._delta.setdefault(gram, set()).add(listing_id)
+            self._delta_ids.add(listing_id)
+            if len(self._delta_ids) > self.merge_threshold:
+                self._rebuild_base()
+
+    def remove(self, listing_id: int) -> None:
+        with self._lock:
+            self._remove(int(listing_id))
+
+    def _remove(self, listing_id: int) -> None:
+        if listing_id not in self._titles:
+            return
+        self._drop_from_delta(listing_id)
+        if listing_id in self._base_ids:
+            self._dead.add(listing_id)
+        del self._titles[listing_id]
+
+    def apply_listing_changes(self, listing_changes: Dict[str, pd.DataFrame]) -> None:
+        """Apply the "listing" part of a delta-ingestion change set (inserted/updated/deleted frames)."""
+        for kind in ("inserted", "updated"):
+            df = listing_changes.get(kind)
+            if df is not None and not df.empty:
+                for row in df[['listing_id', 'listing_title']].itertuples(index=False):
+                    self.upsert(row.listing_id, row.listing_title)
+        deleted = listing_changes.get("deleted")
+        if deleted is not None and not deleted.empty:
+            for listing_id in deleted['listing_id']:
+                self.remove(listing_id)
+
+    def title(self, listing_id: int) -> Optional[str]:
+        return self._titles.get(int(listing_id))
+
+    def search(
+        self,
+        query: str,
+        limit: int = 50,
+        allowed_ids: Optional[Iterable[int]] = None,
+        min_score: float = 0.6
+    ) -> List[Tuple[int, float]]:
+        """Ranked (listing_id, score) pairs for titles containing most of the query's trigrams.
+
+        score is the share of query trigrams found in the title, plus 1 when the
+        normalized query appears verbatim, so exact mentions rank above fuzzy ones.
+        """
+        grams = trigrams(query)
+        if not grams:
+            return []
+        needed = max(1, int(np.ceil(min_score * len(grams))))
+        with self._lock:
+            slices = [
+                self._postings[self._offsets[code]:self._offsets[code + 1]]
+                for code in (self._codes.get(gram) for gram in grams) if code is not None
+            ]
+            hits = np.concatenate(slices) if slices else np.zeros(0, dtype=np.int64)
+            ids, counts = np.unique(hits, return_counts=True)
+            if self._dead and len(ids):
+                alive = ~np.isin(ids, np.fromiter(self._dead, dtype=np.int64))
+                ids, counts = ids[alive], counts[alive]
+            delta_counts: Dict[int, int] = {}
+            for gram in grams:
+                for listing_id in self._delta.get(gram, ()):
+                    delta_counts[listing_id] = delta_counts.get(listing_id, 0) + 1
+            if delta_counts:
+                ids = np.concatenate([ids, np.fromiter(delta_counts.keys(), dtype=np.int64)])
+                counts = np.concatenate([counts, np.fromiter(delta_counts.values(), dtype=np.int64)])
+
+            keep = counts >= needed
+            if allowed_ids is not None:
+                keep &= np.isin(ids, np.fromiter((int(i) for i in allowed_ids), dtype=np.int64))
+            ids, counts = ids[keep], counts[keep]
+            # Only the strongest trigram matches are checked for a verbatim mention.
+            shortlist = np.argsort(-counts, kind="stable")[:max(limit * 5, 200)]
+            needle = normalize_title(query)
+            scored = []
+            for position in shortlist:
+                listing_id = int(ids[position])
+                title = normalize_title(self._titles[listing_id])
+                score = counts[position] / len(grams) + (1.0 if needle in title else 0.0)
+                scored.append((listing_id, round(float(score), 3), len(title)))
+        scored.sort(key=lambda item: (-item[1], item[2], item[0]))
+        return [(listing_id, score) for listing_id, score, _ in scored[:limit]]